@@ -1,44 +1,43 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, Flask, Response, current_app, has_app_context, stream_with_context, render_template, request, redirect, session, url_for, flash, jsonify
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import or_, text
+from sqlalchemy.orm import Session, object_session
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
+import gc
 import os
-import random
-from datetime import datetime
+import socket
+import json
+import time
+from datetime import date, datetime, timedelta
+from operator import attrgetter
 
-app = Flask(__name__)
+from model import DISEASE_CLASSES, SimpleDiseaseModel, TieredDiseaseModel
+from inference import BatchedInferenceEngine
+from model_registry import ModelNotReady, ModelRegistry
+from quantization import load_model
+from preprocessing import read_upload, preprocess_image
+from upload_store import UploadStore
+from metrics import Metrics, RequestInstrumentation
+from auth import CachedUser, PasswordHasher, UserCache
+from prediction_cache import PredictionCache, colour_signature, content_hash, perceptual_hash
+from jobs import DONE, FAILED, FINISHED, QUEUED, RUNNING, JobQueue, JobQueueFull, new_job_id
+from bulk import ArchiveTooLarge, Throughput, iter_upload_images, render_report, run_parallel
+from chat_engine import ChatEngine
+from database import engine_options, install_sqlite_pragmas
+from write_behind import WriteBehindBuffer
+from pagination import InvalidCursor, keyset_page, row_to_dict, stream_export
+from dashboard_stats import apply_detections, build_dashboard, detection_values, week_start
+from treatments import TreatmentIndex, FTS_MIN_QUERY_LENGTH, FTS_SEARCH_SQL, fts_query, has_search_index
+from config import Config
 
-# Configuration - Using SQLite instead of MySQL
-app.config['SECRET_KEY'] = 'smartagridoctor-secret-key-2024'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///smartagridoctor.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['UPLOAD_FOLDER'] = 'static/uploads/'
-app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'gif'}
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB
+# Extensions are created unbound and set up by create_app()
+db = SQLAlchemy()
 
-# Initialize SQLAlchemy
-db = SQLAlchemy(app)
-
-# Initialize Flask-Login
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
+login_manager.login_view = 'main.login'
 login_manager.login_message_category = 'info'
 
-# Disease classes for demo
-DISEASE_CLASSES = [
-    'Apple___Apple_scab', 'Apple___Black_rot', 'Apple___Cedar_apple_rust', 'Apple___healthy',
-    'Blueberry___healthy', 'Cherry___Powdery_mildew', 'Cherry___healthy',
-    'Corn___Cercospora_leaf_spot', 'Corn___Common_rust', 'Corn___Northern_Leaf_Blight', 'Corn___healthy',
-    'Grape___Black_rot', 'Grape___Esca', 'Grape___Leaf_blight', 'Grape___healthy',
-    'Orange___Haunglongbing', 'Peach___Bacterial_spot', 'Peach___healthy',
-    'Pepper_bell___Bacterial_spot', 'Pepper_bell___healthy', 'Potato___Early_blight', 'Potato___Late_blight', 'Potato___healthy',
-    'Raspberry___healthy', 'Soybean___healthy', 'Squash___Powdery_mildew',
-    'Strawberry___Leaf_scorch', 'Strawberry___healthy', 'Tomato___Bacterial_spot', 'Tomato___Early_blight',
-    'Tomato___Late_blight', 'Tomato___Leaf_Mold', 'Tomato___Septoria_leaf_spot', 'Tomato___Spider_mites',
-    'Tomato___Target_Spot', 'Tomato___Tomato_Yellow_Leaf_Curl_Virus', 'Tomato___Tomato_mosaic_virus', 'Tomato___healthy'
-]
+main = Blueprint('main', __name__)
 
 # Database Models
 class User(db.Model, UserMixin):
@@ -57,6 +56,10 @@ class UserSession(db.Model):
     logout_time = db.Column(db.DateTime, nullable=True)
     ip_address = db.Column(db.String(45))
     user_agent = db.Column(db.Text)
+    
+    __table_args__ = (
+        db.Index('ix_user_session_user_logout_login', 'user_id', 'logout_time', 'login_time'),
+    )
 
 class DetectionHistory(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -66,6 +69,27 @@ class DetectionHistory(db.Model):
     confidence = db.Column(db.Float)
     detection_time = db.Column(db.DateTime, default=datetime.utcnow)
     treatment_recommendation = db.Column(db.Text)
+    top_predictions = db.Column(db.Text)  # JSON [{"disease": ..., "confidence": ...}, ...]
+    
+    __table_args__ = (
+        db.Index('ix_detection_history_user_time', 'user_id', 'detection_time'),
+        # compact_uploads.py looks references up one upload shard (path prefix) at a time
+        db.Index('ix_detection_history_image_path', 'image_path'),
+    )
+
+class DetectionJob(db.Model):
+    """An asynchronous detection - in the database so any worker process can report on it"""
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    status = db.Column(db.String(10), nullable=False, default=QUEUED)
+    detection_id = db.Column(db.Integer, db.ForeignKey('detection_history.id'))
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.Index('ix_detection_job_created', 'created_at'),
+    )
 
 class ChatMessage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -74,6 +98,25 @@ class ChatMessage(db.Model):
     response = db.Column(db.Text)
     language = db.Column(db.String(10), default='en')
     message_time = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_chat_message_user_time', 'user_id', 'message_time'),
+    )
+
+class DetectionSummary(db.Model):
+    """Per-user detection counts per disease, updated as detections are written"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    predicted_disease = db.Column(db.String(255), primary_key=True)
+    detections = db.Column(db.Integer, nullable=False, default=0)
+    confidence_total = db.Column(db.Float, nullable=False, default=0.0)
+    last_detected = db.Column(db.DateTime)
+
+class WeeklyDetectionSummary(db.Model):
+    """Per-user detections per week (weeks start on Monday)"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    week_start = db.Column(db.Date, primary_key=True)
+    detections = db.Column(db.Integer, nullable=False, default=0)
+    confidence_total = db.Column(db.Float, nullable=False, default=0.0)
 
 class PestRecommendation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -83,27 +126,182 @@ class PestRecommendation(db.Model):
     preventive_measures = db.Column(db.Text)
     suitable_crops = db.Column(db.Text)
 
+def load_treatment_catalogue(app):
+    """Read the recommendation catalogue for the treatment index"""
+    with app.app_context():
+        return db.session.execute(db.select(
+            PestRecommendation.disease_name,
+            PestRecommendation.organic_treatment,
+            PestRecommendation.chemical_treatment,
+            PestRecommendation.preventive_measures
+        )).mappings().all()
+
+def _update_dashboard_summaries(session, rows):
+    detections = [values for model, values, row in rows if model is DetectionHistory]
+    if detections:
+        apply_detections(session, DetectionSummary, WeeklyDetectionSummary, detections)
+
+# Disease class -> treatment map, rebuilt when the catalogue changes
+def _treatment_catalogue_changed(mapper, connection, target):
+    object_session(target).info['treatment_catalogue_changed'] = True
+
+for _event in ('after_insert', 'after_update', 'after_delete'):
+    db.event.listen(PestRecommendation, _event, _treatment_catalogue_changed)
+
+@db.event.listens_for(Session, 'after_commit')
+def _refresh_treatment_index(session):
+    services = _current_services()
+    if session.info.pop('treatment_catalogue_changed', False) and services is not None:
+        services.treatment_index.invalidate()
+
+# current_user snapshots, so authenticated pages skip the per-request user query
+def _load_user_snapshot(user_id):
+    row = db.session.execute(
+        db.select(User.id, User.username, User.email, User.is_active).where(User.id == user_id)
+    ).first()
+    return CachedUser(*row) if row else None
+
+def _user_changed(mapper, connection, target):
+    object_session(target).info.setdefault('changed_user_ids', set()).add(target.id)
+
+for _event in ('after_update', 'after_delete'):
+    db.event.listen(User, _event, _user_changed)
+
+@db.event.listens_for(Session, 'after_commit')
+def _invalidate_cached_users(session):
+    changed = session.info.pop('changed_user_ids', ())
+    services = _current_services()
+    if services is not None:
+        for user_id in changed:
+            services.user_cache.invalidate(user_id)
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return get_services().user_cache.get(int(user_id))
+
+def find_users(username, email):
+    """Users with this username or email - one query over both unique indexes"""
+    return User.query.filter(or_(User.username == username, User.email == email)).limit(2).all()
 
-# Simple disease prediction model (no TensorFlow needed)
-class SimpleDiseaseModel:
-    def predict_disease(self, image_path):
-        """Simulate disease prediction - returns random results for demo"""
-        predicted_class = random.randint(0, len(DISEASE_CLASSES) - 1)
-        confidence = round(random.uniform(0.7, 0.95), 2)
-        return predicted_class, confidence
+@main.before_app_request
+def start_model_registry():
+    get_services().model_registry.start()
 
-# Initialize the simple model
-disease_model = SimpleDiseaseModel()
+class Services:
+    """The services behind the views of one application, kept in ``app.extensions['smartagri']``"""
+        
+    def __init__(self, app):
+        self.app = app
+        
+        # Audit/history inserts are batched off the request path
+        self.audit_log = WriteBehindBuffer(
+            app, db,
+            max_rows=app.config['WRITE_BEHIND_MAX_ROWS'],
+            max_delay=app.config['WRITE_BEHIND_MAX_DELAY'],
+            enabled=app.config['WRITE_BEHIND_ENABLED'],
+            max_retries=app.config['WRITE_BEHIND_MAX_RETRIES'],
+            max_queue=app.config['WRITE_BEHIND_MAX_QUEUE']
+        )
+        self.audit_log.on_flush(_update_dashboard_summaries)
+        
+        # Built on first lookup, so startup does not query the catalogue
+        self.treatment_index = TreatmentIndex(DISEASE_CLASSES, lambda: load_treatment_catalogue(app))
+        
+        self.user_cache = UserCache(
+            _load_user_snapshot,
+            ttl_seconds=app.config['USER_CACHE_TTL'],
+            max_entries=app.config['USER_CACHE_SIZE']
+        )
+        self.password_hasher = PasswordHasher(app.config['PASSWORD_HASH_METHOD'])
+        
+        # Initialize the batched inference engine around the simple model
+        self.disease_model = BatchedInferenceEngine(
+            SimpleDiseaseModel(),
+            max_batch_size=app.config['INFERENCE_MAX_BATCH_SIZE'],
+            max_wait_ms=app.config['INFERENCE_MAX_WAIT_MS']
+        )
+        
+        # Real model artifacts from models/ are loaded and warmed up in the background,
+        # then swapped into the engine; the simple model only serves when there are none
+        self.model_registry = ModelRegistry(
+            self.disease_model,
+            app.config['MODELS_FOLDER'],
+            app.config['MODEL_INPUT_SIZE'],
+            loader=lambda path: load_model(path, app.config['INFERENCE_PRECISION'], app.config['MODEL_MMAP']),
+            warmup_runs=app.config['MODEL_WARMUP_RUNS'],
+            poll_seconds=app.config['MODEL_POLL_SECONDS']
+        )
+        
+        # Background workers for asynchronous detection jobs
+        self.detection_jobs = JobQueue(max_workers=app.config['DETECTION_JOB_WORKERS'],
+                                       max_pending=app.config['DETECTION_JOB_MAX_PENDING'])
+        
+        # Chat intents are compiled once from chat_intents/<language>.json
+        self.chat_engine = ChatEngine.from_directory(app.config['CHAT_INTENTS_FOLDER'])
+        
+        # Cache predictions for re-uploaded and near-identical images
+        self.prediction_cache = PredictionCache(
+            max_entries=app.config['PREDICTION_CACHE_SIZE'],
+            ttl_seconds=app.config['PREDICTION_CACHE_TTL'],
+            max_phash_distance=app.config['PREDICTION_CACHE_PHASH_DISTANCE'],
+            max_colour_distance=app.config['PREDICTION_CACHE_COLOUR_DISTANCE'],
+            near_duplicate_seconds=app.config['PREDICTION_CACHE_NEAR_DUPLICATE_SECONDS']
+        )
+        
+        # Hot-path timings, SQL counts and sampled profiles, exported on /metrics
+        self.metrics = Metrics(enabled=app.config['METRICS_ENABLED'])
+        RequestInstrumentation(app, db, self.metrics, app.config['METRICS_PROFILE_RATE'],
+                               app.config['METRICS_PROFILE_DIR'])
+        
+        # Uploads are stored once per distinct image, with thumbnails for the result page and dashboard
+        self.upload_store = UploadStore(app.config['UPLOAD_FOLDER'], app.config['UPLOAD_THUMBNAIL_SIZES'],
+                                        max_pending=app.config['UPLOAD_MAX_PENDING'], metrics=self.metrics)
+        
+        # Whether the catalogue has its search index, checked on the first search
+        self.search_index_ready = None
+
+def get_services():
+    """Services of the current application"""
+    return current_app.extensions['smartagri']
+
+def _current_services():
+    # Session events also fire outside requests, and before create_app() has finished
+    return current_app.extensions.get('smartagri') if has_app_context() else None
+
+def create_app(config_class=Config):
+    """Build the SmartAgriDoctor application from ``config_class``.
+
+    Nothing here touches the database: ``python migrate.py`` creates the
+    schema and seed data once per deploy. Model artifacts are loaded in the
+    background on the first request, or here with MODEL_PRELOAD, so that a
+    pre-forking server started with ``gunicorn --preload 'app:create_app()'``
+    loads them once and its workers share the weights copy-on-write.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+    
+    db.init_app(app)
+    with app.app_context():
+        install_sqlite_pragmas(db.engine, app.config)
+    login_manager.init_app(app)
+    
+    app.extensions['smartagri'] = Services(app)
+    app.register_blueprint(main)
+    
+    if app.config['MODEL_PRELOAD']:
+        app.extensions['smartagri'].model_registry.load_latest()
+        # Objects alive now are never scanned again, so the collector does not
+        # write to (and copy) the shared pages in each worker
+        gc.freeze()
+    return app
 
 # Routes
-@app.route('/')
+@main.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+@main.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
         username = request.form['username']
@@ -112,141 +310,146 @@ def register():
         password = request.form['password']
         
         # Check if user already exists
-        if User.query.filter_by(username=username).first():
+        existing = find_users(username, email)
+        if any(user.username == username for user in existing):
             flash('❌ Username already exists.', 'danger')
-            return redirect(url_for('register'))
+            return redirect(url_for('main.register'))
         
-        if User.query.filter_by(email=email).first():
+        if existing:
             flash('❌ Email already exists.', 'danger')
-            return redirect(url_for('register'))
+            return redirect(url_for('main.register'))
         
-        hashed_password = generate_password_hash(password)
+        hashed_password = get_services().password_hasher.hash(password)
         new_user = User(username=username, email=email, phone=phone, password_hash=hashed_password)
         
         db.session.add(new_user)
         db.session.commit()
         
         flash('✅ Registration successful! Please login.', 'success')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
     return render_template('register.html')
 
-@app.route('/login', methods=['GET', 'POST'])
+@main.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
         
-        user = User.query.filter((User.username == username) | (User.email == username)).first()
+        # A username match wins over another account's email
+        candidates = sorted(find_users(username, username), key=lambda user: user.username != username)
+        user = candidates[0] if candidates else None
         
-        if user and check_password_hash(user.password_hash, password):
+        password_hasher = get_services().password_hasher
+        if user and password_hasher.verify(user.password_hash, password):
+            # Upgrade hashes made with an older method or cost
+            if password_hasher.needs_rehash(user.password_hash):
+                user.password_hash = password_hasher.hash(password)
+                db.session.commit()
+            
             login_user(user)
             
-            # Log login session
-            new_session = UserSession(
+            # Log login session - committed now, so logout can close it by id on any worker
+            user_session = UserSession(
                 user_id=user.id,
+                login_time=datetime.utcnow(),
                 ip_address=request.remote_addr,
                 user_agent=request.headers.get('User-Agent')
             )
-            db.session.add(new_session)
+            db.session.add(user_session)
             db.session.commit()
+            session['user_session_id'] = user_session.id
             
             flash('✅ Login successful!', 'success')
-            return redirect(url_for('dashboard'))
+            return redirect(url_for('main.dashboard'))
         else:
             flash('❌ Login failed. Check your credentials.', 'danger')
     
     return render_template('login.html')
 
-@app.route('/logout')
+@main.route('/logout')
 @login_required
 def logout():
     # Update logout time in session log
-    latest_session = UserSession.query.filter_by(
-        user_id=current_user.id, 
-        logout_time=None
-    ).order_by(UserSession.login_time.desc()).first()
+    user_session_id = session.pop('user_session_id', None)
+    user_session = db.session.get(UserSession, user_session_id) if user_session_id else None
     
-    if latest_session:
-        latest_session.logout_time = datetime.utcnow()
+    if user_session and user_session.user_id == current_user.id and user_session.logout_time is None:
+        user_session.logout_time = datetime.utcnow()
         db.session.commit()
     
     logout_user()
     flash('ℹ️ You have been logged out.', 'info')
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.route('/dashboard')
+@main.route('/dashboard')
 @login_required
 def dashboard():
     # Get user detection history
-    history = DetectionHistory.query.filter_by(
-        user_id=current_user.id
-    ).order_by(DetectionHistory.detection_time.desc()).limit(5).all()
+    history = recent_rows(DetectionHistory, DetectionHistory.detection_time, current_user.id, 5)
     
-    return render_template('dashboard.html', history=history)
+    # Precomputed summaries - constant work however long the history is
+    weeks = current_app.config['DASHBOARD_WEEKS']
+    first_week = week_start(date.today()) - timedelta(weeks=weeks - 1)
+    summary_rows = DetectionSummary.query.filter_by(user_id=current_user.id).all()
+    weekly_rows = WeeklyDetectionSummary.query.filter(
+        WeeklyDetectionSummary.user_id == current_user.id,
+        WeeklyDetectionSummary.week_start >= first_week
+    ).all()
+    pending = [detection_values(row) for row in get_services().audit_log.pending(DetectionHistory, user_id=current_user.id)]
+    stats = build_dashboard(summary_rows, weekly_rows, pending, weeks=weeks)
+    
+    return render_template('dashboard.html', history=history, stats=stats)
 
 # ⭐ ONLY ONE disease-detection route ⭐
-@app.route('/disease-detection', methods=['GET', 'POST'])
+@main.route('/disease-detection', methods=['GET', 'POST'])
 @login_required
 def disease_detection():
     # Handle file upload (existing functionality)
     if request.method == 'POST' and 'file' in request.files:
         file = request.files['file']
         if file.filename != '' and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-            
             try:
-                # Predict disease
-                predicted_class, confidence = disease_model.predict_disease(filepath)
-                disease_name = DISEASE_CLASSES[predicted_class]
-                
-                # Get treatment recommendations
-                treatment = get_treatment_recommendation(disease_name)
-                
-                # Save to database
-                new_detection = DetectionHistory(
-                    user_id=current_user.id,
-                    image_path=filename,
-                    predicted_disease=disease_name,
-                    confidence=float(confidence),
-                    treatment_recommendation=treatment
-                )
-                db.session.add(new_detection)
-                db.session.commit()
+                result = record_detection(current_user.id, read_upload(file), file.filename)
                 
                 return render_template('disease_detection.html', 
-                                    prediction=disease_name,
-                                    confidence=confidence,
-                                    treatment=treatment,
-                                    image_url=url_for('static', filename='uploads/' + filename))
+                                    prediction=result['prediction'],
+                                    confidence=result['confidence'],
+                                    treatment=result['treatment'],
+                                    image_path=result['image_path'],
+                                    top_predictions=result['top_predictions'])
             
+            except ModelNotReady as e:
+                flash(f'⏳ {str(e)}', 'warning')
+                return render_template('disease_detection.html'), 503
             except Exception as e:
                 flash(f'❌ Error processing image: {str(e)}', 'danger')
     
-    # Check if this is a camera result redirect
+    # Camera results redirect here with the detection job, or the detection saved by /take-photo
     camera_result = request.args.get('camera_result')
-    if camera_result:
-        # Get the latest detection for this user
-        latest_detection = DetectionHistory.query.filter_by(
-            user_id=current_user.id
-        ).order_by(DetectionHistory.detection_time.desc()).first()
-        
-        if latest_detection:
+    detection_id = request.args.get('detection', type=int)
+    if camera_result or detection_id:
+        if camera_result:
+            job = find_job(camera_result)
+            detection_id = job.detection_id if job is not None else None
+        detection = db.session.get(DetectionHistory, detection_id) if detection_id else None
+        if detection is not None and detection.user_id == current_user.id:
+            result = detection_result(detection)
             return render_template('disease_detection.html', 
-                                prediction=latest_detection.predicted_disease,
-                                confidence=latest_detection.confidence,
-                                treatment=latest_detection.treatment_recommendation,
-                                image_url=url_for('static', filename='uploads/' + latest_detection.image_path))
+                                prediction=result['prediction'],
+                                confidence=result['confidence'],
+                                treatment=result['treatment'],
+                                image_path=result['image_path'],
+                                top_predictions=result['top_predictions'])
+        flash('❌ Detection result not found.', 'danger')
     
     return render_template('disease_detection.html')
 
 # ⭐ NEW camera route ⭐
-@app.route('/take-photo', methods=['POST'])
+@main.route('/take-photo', methods=['POST'])
 @login_required
 def take_photo():
-    """Handle photo taken from camera"""
+    """Handle photo taken from camera - the detection is saved before answering, so its result page can show it"""
     if 'photo' not in request.files:
         return jsonify({'error': 'No photo data'}), 400
     
@@ -255,43 +458,134 @@ def take_photo():
         return jsonify({'error': 'No photo selected'}), 400
     
     if photo and allowed_file(photo.filename):
-        filename = secure_filename(f"camera_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg")
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        photo.save(filepath)
-        
         try:
-            # Predict disease
-            predicted_class, confidence = disease_model.predict_disease(filepath)
-            disease_name = DISEASE_CLASSES[predicted_class]
-            
-            # Get treatment recommendations
-            treatment = get_treatment_recommendation(disease_name)
-            
-            # Save to database
-            new_detection = DetectionHistory(
-                user_id=current_user.id,
-                image_path=filename,
-                predicted_disease=disease_name,
-                confidence=float(confidence),
-                treatment_recommendation=treatment
-            )
-            db.session.add(new_detection)
+            result = diagnose_upload(current_user.id, read_upload(photo), photo.filename)
+            detection = save_detection(current_user.id, result)
             db.session.commit()
+            return jsonify(dict(result, detection_id=detection.id,
+                                result_url=url_for('main.disease_detection', detection=detection.id),
+                                image_url=upload_url(result['image_path']),
+                                thumbnail_url=thumbnail_url(result['image_path']), success=True))
             
-            return jsonify({
-                'success': True,
-                'prediction': disease_name,
-                'confidence': confidence,
-                'treatment': treatment,
-                'image_url': url_for('static', filename='uploads/' + filename)
-            })
-            
+        except ModelNotReady as e:
+            return jsonify({'error': str(e)}), 503
         except Exception as e:
             return jsonify({'error': f'Error processing image: {str(e)}'}), 500
     
     return jsonify({'error': 'Invalid file type'}), 400
 
-@app.route('/chat', methods=['GET', 'POST'])
+# Asynchronous detection jobs
+@main.route('/api/detections', methods=['POST'])
+@login_required
+def create_detection_job():
+    """Enqueue an uploaded image for detection and return the job id right away"""
+    upload = request.files.get('photo') or request.files.get('file')
+    if upload is None or upload.filename == '':
+        return jsonify({'error': 'No image uploaded'}), 400
+    
+    if not allowed_file(upload.filename):
+        return jsonify({'error': 'Invalid file type'}), 400
+    
+    data = read_upload(upload)
+    job = DetectionJob(id=new_job_id(), user_id=current_user.id, status=QUEUED, created_at=datetime.utcnow())
+    db.session.add(job)
+    # Jobs are only polled for a while, so old rows go as new ones arrive
+    cutoff = job.created_at - timedelta(seconds=current_app.config['DETECTION_JOB_TTL'])
+    DetectionJob.query.filter(DetectionJob.created_at < cutoff).delete()
+    db.session.commit()
+    try:
+        get_services().detection_jobs.submit(run_detection_job, current_app._get_current_object(), job.id,
+                                             current_user.id, data, upload.filename)
+    except JobQueueFull:
+        db.session.delete(job)
+        db.session.commit()
+        return jsonify({'error': 'The server is busy, please try again shortly'}), 503, {'Retry-After': '5'}
+    
+    return jsonify({
+        'job_id': job.id,
+        'status': QUEUED,
+        'status_url': url_for('main.detection_job_status', job_id=job.id),
+        'events_url': url_for('main.detection_job_events', job_id=job.id),
+        'result_url': url_for('main.disease_detection', camera_result=job.id)
+    }), 202
+
+@main.route('/api/detections/<job_id>')
+@login_required
+def detection_job_status(job_id):
+    job = find_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_status(job))
+
+@main.route('/api/detections/<job_id>/events')
+@login_required
+def detection_job_events(job_id):
+    """Server-sent events stream that delivers the job result once it is ready.
+
+    The stream holds a server thread, so it closes after
+    DETECTION_JOB_STREAM_SECONDS with a 'pending' event - the client then
+    polls the status URL.
+    """
+    if find_job(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    app = current_app._get_current_object()
+    poll_seconds = app.config['DETECTION_JOB_POLL_SECONDS']
+    closes_at = time.monotonic() + app.config['DETECTION_JOB_STREAM_SECONDS']
+    
+    def stream():
+        # The job row is re-read each time, whichever worker process runs the job
+        last_sent = time.monotonic()
+        while True:
+            with app.app_context():
+                job = db.session.get(DetectionJob, job_id)
+                status = job_status(job) if job is not None else {'job_id': job_id, 'status': FAILED,
+                                                                   'error': 'Job not found'}
+            if status['status'] in FINISHED or time.monotonic() >= closes_at:
+                break
+            if time.monotonic() - last_sent >= 15:
+                last_sent = time.monotonic()
+                yield ': keep-alive\n\n'
+            time.sleep(poll_seconds)
+        event = {DONE: 'result', FAILED: 'failed'}.get(status['status'], 'pending')
+        yield f"event: {event}\ndata: {json.dumps(status)}\n\n"
+    
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@main.route('/bulk-detection', methods=['POST'])
+@login_required
+def bulk_detection():
+    """Diagnose a zip archive or multi-file upload and return a per-image report"""
+    config = current_app.config
+    # Surveys are larger than the single-image MAX_CONTENT_LENGTH - raised before the body is parsed
+    request.max_content_length = config['BULK_MAX_UPLOAD_BYTES']
+    request.max_form_parts = config['BULK_MAX_IMAGES'] + 100
+    
+    files = request.files.getlist('files') + request.files.getlist('archive')
+    if not files:
+        return jsonify({'error': 'No images uploaded'}), 400
+    
+    images = iter_upload_images(files, config['ALLOWED_EXTENSIONS'],
+                                max_images=config['BULK_MAX_IMAGES'],
+                                max_image_bytes=config['BULK_MAX_IMAGE_BYTES'],
+                                max_total_bytes=config['BULK_MAX_ARCHIVE_BYTES'])
+    try:
+        results, summary = diagnose_bulk(current_user.id, images)
+    except ArchiveTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except ModelNotReady as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': f'Error processing images: {str(e)}'}), 500
+    
+    if request.args.get('format') == 'csv':
+        return Response(render_report(results, summary, 'csv'), mimetype='text/csv', headers={
+            'Content-Disposition': 'attachment; filename=bulk_detection.csv',
+            'X-Images-Per-Second': str(summary['images_per_second'])
+        })
+    return jsonify({'summary': summary, 'results': results})
+
+@main.route('/chat', methods=['GET', 'POST'])
 @login_required
 def chat():
     if request.method == 'POST':
@@ -302,33 +596,114 @@ def chat():
         response = generate_chat_response(message, language)
         
         # Save to database
-        new_chat = ChatMessage(
+        queue_write(
+            ChatMessage,
             user_id=current_user.id,
             message=message,
             response=response,
-            language=language
+            language=language,
+            message_time=datetime.utcnow()
         )
-        db.session.add(new_chat)
-        db.session.commit()
         
         return jsonify({'response': response})
     
     # Get chat history
-    chat_history = ChatMessage.query.filter_by(
-        user_id=current_user.id
-    ).order_by(ChatMessage.message_time.desc()).limit(10).all()
+    chat_history = recent_rows(ChatMessage, ChatMessage.message_time, current_user.id, 10)
     
     return render_template('chat.html', chat_history=reversed(chat_history))
 
-@app.route('/recommendations')
+# History APIs - keyset pagination and streaming export
+HISTORY_FIELDS = ['id', 'image_path', 'predicted_disease', 'confidence', 'detection_time', 'treatment_recommendation', 'top_predictions']
+HISTORY_JSON_FIELDS = ['top_predictions']  # stored as JSON text, decoded for the JSON APIs
+CHAT_FIELDS = ['id', 'message', 'response', 'language', 'message_time']
+
+def history_page(model, time_column, fields, json_fields=()):
+    """One page of the current user's rows, newest first"""
+    limit = min(max(request.args.get('limit', 50, type=int), 1), current_app.config['API_MAX_PAGE_SIZE'])
+    cursor = request.args.get('cursor')
+    
+    # Make sure the user's queued writes are on the first page
+    if not cursor:
+        wait_for_own_writes(model)
+    
+    try:
+        rows, next_cursor = keyset_page(model.query.filter_by(user_id=current_user.id),
+                                        time_column, model.id, cursor=cursor, limit=limit)
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'items': [row_to_dict(row, fields, json_fields) for row in rows], 'next_cursor': next_cursor})
+
+def history_export(model, time_column, fields, name, json_fields=()):
+    """Stream all of the current user's rows as CSV or NDJSON in constant memory"""
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    
+    wait_for_own_writes(model)
+    user_id = current_user.id
+    
+    def generate():
+        # Rows come off a server-side cursor in small batches
+        rows = db.session.execute(
+            db.select(model).filter_by(user_id=user_id)
+            .order_by(time_column, model.id)
+            .execution_options(yield_per=current_app.config['EXPORT_BATCH_SIZE'])
+        ).scalars()
+        yield from stream_export(rows, fields, fmt, json_fields)
+    
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={name}.{fmt}'
+    })
+
+@main.route('/api/history')
+@login_required
+def api_history():
+    return history_page(DetectionHistory, DetectionHistory.detection_time, HISTORY_FIELDS, HISTORY_JSON_FIELDS)
+
+@main.route('/api/history/export')
+@login_required
+def api_history_export():
+    return history_export(DetectionHistory, DetectionHistory.detection_time, HISTORY_FIELDS, 'detection_history',
+                          HISTORY_JSON_FIELDS)
+
+@main.route('/api/chat-history')
+@login_required
+def api_chat_history():
+    return history_page(ChatMessage, ChatMessage.message_time, CHAT_FIELDS)
+
+@main.route('/api/chat-history/export')
+@login_required
+def api_chat_history_export():
+    return history_export(ChatMessage, ChatMessage.message_time, CHAT_FIELDS, 'chat_history')
+
+@main.route('/inference-stats')
+@login_required
+def inference_stats():
+    services = get_services()
+    model = services.disease_model.model
+    return jsonify({
+        'engine': services.disease_model.stats(),
+        'tiered_model': model.stats() if isinstance(model, TieredDiseaseModel) else None,
+        'model_registry': services.model_registry.status(),
+        'prediction_cache': services.prediction_cache.stats(),
+        'detection_jobs': services.detection_jobs.stats(),
+        'upload_store': services.upload_store.stats(),
+        'user_cache': services.user_cache.stats(),
+        'write_behind': services.audit_log.stats()
+    })
+
+@main.route('/metrics')
+def prometheus_metrics():
+    return Response(get_services().metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@main.route('/recommendations')
 @login_required
 def recommendations():
     disease = request.args.get('disease', '')
     
     if disease:
-        recommendations_data = PestRecommendation.query.filter(
-            PestRecommendation.disease_name.ilike(f'%{disease}%')
-        ).all()
+        recommendations_data = search_recommendations(disease)
     else:
         recommendations_data = PestRecommendation.query.limit(10).all()
     
@@ -336,104 +711,273 @@ def recommendations():
 
 # Helper functions
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
 
-def get_treatment_recommendation(disease_name):
-    """Get treatment recommendations for a disease"""
-    treatments = {
-        'Early_blight': 'Use copper-based fungicides. Remove infected leaves. Practice crop rotation. Ensure proper plant spacing.',
-        'Late_blight': 'Apply fungicides containing chlorothalonil. Remove and destroy infected plants. Avoid overhead watering.',
-        'Powdery_mildew': 'Use sulfur-based fungicides. Improve air circulation. Apply neem oil every 7-10 days.',
-        'Leaf_spot': 'Remove infected leaves. Apply copper fungicide. Avoid overhead watering.',
-        'healthy': 'Plant is healthy! Continue good agricultural practices including proper watering and fertilization.'
-    }
+def require_model():
+    """Raise ModelNotReady while a model artifact is still loading, rather than predict with the placeholder"""
+    model_registry = get_services().model_registry
+    if not model_registry.wait_ready(current_app.config['MODEL_READY_TIMEOUT']):
+        raise ModelNotReady(model_registry.last_error and 'The disease model could not be loaded'
+                            or 'The disease model is still loading, please try again shortly')
+
+def predict_upload(data, key, user_id):
+    """Top-k (class_index, probability) predictions for an upload.
+
+    Results are reused for identical image bytes, and optionally for the
+    user's own near-identical frames of the last minute or so.
+    """
+    require_model()
+    services = get_services()
+    prediction_cache = services.prediction_cache
+    model_version = services.disease_model.model_version
+    prediction = prediction_cache.get(key, model_version)
+    if prediction is not None:
+        return prediction
     
-    for key, treatment in treatments.items():
-        if key.lower() in disease_name.lower():
-            return treatment
+    image = preprocess_image(data, current_app.config['MODEL_INPUT_SIZE'])
+    phash = colour = None
+    if prediction_cache.max_phash_distance is not None:
+        phash, colour = perceptual_hash(image), colour_signature(image)
+    prediction = prediction_cache.find_similar(phash, model_version, owner=user_id, colour=colour)
+    if prediction is None:
+        prediction = services.disease_model.predict_top_k(image, current_app.config['PREDICTION_TOP_K'],
+                                                          timeout=current_app.config['INFERENCE_TIMEOUT'])
     
-    return 'Consult local agricultural expert for specific treatment recommendations. Practice crop rotation and maintain plant health.'
+    prediction_cache.put(key, model_version, prediction, phash=phash, owner=user_id, colour=colour)
+    return prediction
 
-def generate_chat_response(message, language='en'):
-    """Generate AI response for chat"""
-    message_lower = message.lower()
-    
-    responses = {
-        'en': {
-            'hello': 'Hello! I\'m your SmartAgriDoctor assistant. How can I help with plant disease diagnosis today?',
-            'hi': 'Hi there! I can help you identify plant diseases and suggest treatments. What would you like to know?',
-            'treatment': 'I can recommend treatments based on disease detection. Please upload a leaf image for accurate analysis.',
-            'prevention': 'Good agricultural practices include crop rotation, proper spacing, regular monitoring, and balanced fertilization.',
-            'blight': 'For blight diseases, remove infected leaves, apply copper-based fungicides, and avoid overhead watering.',
-            'mildew': 'Powdery mildew can be treated with sulfur sprays, neem oil, or baking soda solutions. Improve air circulation.',
-            'healthy': 'Maintain plant health with proper watering, balanced nutrition, and regular pest monitoring.',
-            'default': 'I specialize in plant disease diagnosis. Please upload a leaf image for accurate analysis or ask about specific plant issues.'
-        },
-        'es': {
-            'hola': '¡Hola! Soy tu asistente SmartAgriDoctor. ¿Cómo puedo ayudarte con el diagnóstico de enfermedades de plantas hoy?',
-            'default': 'Me especializo en diagnóstico de enfermedades de plantas. Sube una imagen de hoja para análisis preciso.'
-        },
-        'fr': {
-            'bonjour': 'Bonjour! Je suis votre assistant SmartAgriDoctor. Comment puis-je vous aider avec le diagnostic des maladies des plantes aujourd\'hui?',
-            'default': 'Je me spécialise dans le diagnostic des maladies des plantes. Téléchargez une image de feuille pour une analyse précise.'
-        }
+def record_detection(user_id, data, filename):
+    """Predict an uploaded image, look up its treatment and save the detection"""
+    result = diagnose_upload(user_id, data, filename)
+    
+    # Save to database
+    queue_write(DetectionHistory, **detection_row(user_id, result))
+    return result
+
+def diagnose_upload(user_id, data, filename):
+    """Store an upload, predict it and look up the treatment - the detection itself is not saved"""
+    services = get_services()
+    metrics = services.metrics
+    
+    # Stored in the background while we predict from memory - the write is timed there as file_save
+    with metrics.span('upload_queue'):
+        key = content_hash(data)
+        image_path = services.upload_store.save(data, filename, key=key)
+    
+    # Predict disease
+    with metrics.span('inference'):
+        top_predictions = describe_predictions(predict_upload(data, key, user_id))
+    disease_name = top_predictions[0]['disease']
+    confidence = top_predictions[0]['confidence']
+    
+    # Get treatment recommendations
+    with metrics.span('treatment_lookup'):
+        treatment = get_treatment_recommendation(disease_name)
+    
+    return {
+        'prediction': disease_name,
+        'confidence': confidence,
+        'treatment': treatment,
+        'image_path': image_path,
+        'top_predictions': top_predictions
+    }
+
+def detection_row(user_id, result):
+    """DetectionHistory column values for a diagnose_upload() result"""
+    return {
+        'user_id': user_id,
+        'image_path': result['image_path'],
+        'predicted_disease': result['prediction'],
+        'confidence': float(result['confidence']),
+        'detection_time': datetime.utcnow(),
+        'treatment_recommendation': result['treatment'],
+        'top_predictions': json.dumps(result['top_predictions'])
     }
+
+def save_detection(user_id, result):
+    """Add a diagnose_upload() result to the session, bypassing write-behind - returns the flushed row"""
+    values = detection_row(user_id, result)
+    detection = DetectionHistory(**values)
+    db.session.add(detection)
+    apply_detections(db.session, DetectionSummary, WeeklyDetectionSummary, [values])
+    db.session.flush()
+    return detection
+
+def detection_result(detection):
+    """A saved DetectionHistory row in the shape record_detection() returns"""
+    return {
+        'prediction': detection.predicted_disease,
+        'confidence': detection.confidence,
+        'treatment': detection.treatment_recommendation,
+        'image_path': detection.image_path,
+        'top_predictions': json.loads(detection.top_predictions or '[]')
+    }
+
+def describe_predictions(predictions):
+    """(class_index, probability) pairs -> [{'disease': ..., 'confidence': ...}, ...]"""
+    return [{'disease': DISEASE_CLASSES[index], 'confidence': probability} for index, probability in predictions]
+
+def diagnose_bulk(user_id, images, workers=None):
+    """Diagnose (name, bytes) pairs in parallel batches and bulk-insert their history rows"""
+    throughput = Throughput()
+    app = current_app._get_current_object()
+    # Once for the whole survey, rather than one failure per image
+    require_model()
+    
+    def diagnose(name, data):
+        # Runs on the pool's threads, which have no application context of their own
+        with app.app_context():
+            return diagnose_upload(user_id, data, name)
     
-    lang_responses = responses.get(language, responses['en'])
+    results = []
+    rows = []
+    for result in run_parallel(images, diagnose, workers=workers):
+        throughput.add(result)
+        results.append(result)
+        if not result['error']:
+            rows.append(detection_row(user_id, result))
+            # The report names images by their survey path instead
+            del result['image_path']
     
-    for key, response in lang_responses.items():
-        if key in message_lower and key != 'default':
-            return response
+    # One transaction for the whole survey
+    if rows:
+        db.session.bulk_insert_mappings(DetectionHistory, rows)
+        apply_detections(db.session, DetectionSummary, WeeklyDetectionSummary, rows)
+        db.session.commit()
     
-    return lang_responses.get('default', 'I can help with plant disease diagnosis. Please upload an image or ask specific questions.')
+    return results, throughput.summary()
 
-def init_db():
-    """Initialize the database with sample data"""
+def run_detection_job(app, job_id, user_id, data, filename):
+    """Background worker entry point for detection jobs.
+
+    The detection is committed here rather than through the write-behind
+    buffer, so the job row can point at it as soon as the job is done.
+    """
     with app.app_context():
-        # Create all tables
-        db.create_all()
-        
-        # Add sample pest recommendations
-        sample_recommendations = [
-            {
-                'disease_name': 'Early Blight',
-                'organic_treatment': 'Use neem oil spray. Apply compost tea. Remove infected leaves.',
-                'chemical_treatment': 'Apply chlorothalonil or copper-based fungicides every 7-10 days.',
-                'preventive_measures': 'Practice crop rotation. Ensure proper spacing. Water at soil level.',
-                'suitable_crops': 'Tomato, Potato, Eggplant'
-            },
-            {
-                'disease_name': 'Late Blight',
-                'organic_treatment': 'Apply baking soda solution. Use compost tea. Remove infected plants.',
-                'chemical_treatment': 'Use fungicides containing mancozeb or metalaxyl. Apply preventatively.',
-                'preventive_measures': 'Avoid overhead watering. Provide good air circulation. Use resistant varieties.',
-                'suitable_crops': 'Tomato, Potato'
-            },
-            {
-                'disease_name': 'Powdery Mildew',
-                'organic_treatment': 'Spray with milk solution (1:9 ratio). Use baking soda spray. Apply neem oil.',
-                'chemical_treatment': 'Apply sulfur-based fungicides or potassium bicarbonate.',
-                'preventive_measures': 'Maintain proper spacing. Ensure good air circulation. Avoid overhead watering.',
-                'suitable_crops': 'Cucumber, Squash, Grapes, Roses'
-            }
-        ]
-        
-        for rec_data in sample_recommendations:
-            if not PestRecommendation.query.filter_by(disease_name=rec_data['disease_name']).first():
-                new_rec = PestRecommendation(**rec_data)
-                db.session.add(new_rec)
-        
+        job = db.session.get(DetectionJob, job_id)
+        job.status = RUNNING
         db.session.commit()
-        print("✅ Database initialized successfully!")
+        try:
+            detection = save_detection(user_id, diagnose_upload(user_id, data, filename))
+            job.detection_id = detection.id
+            job.status = DONE
+        except Exception as e:
+            db.session.rollback()
+            job.status = FAILED
+            job.error = str(e)
+            raise
+        finally:
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+
+def find_job(job_id):
+    """The current user's detection job, or None"""
+    job = db.session.get(DetectionJob, job_id)
+    return job if job is not None and job.user_id == current_user.id else None
+
+def job_status(job):
+    """Status of a detection job for the API, with its detection once it is done"""
+    status, error = job.status, job.error
+    expires = job.created_at + timedelta(seconds=current_app.config['DETECTION_JOB_TIMEOUT'])
+    if status not in FINISHED and expires < datetime.utcnow():
+        # The process running it went away - queued jobs only live in its memory
+        status, error = FAILED, 'Detection job expired'
+    detection = db.session.get(DetectionHistory, job.detection_id) if job.detection_id else None
+    return {
+        'job_id': job.id,
+        'status': status,
+        'result': detection_result(detection) if detection is not None else None,
+        'error': error,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
+
+@main.app_template_global()
+def upload_url(image_path):
+    return url_for('static', filename='uploads/' + image_path)
+
+@main.app_template_global()
+def original_url(image_path):
+    """A stored upload, or its largest thumbnail once retention has removed the original"""
+    return upload_url(get_services().upload_store.original(image_path))
+
+@main.app_template_global()
+def thumbnail_url(image_path, tier='medium'):
+    """Thumbnail of a stored upload, or the original until the thumbnail has been written"""
+    return upload_url(get_services().upload_store.thumbnail(image_path, tier))
+
+def queue_write(model, **values):
+    """Queue one of the current user's rows on the write-behind buffer.
+
+    pending() only shows it to reads in this process, so the user's session
+    also records when it will be committed: reads served by another worker
+    wait for that (wait_for_own_writes). A batch held back by lock retries
+    can still be later than that.
+    """
+    audit_log = get_services().audit_log
+    row = audit_log.add(model, **values)
+    if audit_log.enabled:
+        session['queued_writes'] = [_buffer_owner(audit_log), time.time() + audit_log.max_delay
+                                    + current_app.config['WRITE_BEHIND_COMMIT_SECONDS']]
+    return row
+
+def _buffer_owner(audit_log):
+    # Pre-forked workers share the buffer object but not its queue
+    return f'{socket.gethostname()}:{os.getpid()}:{id(audit_log)}'
+
+def wait_for_own_writes(model, flush=True):
+    """Make the current user's queued writes readable, whichever worker queued them.
+
+    Rows queued here are flushed, or with ``flush=False`` left for the caller
+    to merge from pending(). Rows queued by another worker are waited for.
+    """
+    audit_log = get_services().audit_log
+    queued = session.get('queued_writes')
+    if queued is not None and queued[0] != _buffer_owner(audit_log):
+        longest = audit_log.max_delay + current_app.config['WRITE_BEHIND_COMMIT_SECONDS']
+        remaining = min(queued[1] - time.time(), longest)
+        if remaining > 0:
+            time.sleep(remaining)
+        session.pop('queued_writes')
+    if flush and audit_log.pending(model, user_id=current_user.id):
+        audit_log.flush()
+
+def recent_rows(model, time_column, user_id, limit):
+    """Latest rows of a user's history, including rows still queued for writing"""
+    wait_for_own_writes(model, flush=False)
+    rows = model.query.filter_by(user_id=user_id).order_by(time_column.desc()).limit(limit).all()
+    pending = get_services().audit_log.pending(model, user_id=user_id)
+    if pending:
+        rows = sorted(rows + pending, key=attrgetter(time_column.key), reverse=True)[:limit]
+    return rows
+
+def get_treatment_recommendation(disease_name):
+    """Get treatment recommendations for a disease"""
+    return get_services().treatment_index.lookup(disease_name)
+
+def search_recommendations(term):
+    """Search the recommendation catalogue by disease name"""
+    services = get_services()
+    if services.search_index_ready is None:
+        services.search_index_ready = has_search_index(db.session.connection())
+    
+    # Trigram index for normal queries; very short terms fall back to LIKE
+    if services.search_index_ready and len(term) >= FTS_MIN_QUERY_LENGTH:
+        return PestRecommendation.query.from_statement(text(FTS_SEARCH_SQL)).params(query=fts_query(term)).all()
+    return PestRecommendation.query.filter(PestRecommendation.disease_name.ilike(f'%{term}%')).all()
+
+def generate_chat_response(message, language='en'):
+    """Generate AI response for chat"""
+    return get_services().chat_engine.respond(message, language)
 
 if __name__ == '__main__':
+    app = create_app()
+    
     # Create upload directory
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     
-    # Initialize database
-    print("🔄 Initializing database...")
-    init_db()
-    
+    # The schema and sample data come from migrate.py
+    print("ℹ️ Run python migrate.py first on a new or upgraded database")
     print("🚀 Starting SmartAgriDoctor Server...")
     print("📍 Access the application at: http://localhost:5000")
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,96 @@
+from functools import cached_property
+
+from flask_login import UserMixin
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from ttl_cache import TTLCache
+
+
+class CachedUser(UserMixin):
+    """Read-only snapshot of a User row, used as ``current_user``.
+
+    Carries only what requests need, so it can be shared across threads and
+    sessions without touching the database.
+    """
+
+    def __init__(self, id, username, email, active=True):
+        self.id = id
+        self.username = username
+        self.email = email
+        self._active = bool(active)
+
+    @property
+    def is_active(self):
+        return self._active
+
+
+class UserCache:
+    """Bounded LRU/TTL cache of CachedUser snapshots keyed by user id.
+
+    ``loader(user_id)`` returns a CachedUser or None (unknown ids are not
+    cached). Call ``invalidate`` once a change to the user is committed;
+    the TTL bounds staleness for changes made by other processes. A
+    ``ttl_seconds`` of 0 sends every lookup to the loader.
+    """
+
+    def __init__(self, loader, ttl_seconds=60, max_entries=10000):
+        self.loader = loader
+        self._entries = TTLCache(max_entries, ttl_seconds)
+
+    @property
+    def ttl_seconds(self):
+        return self._entries.ttl_seconds
+
+    @ttl_seconds.setter
+    def ttl_seconds(self, value):
+        self._entries.ttl_seconds = value
+
+    def get(self, user_id):
+        if not self.ttl_seconds:
+            return self.loader(user_id)
+        user = self._entries.get(user_id)
+        if user is None:
+            user = self.loader(user_id)
+            if user is not None:
+                self._entries.put(user_id, user)
+        return user
+
+    def invalidate(self, user_id):
+        self._entries.pop(user_id)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        stats = self._entries.stats()
+        return {key: stats[key] for key in
+                ('size', 'max_entries', 'ttl_seconds', 'hits', 'misses', 'hit_rate', 'invalidations')}
+
+
+class PasswordHasher:
+    """Werkzeug password hashing with a configurable method and cost.
+
+    ``method`` is anything generate_password_hash accepts, e.g.
+    ``'scrypt:32768:8:1'`` or ``'pbkdf2:sha256:600000'``. Hashes stored
+    with any other method or cost verify as before, and ``needs_rehash``
+    reports them so login can upgrade them.
+    """
+
+    def __init__(self, method='scrypt:32768:8:1'):
+        self.method = method
+
+    @cached_property
+    def stored_method(self):
+        # The method prefix exactly as werkzeug writes it, defaults filled in -
+        # costs one hash, so only paid when ``method`` leaves parameters out
+        return generate_password_hash('', self.method).split('$', 1)[0]
+
+    def hash(self, password):
+        return generate_password_hash(password, self.method)
+
+    def verify(self, stored_hash, password):
+        return check_password_hash(stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        method = stored_hash.split('$', 1)[0]
+        return method != self.method and method != self.stored_method
@@ -0,0 +1,114 @@
+"""Login throughput per hash cost and SQL queries per authenticated page view.
+
+Run from the repository root:  python -m benchmarks.bench_auth [--seconds 2]
+
+Logins/sec is measured single-threaded, so it is per core: each POST /login
+runs one lookup and one password verification at the given method. Page
+views count the SQL statements behind GET /dashboard, POST /chat and
+GET /recommendations with the load_user cache on and off.
+"""
+import argparse
+import json
+import tempfile
+import time
+
+from sqlalchemy import event
+
+HASH_METHODS = ['scrypt:32768:8:1', 'pbkdf2:sha256:600000', 'pbkdf2:sha256:100000', 'scrypt:16384:8:1']
+PAGE_VIEWS = [
+    ('dashboard', 'get', '/dashboard', {}),
+    ('chat', 'post', '/chat', {'data': {'message': 'how do I treat blight?'}}),
+    ('recommendations', 'get', '/recommendations', {'query_string': {'disease': 'blight'}}),
+]
+
+
+def logins_per_second(smartagri, method, seconds):
+    from app import User, db
+    from auth import PasswordHasher
+
+    name = 'login-' + method.replace(':', '-')
+    hasher = PasswordHasher(method)
+    with smartagri.app.app_context():
+        db.session.add(User(username=name, email=f'{name}@example.com', password_hash=hasher.hash('bench')))
+        db.session.commit()
+
+    # Keep the stored hash at this method rather than upgrading it on first login
+    smartagri.password_hasher = hasher
+    client = smartagri.app.test_client()
+    logins = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        response = client.post('/login', data={'username': name, 'password': 'bench'})
+        assert response.status_code == 302, response.status_code
+        client.get('/logout')
+        logins += 1
+    elapsed = time.perf_counter() - started
+    return {'logins': logins, 'logins_per_second': round(logins / elapsed, 2),
+            'ms_per_login': round(elapsed / logins * 1000.0, 2)}
+
+
+def queries_per_view(smartagri, client, views):
+    counts = {}
+    counter = {'queries': 0}
+
+    def count(*args):
+        counter['queries'] += 1
+
+    from app import db
+
+    with smartagri.app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        for name, method, path, kwargs in PAGE_VIEWS:
+            getattr(client, method)(path, **kwargs)  # warm up the user cache and template caches
+            counter['queries'] = 0
+            for _ in range(views):
+                response = getattr(client, method)(path, **kwargs)
+                assert response.status_code == 200, (path, response.status_code)
+            counts[name] = round(counter['queries'] / views, 2)
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    return counts
+
+
+def run(seconds, views):
+    from benchmarks.common import create_users, load_app
+
+    with tempfile.TemporaryDirectory() as workdir:
+        smartagri = load_app(workdir)
+        default_hasher = smartagri.password_hasher
+
+        logins = {method: logins_per_second(smartagri, method, seconds) for method in HASH_METHODS}
+        smartagri.password_hasher = default_hasher
+
+        name = create_users(smartagri, 1, prefix='views')[0]
+        client = smartagri.app.test_client()
+        client.post('/login', data={'username': name, 'password': 'bench'})
+
+        cached = queries_per_view(smartagri, client, views)
+        ttl = smartagri.user_cache.ttl_seconds
+        smartagri.user_cache.ttl_seconds = 0
+        smartagri.user_cache.clear()
+        uncached = queries_per_view(smartagri, client, views)
+        smartagri.user_cache.ttl_seconds = ttl
+
+        smartagri.disease_model.close()
+        smartagri.audit_log.close()
+        return {
+            'default_method': smartagri.app.config['PASSWORD_HASH_METHOD'],
+            'logins_per_core': logins,
+            'queries_per_view': {'user_cache': cached, 'no_user_cache': uncached},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=2.0, help='Time per hash method')
+    parser.add_argument('--views', type=int, default=50, help='Requests per page for query counts')
+    args = parser.parse_args()
+    print(json.dumps(run(args.seconds, args.views), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Messages/sec of the compiled chat engine vs the old per-keyword substring scan.
+
+Run from the repository root:  python -m benchmarks.bench_chat
+"""
+import argparse
+import json
+import random
+import string
+import time
+
+from chat_engine import LanguageIntents
+
+
+def legacy_generate_chat_response(message, responses, language='en'):
+    """The previous implementation: rebuild the table, one substring test per keyword"""
+    responses = {lang: dict(table) for lang, table in responses.items()}
+    message_lower = message.lower()
+    lang_responses = responses.get(language, responses['en'])
+    for key, response in lang_responses.items():
+        if key in message_lower and key != 'default':
+            return response
+    return lang_responses.get('default', 'I can help with plant disease diagnosis. Please upload an image or ask specific questions.')
+
+
+def make_vocabulary(rng, size):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10))))
+    return sorted(words)
+
+
+def make_messages(rng, vocabulary, count):
+    filler = ['my', 'tomato', 'leaves', 'have', 'spots', 'what', 'should', 'i', 'do', 'about', 'the', 'plants']
+    messages = []
+    for _ in range(count):
+        words = [rng.choice(filler) for _ in range(rng.randint(6, 16))]
+        if rng.random() < 0.5:
+            words.insert(rng.randrange(len(words)), rng.choice(vocabulary))
+        messages.append(' '.join(words))
+    return messages
+
+
+def rate(fn, messages, min_seconds):
+    count = 0
+    started = time.perf_counter()
+    while True:
+        for message in messages:
+            fn(message)
+        count += len(messages)
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='10,100,1000,5000', help='Comma-separated keyword counts')
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--seconds', type=float, default=1.0, help='Minimum run time per measurement')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    results = []
+    for size in (int(s) for s in args.sizes.split(',')):
+        vocabulary = make_vocabulary(rng, size)
+        table = {word: f'response for {word}' for word in vocabulary}
+        responses = {'en': dict(table, default='default response')}
+        intents = LanguageIntents([{'keywords': [w], 'response': r} for w, r in table.items()], 'default response')
+        messages = make_messages(rng, vocabulary, args.messages)
+
+        # The old scan also matches keywords inside longer words; count how often that differs
+        differing = sum(
+            1 for message in messages
+            if legacy_generate_chat_response(message, responses) != (intents.match(message) or intents.default)
+        )
+
+        legacy = rate(lambda m: legacy_generate_chat_response(m, responses), messages, args.seconds)
+        compiled = rate(lambda m: intents.match(m) or intents.default, messages, args.seconds)
+        results.append({
+            'keywords': size,
+            'legacy_msgs_per_sec': round(legacy),
+            'compiled_msgs_per_sec': round(compiled),
+            'speedup': round(compiled / legacy, 1),
+            'substring_only_matches': differing,
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
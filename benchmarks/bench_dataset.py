@@ -0,0 +1,55 @@
+"""Training-input throughput: decoding JPEGs vs reading the memory-mapped cache.
+
+Run from the repository root:
+    python -m benchmarks.bench_dataset SOURCE_DIR CACHE_DIR [--batches 50]
+where CACHE_DIR was built from SOURCE_DIR by dataset_ingest.py.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from dataset_ingest import DatasetStore, list_entries
+from preprocessing import decode_resized
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('source')
+    parser.add_argument('cache')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--batches', type=int, default=50)
+    args = parser.parse_args()
+
+    store = DatasetStore(args.cache)
+    limit = args.batch_size * args.batches
+
+    # Decode path: what every training run did before the cache
+    entries, _ = list_entries(args.source)
+    entries = entries[:limit]
+    started = time.perf_counter()
+    for start in range(0, len(entries), args.batch_size):
+        batch = []
+        for path, _, _ in entries[start:start + args.batch_size]:
+            with open(os.path.join(args.source, path), 'rb') as f:
+                batch.append(decode_resized(f.read(), store.image_size))
+        np.stack(batch)
+    decode_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    images = 0
+    for batch, labels in store.iter_batches(args.batch_size, shuffle=True, limit=limit):
+        images += len(batch)
+    mmap_seconds = time.perf_counter() - started
+
+    print(json.dumps({
+        'images': len(entries),
+        'jpeg_decode_images_per_sec': round(len(entries) / decode_seconds, 1),
+        'mmap_images_per_sec': round(images / mmap_seconds, 1),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Overhead of the /metrics instrumentation.
+
+Run from the repository root:  python -m benchmarks.bench_metrics [--rounds 3] [--seconds 5]
+
+Runs the load test with METRICS_ENABLED=0 and =1 in alternating fresh
+processes and compares the median throughput and latency. Also reports the
+raw cost of one span and one counter increment.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from metrics import Metrics
+
+
+def per_call_ns(fn, calls=200000):
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return round((time.perf_counter() - started) / calls * 1e9, 1)
+
+
+def primitive_costs():
+    metrics = Metrics()
+
+    def span():
+        with metrics.span('bench'):
+            pass
+
+    def inc():
+        metrics.inc('bench_total', endpoint='bench')
+
+    disabled = Metrics(enabled=False)
+
+    def disabled_span():
+        with disabled.span('bench'):
+            pass
+
+    return {'span_ns': per_call_ns(span), 'inc_ns': per_call_ns(inc), 'disabled_span_ns': per_call_ns(disabled_span)}
+
+
+def load_run(enabled, users, seconds):
+    env = dict(os.environ, METRICS_ENABLED='1' if enabled else '0')
+    output = subprocess.check_output([
+        sys.executable, '-m', 'benchmarks.load_test', '--users', str(users), '--seconds', str(seconds),
+    ], env=env).decode()
+    return json.loads(output[output.index('{'):])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--users', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    runs = {False: [], True: []}
+    for _ in range(args.rounds):
+        for enabled in (False, True):
+            runs[enabled].append(load_run(enabled, args.users, args.seconds))
+
+    def median(enabled, *path):
+        values = []
+        for result in runs[enabled]:
+            for key in path:
+                result = result[key]
+            values.append(result)
+        return statistics.median(values)
+
+    modes = {}
+    for enabled in (False, True):
+        modes['enabled' if enabled else 'disabled'] = {
+            'requests_per_second': median(enabled, 'requests_per_second'),
+            'p50_ms': median(enabled, 'latency', 'p50_ms'),
+            'p95_ms': median(enabled, 'latency', 'p95_ms'),
+        }
+    off, on = modes['disabled'], modes['enabled']
+    print(json.dumps({
+        'primitives': primitive_costs(),
+        'load': modes,
+        'throughput_overhead': round(1 - on['requests_per_second'] / off['requests_per_second'], 4),
+        'p50_overhead_ms': round(on['p50_ms'] - off['p50_ms'], 3),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Microbenchmarks for the hot helpers behind each route.
+
+Run from the repository root:  python -m benchmarks.bench_micro [--seconds 1] [--model models/x.npz]
+Covers predict_disease (through the batching engine and on the bare model),
+get_treatment_recommendation, generate_chat_response and allowed_file.
+"""
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import load_app, make_jpeg
+
+CHAT_MESSAGES = [
+    ('hello there', 'en'), ('how do I treat blight on tomatoes?', 'en'), ('my leaves have yellow spots', 'en'),
+    ('what fertilizer should I use', 'en'), ('hola, tengo un problema', 'es'), ('bonjour', 'fr'),
+    ('something completely unrelated to farming', 'en'),
+]
+FILENAMES = ['leaf.jpg', 'photo.PNG', 'scan.jpeg', 'notes.txt', 'archive.tar.gz', 'noextension', 'a.b.c.gif']
+
+
+def measure(fn, calls, seconds):
+    """Run ``fn(*args)`` over ``calls`` in rounds until ``seconds`` elapse - per-call stats"""
+    fn(*calls[0])
+    rounds = []
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        t0 = time.perf_counter()
+        for args in calls:
+            fn(*args)
+        rounds.append((time.perf_counter() - t0) / len(calls))
+    rounds = np.sort(np.asarray(rounds)) * 1e6
+    return {
+        'calls': len(rounds) * len(calls),
+        'ops_per_second': round(1e6 / float(rounds.mean()), 1),
+        'us_per_call_p50': round(float(np.percentile(rounds, 50)), 3),
+        'us_per_call_p99': round(float(np.percentile(rounds, 99)), 3),
+    }
+
+
+def run(seconds, model_path=None):
+    from app import DISEASE_CLASSES, allowed_file, generate_chat_response, get_treatment_recommendation
+    from preprocessing import preprocess_image
+
+    with tempfile.TemporaryDirectory() as workdir:
+        smartagri = load_app(workdir, model_path)
+        size = smartagri.app.config['MODEL_INPUT_SIZE']
+        images = [preprocess_image(make_jpeg(seed), size).copy() for seed in range(8)]
+        model = smartagri.disease_model.model
+
+        results = {}
+        results['predict_disease_engine'] = measure(
+            smartagri.disease_model.predict_disease, [(image,) for image in images], seconds)
+        results['predict_disease_model'] = measure(model.predict_disease, [(image,) for image in images], seconds)
+        with smartagri.app.app_context():
+            results['get_treatment_recommendation'] = measure(
+                get_treatment_recommendation,
+                [(name,) for name in DISEASE_CLASSES + ['Unknown___disease']], seconds)
+            results['generate_chat_response'] = measure(generate_chat_response, CHAT_MESSAGES, seconds)
+            results['allowed_file'] = measure(allowed_file, [(name,) for name in FILENAMES], seconds)
+
+        smartagri.disease_model.close()
+        smartagri.audit_log.close()
+        return {'model_version': model.version, 'benchmarks': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seconds', type=float, default=1.0, help='Time per benchmark')
+    parser.add_argument('--model', help='Model artifact (default: seeded random weights)')
+    args = parser.parse_args()
+    print(json.dumps(run(args.seconds, args.model), indent=2))
+
+
+if __name__ == '__main__':
+    main()
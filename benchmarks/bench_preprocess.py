@@ -0,0 +1,102 @@
+"""Decode time and peak RSS per upload: disk round trip vs in-memory pipeline.
+
+Run from the repository root:  python -m benchmarks.bench_preprocess
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+INPUT_SIZE = (224, 224)
+_stores = {}
+
+
+def make_upload(width, height):
+    """Build a synthetic camera-sized JPEG in memory"""
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, size=(height // 8, width // 8, 3), dtype=np.uint8)
+    img = Image.fromarray(pixels).resize((width, height), Image.BILINEAR)
+    out = io.BytesIO()
+    img.save(out, format='JPEG', quality=95)
+    return out.getvalue()
+
+
+def run_before(upload, workdir):
+    """Old path: file.save() to disk, then read the file back and decode it"""
+    filepath = os.path.join(workdir, 'leaf.jpg')
+    with open(filepath, 'wb') as f:
+        f.write(io.BytesIO(upload).read())
+    with Image.open(filepath) as img:
+        img = img.convert('RGB').resize(INPUT_SIZE, Image.BILINEAR)
+        return np.asarray(img, dtype=np.float32) / 255.0
+
+
+def run_after(upload, workdir):
+    """New path: decode from memory into the preallocated buffer, store in background"""
+    from preprocessing import preprocess_image
+    from upload_store import UploadStore
+    data = io.BytesIO(upload).read()
+    image = preprocess_image(data, INPUT_SIZE)
+    if workdir not in _stores:
+        _stores[workdir] = UploadStore(workdir)
+    _stores[workdir].save(data, 'leaf.jpg')
+    return image
+
+
+def measure(mode, width, height, requests):
+    upload = make_upload(width, height)
+    runner = run_before if mode == 'before' else run_after
+    with tempfile.TemporaryDirectory() as workdir:
+        runner(upload, workdir)  # warm-up
+        baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            runner(upload, workdir)
+            timings.append(time.perf_counter() - started)
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings.sort()
+    return {
+        'mode': mode,
+        'upload_bytes': len(upload),
+        'requests': requests,
+        'decode_ms_p50': timings[len(timings) // 2] * 1000.0,
+        'decode_ms_p99': timings[int(len(timings) * 0.99) - 1] * 1000.0,
+        'peak_rss_growth_kb': peak_kb - baseline_kb,
+        'peak_rss_kb': peak_kb,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--mode', choices=['before', 'after'])
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(measure(args.mode, args.width, args.height, args.requests)))
+        return
+
+    # Each mode runs in a fresh process so peak RSS is not shared between them
+    results = []
+    for mode in ('before', 'after'):
+        output = subprocess.check_output([
+            sys.executable, '-m', 'benchmarks.bench_preprocess', '--mode', mode,
+            '--width', str(args.width), '--height', str(args.height), '--requests', str(args.requests),
+        ])
+        results.append(json.loads(output))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Latency, throughput and weight memory of the float32, float16 and int8 modes.
+
+Run from the repository root:
+    python -m benchmarks.bench_quantization models/linear-XXXX.npz [--seconds 2]
+The artifact must have been calibrated with quantize_model.py for int8.
+
+Expect float16 and int8 to be slower than float32: numpy only has BLAS
+kernels for float32/float64 matmul, so the reduced modes only buy memory.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from quantization import PRECISIONS, load_model
+
+
+def measure(model, batch, seconds):
+    model.predict_batch(batch)
+    latencies = []
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        t0 = time.perf_counter()
+        model.predict_batch(batch)
+        latencies.append(time.perf_counter() - t0)
+    latencies.sort()
+    elapsed = sum(latencies)
+    return {
+        'batch_size': len(batch),
+        'latency_ms_p50': round(latencies[len(latencies) // 2] * 1000.0, 3),
+        'latency_ms_p99': round(latencies[int(len(latencies) * 0.99) - 1] * 1000.0, 3),
+        'images_per_second': round(len(batch) * len(latencies) / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('model')
+    parser.add_argument('--input-size', type=int, default=224)
+    parser.add_argument('--seconds', type=float, default=2.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    results = []
+    for precision in PRECISIONS:
+        model = load_model(args.model, precision)
+        weights = model.weights
+        result = {'precision': precision, 'weight_bytes': int(weights.nbytes)}
+        for batch_size in (1, 16):
+            batch = rng.random((batch_size, args.input_size, args.input_size, 3), dtype=np.float32)
+            result[f'batch_{batch_size}'] = measure(model, batch, args.seconds / 2)
+        results.append(result)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
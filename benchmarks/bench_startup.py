@@ -0,0 +1,209 @@
+"""Start-up time and per-worker memory of a pre-forked deployment.
+
+Run from the repository root:  python -m benchmarks.bench_startup [--workers 4] [--runs 5] [--feature-size 112]
+
+Start-up: fresh interpreters time ``import app``, ``create_app()`` and the
+first request (median of --runs), against an already migrated database.
+
+Memory: a master process forks --workers workers, as a pre-forking WSGI
+server does, and every worker logs in and serves the same detections and
+dashboard views. RSS, PSS and private memory (USS) of each worker are read
+from /proc/<pid>/smaps_rollup while all of them are alive, for three layouts:
+
+    independent  each worker builds the app and loads the model after the fork
+                 (gunicorn without --preload)
+    mmap         the same, with MODEL_MMAP mapping the weights from the artifact
+    preload      the master builds the app with MODEL_PRELOAD, then forks
+                 (gunicorn --preload 'app:create_app()')
+
+PSS splits shared pages between the processes mapping them, so the sum over
+the workers and master is what the deployment really costs. Linux only.
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+LAYOUTS = {
+    'independent': {},
+    'mmap': {'MODEL_MMAP': True},
+    'preload': {'MODEL_PRELOAD': True},
+}
+
+
+def memory_kb(pid):
+    """Rss, Pss and private (Private_Clean + Private_Dirty) memory of a process, in kB"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return {'rss': values['Rss'], 'pss': values['Pss'],
+            'uss': values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)}
+
+
+def prepare(workdir, workers, feature_size):
+    """Migrated database with one user per worker and a model artifact in models/"""
+    from benchmarks.common import benchmark_model, create_users, load_app
+
+    os.makedirs(os.path.join(workdir, 'models'))
+    model = benchmark_model(feature_size=feature_size)
+    model.save(os.path.join(workdir, 'models', 'bench.npz'))
+
+    smartagri = load_app(workdir)
+    create_users(smartagri, workers)
+    smartagri.disease_model.close()
+    smartagri.audit_log.close()
+    return model.weights.nbytes
+
+
+def probe_startup(workdir):
+    """Runs in a fresh interpreter: time to import, build and serve the first request"""
+    started = time.perf_counter()
+    import app  # noqa: F401
+    imported = time.perf_counter()
+
+    from benchmarks.common import bench_config, create_bench_app
+    config = bench_config(workdir, MODEL_POLL_SECONDS=0)
+    created = time.perf_counter()
+    smartagri = create_bench_app(config)
+    built = time.perf_counter()
+    smartagri.app.test_client().get('/login')
+    served = time.perf_counter()
+
+    print(json.dumps({
+        'import_ms': round((imported - started) * 1000.0, 1),
+        'create_app_ms': round((built - created) * 1000.0, 1),
+        'first_request_ms': round((served - built) * 1000.0, 1),
+    }))
+
+
+def serve(workdir, workers, layout, requests):
+    """Runs as the master: fork the workers, print 'ready <pid>' per worker, exit once stdin closes"""
+    config_overrides = dict(LAYOUTS[layout], MODEL_POLL_SECONDS=0)
+
+    def build():
+        # Nothing heavy is imported before this, so only the preload layout shares it
+        from benchmarks.common import bench_config, create_bench_app
+        return create_bench_app(bench_config(workdir, **config_overrides))
+
+    smartagri = build() if layout == 'preload' else None
+    sys.stdout.flush()
+
+    children = []
+    for index in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                worker(smartagri or build(), index, requests)
+            finally:
+                os._exit(0)
+        children.append(pid)
+    for pid in children:
+        os.waitpid(pid, 0)
+
+
+def worker(smartagri, index, requests):
+    from benchmarks.common import make_jpeg
+
+    client = smartagri.app.test_client()
+    client.post('/login', data={'username': f'bench{index}', 'password': 'bench'})
+    while not smartagri.model_registry.ready and not smartagri.model_registry.last_error:
+        time.sleep(0.01)
+    for seed in range(requests):
+        client.post('/disease-detection', data={'file': (io.BytesIO(make_jpeg(seed)), 'leaf.jpg')},
+                    content_type='multipart/form-data')
+        client.get('/dashboard')
+    smartagri.audit_log.flush()
+    smartagri.upload_store.flush(10)
+
+    print(f'ready {os.getpid()} {smartagri.disease_model.model_version}', flush=True)
+    sys.stdin.read()
+
+
+def measure_layout(workdir, workers, layout, requests):
+    master = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.bench_startup', '--serve', workdir, '--layout', layout,
+         '--workers', str(workers), '--requests', str(requests)],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+    )
+    pids = []
+    versions = set()
+    while len(pids) < workers:
+        line = master.stdout.readline()
+        if not line:
+            raise RuntimeError(f'{layout}: a worker exited before it was ready')
+        if line.startswith('ready '):
+            pid, version = line.split()[1:3]
+            pids.append(int(pid))
+            versions.add(version)
+
+    per_worker = [memory_kb(pid) for pid in pids]
+    master_memory = memory_kb(master.pid)
+    master.stdin.close()
+    master.wait()
+
+    def mb(kb):
+        return round(kb / 1024.0, 1)
+
+    return {
+        'model_versions': sorted(versions),
+        'worker_rss_mb': mb(statistics.mean(m['rss'] for m in per_worker)),
+        'worker_pss_mb': mb(statistics.mean(m['pss'] for m in per_worker)),
+        'worker_uss_mb': mb(statistics.mean(m['uss'] for m in per_worker)),
+        'master_pss_mb': mb(master_memory['pss']),
+        'total_pss_mb': mb(sum(m['pss'] for m in per_worker) + master_memory['pss']),
+    }
+
+
+def run(workers, runs, feature_size, requests):
+    with tempfile.TemporaryDirectory() as workdir:
+        weights_bytes = prepare(workdir, workers, feature_size)
+
+        startups = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            output = subprocess.check_output(
+                [sys.executable, '-m', 'benchmarks.bench_startup', '--probe-startup', workdir]).decode()
+            result = json.loads(output[output.rindex('{'):])
+            result['process_ms'] = round((time.perf_counter() - started) * 1000.0, 1)
+            startups.append(result)
+        startup = {key: statistics.median(probe[key] for probe in startups) for key in startups[0]}
+
+        memory = {layout: measure_layout(workdir, workers, layout, requests) for layout in LAYOUTS}
+        return {
+            'workers': workers,
+            'model_weights_mb': round(weights_bytes / 1024.0 / 1024.0, 1),
+            'startup': startup,
+            'memory': memory,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters timed for start-up')
+    parser.add_argument('--feature-size', type=int, default=112,
+                        help='Pooling size of the random benchmark model - sets the size of its weights')
+    parser.add_argument('--requests', type=int, default=10, help='Detections each worker serves before measuring')
+    parser.add_argument('--probe-startup', metavar='WORKDIR', help=argparse.SUPPRESS)
+    parser.add_argument('--serve', metavar='WORKDIR', help=argparse.SUPPRESS)
+    parser.add_argument('--layout', choices=sorted(LAYOUTS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe_startup:
+        probe_startup(args.probe_startup)
+    elif args.serve:
+        serve(args.serve, args.workers, args.layout, args.requests)
+    else:
+        print(json.dumps(run(args.workers, args.runs, args.feature_size, args.requests), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""CPU time per image of the tiered early-exit model against the single-stage model.
+
+Run from the repository root:
+    python -m benchmarks.bench_tiered models/tiered-XXXX.npz [--cache dataset/cache] [--batch-size 16]
+Both models are evaluated on the same dataset cache images; the single-stage
+model is the tiered artifact's full-resolution disease head.
+"""
+import argparse
+import json
+import os
+import time
+
+from dataset_ingest import DatasetStore
+from model import TieredDiseaseModel
+
+
+def run(model, store, split, batch_size, limit, input_size):
+    correct = 0
+    total = 0
+    cpu_seconds = 0.0
+    for images, labels in store.iter_batches(batch_size, split=split, limit=limit):
+        if input_size and images.shape[1] != input_size:
+            # Upscale the cached images to the serving resolution
+            repeat = input_size // images.shape[1]
+            images = images.repeat(repeat, axis=1).repeat(repeat, axis=2)
+        started = time.process_time()
+        predicted = model.predict_batch(images).argmax(axis=1)
+        cpu_seconds += time.process_time() - started
+        correct += int((predicted == labels).sum())
+        total += len(labels)
+    return {
+        'images': total,
+        'accuracy': round(correct / total, 4),
+        'cpu_ms_per_image': round(cpu_seconds / total * 1000.0, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('model')
+    parser.add_argument('--cache', default=os.path.join('dataset', 'cache'))
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--limit', type=int, default=4096)
+    parser.add_argument('--input-size', type=int, default=224,
+                        help='Upscale cached images to this size (0 keeps the cache size)')
+    args = parser.parse_args()
+
+    store = DatasetStore(args.cache)
+    split = 'valid' if len(store.indices('valid')) else None
+    tiered = TieredDiseaseModel.load(args.model)
+
+    single = run(tiered.disease_model, store, split, args.batch_size, args.limit, args.input_size)
+    cascade = run(tiered, store, split, args.batch_size, args.limit, args.input_size)
+    cascade.update(tiered.stats())
+    print(json.dumps({
+        'single_stage': single,
+        'tiered': cascade,
+        'cpu_speedup': round(single['cpu_ms_per_image'] / cascade['cpu_ms_per_image'], 2),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
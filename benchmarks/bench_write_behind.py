@@ -0,0 +1,110 @@
+"""Chat POST throughput with synchronous commits vs the write-behind buffer.
+
+Run from the repository root:  python -m benchmarks.bench_write_behind
+Each mode runs in a fresh process against a throwaway SQLite database.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+def run_mode(threads, seconds):
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+    from werkzeug.security import generate_password_hash
+
+    from app import User, create_app, db
+    from migrate import upgrade
+
+    commits = [0]
+
+    @event.listens_for(Session, 'after_commit')
+    def count_commit(session):
+        commits[0] += 1
+
+    app = create_app()
+    audit_log = app.extensions['smartagri'].audit_log
+    upgrade(app=app)
+    with app.app_context():
+        for i in range(threads):
+            db.session.add(User(
+                username=f'bench{i}', email=f'bench{i}@example.com',
+                password_hash=generate_password_hash('bench', method='pbkdf2:sha256:1000')
+            ))
+        db.session.commit()
+
+    clients = []
+    for i in range(threads):
+        client = app.test_client()
+        client.post('/login', data={'username': f'bench{i}', 'password': 'bench'})
+        clients.append(client)
+
+    counts = [0] * threads
+    errors = [0] * threads
+    stop = threading.Event()
+
+    def worker(index):
+        client = clients[index]
+        while not stop.is_set():
+            response = client.post('/chat', data={'message': 'how do I treat blight?'})
+            if response.status_code == 200:
+                counts[index] += 1
+            else:
+                errors[index] += 1
+
+    commits_before = commits[0]
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+    audit_log.close()
+
+    requests = sum(counts)
+    return {
+        'write_behind': audit_log.enabled,
+        'threads': threads,
+        'requests': requests,
+        'errors': sum(errors),
+        'requests_per_second': round(requests / elapsed, 1),
+        'commits_per_request': round((commits[0] - commits_before) / requests, 4) if requests else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args.threads, args.seconds)))
+        return
+
+    results = []
+    for enabled in ('0', '1'):
+        with tempfile.TemporaryDirectory() as workdir:
+            env = dict(os.environ,
+                       DATABASE_URL='sqlite:///' + os.path.join(workdir, 'bench.db'),
+                       DATABASE_MODE='production',
+                       WRITE_BEHIND_ENABLED=enabled)
+            output = subprocess.check_output([
+                sys.executable, '-m', 'benchmarks.bench_write_behind', '--child',
+                '--threads', str(args.threads), '--seconds', str(args.seconds),
+            ], env=env)
+            results.append(json.loads(output.decode().strip().splitlines()[-1]))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Shared setup for the offline benchmark suite.
+
+Every benchmark imports the app against a throwaway SQLite database and
+upload folder, with seeded randomness and no network access.
+"""
+import io
+import os
+import random
+
+import numpy as np
+from PIL import Image
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentiles(seconds, points=(50, 95, 99)):
+    """Latency percentiles in milliseconds from a list of durations in seconds"""
+    if not seconds:
+        return {f'p{point}_ms': None for point in points}
+    values = np.sort(np.asarray(seconds)) * 1000.0
+    result = {f'p{point}_ms': round(float(np.percentile(values, point)), 3) for point in points}
+    result['max_ms'] = round(float(values[-1]), 3)
+    return result
+
+
+def make_jpeg(seed, size=(640, 480)):
+    """Deterministic leaf-coloured JPEG, distinct per seed"""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    base = np.array([40, 120 + seed % 60, 30], dtype=np.float32)
+    pixels = np.clip(base + rng.normal(0, 25, (height // 8, width // 8, 3)), 0, 255).astype(np.uint8)
+    out = io.BytesIO()
+    Image.fromarray(pixels).resize(size, Image.BILINEAR).save(out, 'JPEG', quality=90)
+    return out.getvalue()
+
+
+def benchmark_model(path=None, seed=0, feature_size=8):
+    """The artifact at ``path``, or a linear model with seeded random weights (default shape: 8x8 pooling)"""
+    from model import DISEASE_CLASSES, LinearDiseaseModel
+    if path:
+        return LinearDiseaseModel.load(path)
+    rng = np.random.default_rng(seed)
+    features = feature_size * feature_size * 3
+    return LinearDiseaseModel(
+        (rng.standard_normal((features, len(DISEASE_CLASSES))) * 0.1).astype(np.float32),
+        np.zeros(len(DISEASE_CLASSES), dtype=np.float32),
+        np.full(features, 0.5, dtype=np.float32), np.full(features, 0.2, dtype=np.float32),
+        feature_size, f'bench-random-{seed}'
+    )
+
+
+def bench_config(workdir, **overrides):
+    """Config with the database, uploads and models/ directory under ``workdir``"""
+    from config import Config
+
+    settings = {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(workdir, 'bench.db'),
+        'DATABASE_MODE': os.environ.get('DATABASE_MODE', 'production'),
+        'UPLOAD_FOLDER': os.path.join(workdir, 'uploads'),
+        # Keep the registry away from any real models/ directory
+        'MODELS_FOLDER': os.path.join(workdir, 'models'),
+    }
+    settings.update(overrides)
+    return type('BenchConfig', (Config,), settings)
+
+
+def create_bench_app(config):
+    """create_app(config), finding the templates wherever the checkout keeps them - returns its services"""
+    from app import create_app
+
+    app = create_app(config)
+    if not os.path.isdir(os.path.join(REPO_ROOT, 'templates')):
+        app.template_folder = REPO_ROOT
+    return app.extensions['smartagri']
+
+
+def load_app(workdir, model_path=None, seed=0, **overrides):
+    """Build the app against migrated state under ``workdir`` and return its services"""
+    random.seed(seed)
+    np.random.seed(seed)
+
+    from migrate import upgrade
+
+    smartagri = create_bench_app(bench_config(workdir, **overrides))
+    smartagri.disease_model.swap_model(benchmark_model(model_path, seed))
+    upgrade(app=smartagri.app)
+    return smartagri
+
+
+def create_users(smartagri, count, prefix='bench'):
+    """Synthetic users with cheap password hashes - returns their usernames"""
+    from werkzeug.security import generate_password_hash
+
+    from app import User, db
+    names = [f'{prefix}{i}' for i in range(count)]
+    with smartagri.app.app_context():
+        for name in names:
+            db.session.add(User(
+                username=name, email=f'{name}@example.com',
+                password_hash=generate_password_hash('bench', method='pbkdf2:sha256:1000')
+            ))
+        db.session.commit()
+    return names
@@ -0,0 +1,196 @@
+"""End-to-end load test: synthetic users drive every page concurrently.
+
+Run from the repository root:  python -m benchmarks.load_test [--users 8] [--seconds 10]
+
+Each synthetic user logs in with its own Flask test client and loops over
+a weighted mix of /disease-detection, /take-photo, /chat, /dashboard and
+/recommendations. Reports throughput and latency percentiles per route,
+plus database wait time.
+
+SQLite has no lock-wait counter. With WAL, readers never block, and a
+writer waits for the write lock (up to busy_timeout) inside its first
+write statement. So the time spent in INSERT/UPDATE/DELETE statements is
+reported as the write wait, alongside the count of "database is locked"
+errors.
+"""
+import argparse
+import io
+import json
+import random
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import event
+
+from benchmarks.common import create_users, load_app, make_jpeg, percentiles
+
+# (name, weight) - roughly what a farmer does per session
+ROUTE_MIX = [
+    ('dashboard', 3),
+    ('chat', 3),
+    ('recommendations', 2),
+    ('take_photo', 1),
+    ('disease_detection', 1),
+]
+CHAT_MESSAGES = ['hello', 'how do I treat blight?', 'my leaves have yellow spots', 'which fertilizer?',
+                 'is my plant healthy', 'pests on my corn']
+SEARCH_TERMS = ['blight', 'rust', 'mildew', 'spot', 'Tomato', 'xyz']
+
+
+class DatabaseWaits:
+    """Statement and write timings from SQLAlchemy engine events"""
+
+    _WRITES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+    def __init__(self, engine):
+        self._lock = threading.Lock()
+        self.reads = []
+        self.writes = []
+        self.lock_errors = 0
+        event.listen(engine, 'before_cursor_execute', self._before)
+        event.listen(engine, 'after_cursor_execute', self._after)
+        event.listen(engine, 'handle_error', self._error)
+
+    def reset(self):
+        with self._lock:
+            self.reads = []
+            self.writes = []
+            self.lock_errors = 0
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info['bench_started'] = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop('bench_started', time.perf_counter())
+        is_write = statement.lstrip()[:7].upper().startswith(self._WRITES)
+        with self._lock:
+            (self.writes if is_write else self.reads).append(elapsed)
+
+    def _error(self, context):
+        if 'database is locked' in str(context.original_exception):
+            with self._lock:
+                self.lock_errors += 1
+
+    def summary(self, requests):
+        with self._lock:
+            return {
+                'queries_per_request': round((len(self.reads) + len(self.writes)) / requests, 2) if requests else None,
+                'read_statements': len(self.reads),
+                'write_statements': len(self.writes),
+                'write_wait_ms_total': round(sum(self.writes) * 1000.0, 1),
+                'write_wait': percentiles(self.writes),
+                'lock_errors': self.lock_errors,
+            }
+
+
+def user_loop(client, rng, images, stop, timings, errors):
+    names = [name for name, weight in ROUTE_MIX]
+    weights = [weight for name, weight in ROUTE_MIX]
+    while not stop.is_set():
+        route = rng.choices(names, weights)[0]
+        started = time.perf_counter()
+        if route == 'dashboard':
+            response = client.get('/dashboard')
+        elif route == 'chat':
+            response = client.post('/chat', data={'message': rng.choice(CHAT_MESSAGES)})
+        elif route == 'recommendations':
+            response = client.get('/recommendations', query_string={'disease': rng.choice(SEARCH_TERMS)})
+        elif route == 'take_photo':
+            response = client.post('/take-photo', data={'photo': (images.pick(rng), 'camera_photo.jpg')})
+        else:
+            response = client.post('/disease-detection', data={'file': (images.pick(rng), 'leaf.jpg')},
+                                   content_type='multipart/form-data')
+        elapsed = time.perf_counter() - started
+        timings[route].append(elapsed)
+        if response.status_code >= 400:
+            errors[route] += 1
+
+
+class ImagePool:
+    """A fixed set of distinct JPEGs - repeats exercise the caches and dedup like real re-uploads"""
+
+    def __init__(self, count):
+        self.images = [make_jpeg(seed) for seed in range(count)]
+
+    def pick(self, rng):
+        return io.BytesIO(rng.choice(self.images))
+
+
+def run(users, seconds, distinct_images, model_path=None, seed=0):
+    from app import db
+
+    with tempfile.TemporaryDirectory() as workdir:
+        smartagri = load_app(workdir, model_path, seed)
+        with smartagri.app.app_context():
+            waits = DatabaseWaits(db.engine)
+
+        clients = []
+        for name in create_users(smartagri, users):
+            client = smartagri.app.test_client()
+            client.post('/login', data={'username': name, 'password': 'bench'})
+            clients.append(client)
+        images = ImagePool(distinct_images)
+
+        timings = [defaultdict(list) for _ in range(users)]
+        errors = [defaultdict(int) for _ in range(users)]
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=user_loop, args=(clients[i], random.Random(seed + i), images, stop,
+                                                     timings[i], errors[i]))
+            for i in range(users)
+        ]
+        waits.reset()  # leave out setup and logins
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        smartagri.audit_log.flush()
+        smartagri.upload_store.flush(10)
+
+        routes = {}
+        total = 0
+        for name, weight in ROUTE_MIX:
+            durations = [d for per_user in timings for d in per_user[name]]
+            total += len(durations)
+            routes[name] = dict(
+                requests=len(durations),
+                errors=sum(per_user[name] for per_user in errors),
+                requests_per_second=round(len(durations) / elapsed, 1),
+                **percentiles(durations)
+            )
+        all_durations = [d for per_user in timings for durations in per_user.values() for d in durations]
+        result = {
+            'users': users,
+            'seconds': round(elapsed, 2),
+            'requests': total,
+            'errors': sum(sum(per_user.values()) for per_user in errors),
+            'requests_per_second': round(total / elapsed, 1),
+            'latency': percentiles(all_durations),
+            'routes': routes,
+            'database': waits.summary(total),
+        }
+        smartagri.disease_model.close()
+        smartagri.audit_log.close()
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--images', type=int, default=32, help='Distinct images in the upload pool')
+    parser.add_argument('--model', help='Model artifact (default: seeded random weights)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(run(args.users, args.seconds, args.images, args.model, args.seed), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Run the offline benchmark suite and save the results for comparison between commits.
+
+Run from the repository root:
+    python -m benchmarks.run_suite [--quick] [--output benchmarks/results/<commit>.json]
+    python -m benchmarks.run_suite --compare benchmarks/results/OLD.json [--threshold 0.1]
+
+Each benchmark runs in its own process against throwaway state. With
+--compare, every throughput and latency figure is compared with the older
+result file; the exit status is 1 if any moved the wrong way by more than
+--threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from benchmarks.common import REPO_ROOT
+
+SUITE = {
+    'micro': ['benchmarks.bench_micro'],
+    'load': ['benchmarks.load_test'],
+    'auth': ['benchmarks.bench_auth'],
+    'startup': ['benchmarks.bench_startup'],
+}
+QUICK_ARGS = {
+    'micro': ['--seconds', '0.3'],
+    'load': ['--users', '4', '--seconds', '3'],
+    'auth': ['--seconds', '0.5', '--views', '10'],
+    'startup': ['--runs', '2', '--workers', '2', '--requests', '3'],
+}
+
+
+def git(*args):
+    try:
+        return subprocess.check_output(['git', *args], cwd=REPO_ROOT, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(name, quick):
+    command = [sys.executable, '-m', *SUITE[name], *(QUICK_ARGS[name] if quick else [])]
+    output = subprocess.check_output(command, cwd=REPO_ROOT).decode()
+    # The app prints start-up messages before the JSON document
+    return json.loads(output[output.index('{'):])
+
+
+def flatten(results, prefix=''):
+    for key, value in results.items():
+        path = f'{prefix}.{key}' if prefix else key
+        if isinstance(value, dict):
+            yield from flatten(value, path)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, value
+
+
+def direction(path):
+    """+1 if a bigger value is better, -1 if smaller is better, 0 if not a performance figure"""
+    leaf = path.rsplit('.', 1)[-1]
+    if leaf.endswith('per_second'):
+        return 1
+    if leaf.endswith('_ms') or leaf.startswith('us_per_call') or leaf == 'write_wait_ms_total':
+        return -1
+    if leaf in ('errors', 'lock_errors', 'queries_per_request'):
+        return -1
+    return 0
+
+
+def compare(old, new, threshold):
+    """Print changes in the performance figures - returns the regressed paths"""
+    old_values = dict(flatten(old['results']))
+    regressions = []
+    print(f"{'metric':<60} {'old':>12} {'new':>12} {'change':>8}")
+    for path, value in flatten(new['results']):
+        better = direction(path)
+        if not better or path not in old_values:
+            continue
+        before = old_values[path]
+        change = (value - before) / before if before else (0.0 if value == before else float('inf'))
+        regressed = change * better < -threshold
+        if regressed:
+            regressions.append(path)
+        marker = '  ❌' if regressed else ''
+        print(f"{path:<60} {before:>12g} {value:>12g} {change:>+8.1%}{marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', choices=sorted(SUITE), action='append', help='Run only these benchmarks')
+    parser.add_argument('--quick', action='store_true', help='Short runs for a smoke check')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', help='Older result file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='Relative change counted as a regression')
+    args = parser.parse_args()
+
+    commit = git('rev-parse', '--short', 'HEAD')
+    report = {
+        'commit': commit,
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'quick': args.quick,
+        'platform': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'system': platform.system(),
+            'cpus': os.cpu_count(),
+        },
+        'results': {},
+    }
+    for name in args.only or SUITE:
+        print(f"🔄 Running {name} benchmarks", file=sys.stderr)
+        report['results'][name] = run_benchmark(name, args.quick)
+
+    output = args.output or os.path.join(REPO_ROOT, 'benchmarks', 'results', f'{commit or "unknown"}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results saved to {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regressions beyond {args.threshold:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
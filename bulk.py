@@ -0,0 +1,156 @@
+import csv
+import io
+import json
+import os
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+REPORT_FIELDS = ['image', 'prediction', 'confidence', 'treatment', 'error']
+
+
+class ArchiveTooLarge(ValueError):
+    """A zip archive or multi-file upload exceeds the bulk upload limits"""
+
+
+def _allowed(name, extensions):
+    return '.' in name and name.rsplit('.', 1)[1].lower() in extensions
+
+
+def iter_zip_images(fileobj, extensions, max_images=None, max_image_bytes=None, max_total_bytes=None):
+    """Yield (name, bytes) for every image in a zip archive, one member at a time.
+
+    The limits are checked against the sizes in the archive's central
+    directory before any member is decompressed, and raise ArchiveTooLarge.
+    zipfile never inflates a member past its declared size, so a header that
+    understates it fails the CRC check instead of exhausting memory.
+    """
+    with zipfile.ZipFile(fileobj) as archive:
+        members = [info for info in archive.infolist()
+                   if not info.is_dir() and _allowed(info.filename, extensions)]
+        if max_images is not None and len(members) > max_images:
+            raise ArchiveTooLarge(f'Archive holds {len(members)} images, the limit is {max_images}')
+        if max_image_bytes is not None:
+            for info in members:
+                if info.file_size > max_image_bytes:
+                    raise ArchiveTooLarge(f'{info.filename} is {info.file_size} bytes uncompressed, '
+                                          f'the limit is {max_image_bytes}')
+        total = sum(info.file_size for info in members)
+        if max_total_bytes is not None and total > max_total_bytes:
+            raise ArchiveTooLarge(f'Archive is {total} bytes uncompressed, the limit is {max_total_bytes}')
+
+        for info in members:
+            yield info.filename, archive.read(info)
+
+
+def _remaining(limit, used):
+    return None if limit is None else limit - used
+
+
+def iter_upload_images(files, extensions, max_images=None, max_image_bytes=None, max_total_bytes=None):
+    """Yield (name, bytes) from a multi-file upload, expanding any zip archives.
+
+    The limits cover the whole upload - plain files and archive members
+    together - and raise ArchiveTooLarge. A plain file is read no further
+    than ``max_image_bytes``.
+    """
+    count = total = 0
+    for upload in files:
+        if not upload or upload.filename == '':
+            continue
+        if upload.filename.lower().endswith('.zip'):
+            images = iter_zip_images(upload.stream, extensions, max_images=_remaining(max_images, count),
+                                     max_image_bytes=max_image_bytes,
+                                     max_total_bytes=_remaining(max_total_bytes, total))
+        elif _allowed(upload.filename, extensions):
+            if max_images is not None and count >= max_images:
+                raise ArchiveTooLarge(f'Upload holds more than {max_images} images')
+            data = upload.stream.read(-1 if max_image_bytes is None else max_image_bytes + 1)
+            if max_image_bytes is not None and len(data) > max_image_bytes:
+                raise ArchiveTooLarge(f'{upload.filename} is over the limit of {max_image_bytes} bytes')
+            if max_total_bytes is not None and total + len(data) > max_total_bytes:
+                raise ArchiveTooLarge(f'Upload is over the limit of {max_total_bytes} bytes')
+            images = [(upload.filename, data)]
+        else:
+            continue
+        for name, data in images:
+            count += 1
+            total += len(data)
+            yield name, data
+
+
+def iter_directory_images(directory, extensions):
+    """Yield (relative path, bytes) for every image below a directory"""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if _allowed(name, extensions):
+                path = os.path.join(root, name)
+                with open(path, 'rb') as f:
+                    yield os.path.relpath(path, directory), f.read()
+
+
+def run_parallel(images, diagnose, workers=None):
+    """Run ``diagnose(name, data)`` over (name, bytes) pairs on a thread pool.
+
+    Results are yielded in input order. At most a few images per worker are
+    held in memory, so arbitrarily large surveys stream through. Concurrent
+    calls land in the same inference batches.
+    """
+    workers = workers or (os.cpu_count() or 1) * 2
+    window = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bulk') as executor:
+        for name, data in images:
+            window.append((name, executor.submit(diagnose, name, data)))
+            if len(window) >= workers * 4:
+                yield _collect(*window.popleft())
+        while window:
+            yield _collect(*window.popleft())
+
+
+def _collect(name, future):
+    try:
+        return dict(future.result(), image=name, error=None)
+    except Exception as e:
+        return {'image': name, 'prediction': None, 'confidence': None, 'treatment': None, 'error': str(e)}
+
+
+class Throughput:
+    """Wall-clock throughput of one bulk run"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.images = 0
+        self.failed = 0
+
+    def add(self, result):
+        self.images += 1
+        if result['error']:
+            self.failed += 1
+
+    def summary(self):
+        seconds = time.perf_counter() - self.started
+        return {
+            'images': self.images,
+            'failed': self.failed,
+            'seconds': round(seconds, 3),
+            'images_per_second': round(self.images / seconds, 2) if seconds > 0 else 0.0,
+        }
+
+
+def write_report(results, summary, fmt, out):
+    """Write a per-image report as CSV or JSON to a text stream"""
+    if fmt == 'csv':
+        writer = csv.DictWriter(out, fieldnames=REPORT_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(results)
+    else:
+        json.dump({'summary': summary, 'results': results}, out, indent=2)
+        out.write('\n')
+
+
+def render_report(results, summary, fmt):
+    out = io.StringIO()
+    write_report(results, summary, fmt, out)
+    return out.getvalue()
@@ -0,0 +1,50 @@
+"""Diagnose every leaf photo in a directory and save the results.
+
+Usage:  python bulk_diagnose.py SURVEY_DIR --user USERNAME [--format csv|json] [--output FILE]
+"""
+import argparse
+import sys
+
+from app import create_app, User, diagnose_bulk
+from bulk import iter_directory_images, write_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk plant disease diagnosis for field surveys')
+    parser.add_argument('directory', help='Folder of leaf images (searched recursively)')
+    parser.add_argument('--user', required=True, help='Username or email the detections belong to')
+    parser.add_argument('--format', choices=['csv', 'json'], default='csv')
+    parser.add_argument('--output', help='Report file (default: stdout)')
+    parser.add_argument('--workers', type=int, help='Parallel decode/predict workers (default: 2 x CPU cores)')
+    args = parser.parse_args()
+
+    app = create_app()
+    # No request starts the background loader here, so load the model up front
+    model_registry = app.extensions['smartagri'].model_registry
+    model_registry.load_latest()
+    if model_registry.last_error:
+        print(f"❌ Could not load the model: {model_registry.last_error}", file=sys.stderr)
+        return 1
+
+    with app.app_context():
+        user = User.query.filter((User.username == args.user) | (User.email == args.user)).first()
+        if user is None:
+            print(f"❌ Unknown user: {args.user}", file=sys.stderr)
+            return 1
+
+        images = iter_directory_images(args.directory, app.config['ALLOWED_EXTENSIONS'])
+        results, summary = diagnose_bulk(user.id, images, workers=args.workers)
+
+    if args.output:
+        with open(args.output, 'w', newline='') as out:
+            write_report(results, summary, args.format, out)
+    else:
+        write_report(results, summary, args.format, sys.stdout)
+
+    print(f"✅ {summary['images']} images ({summary['failed']} failed) in {summary['seconds']}s "
+          f"- {summary['images_per_second']} images/sec", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
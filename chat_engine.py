@@ -0,0 +1,84 @@
+import json
+import os
+import re
+
+DEFAULT_RESPONSE = 'I can help with plant disease diagnosis. Please upload an image or ask specific questions.'
+
+
+def _trie_pattern(node):
+    """Regex for all words stored in a character trie, sharing common prefixes"""
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch != '']
+    if not branches:
+        return ''
+    end = '' in node
+    if len(branches) == 1 and not end:
+        return branches[0]
+    body = '(?:' + '|'.join(branches) + ')'
+    return body + '?' if end else body
+
+
+def compile_keywords(keywords):
+    """Compile keywords into one whole-word regex (so 'hi' never matches 'this')"""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+    return re.compile(r'(?<!\w)' + _trie_pattern(trie) + r'(?!\w)')
+
+
+class LanguageIntents:
+    """Intent vocabulary of one language, compiled once"""
+
+    def __init__(self, intents, default=None):
+        self.default = default
+        self.responses = []
+        self.priority = {}
+        for priority, intent in enumerate(intents):
+            self.responses.append(intent['response'])
+            for keyword in intent['keywords']:
+                # Earlier intents win, as in the order of the data file
+                self.priority.setdefault(keyword.lower(), priority)
+        self.pattern = compile_keywords(self.priority) if self.priority else None
+
+    def match(self, message):
+        """Return the response of the highest-priority intent in the message, or None"""
+        if self.pattern is None:
+            return None
+        best = None
+        for m in self.pattern.finditer(message.lower()):
+            priority = self.priority[m.group()]
+            if best is None or priority < best:
+                best = priority
+                if best == 0:
+                    break
+        return None if best is None else self.responses[best]
+
+
+class ChatEngine:
+    def __init__(self, languages, fallback_language='en'):
+        self.languages = languages
+        self.fallback_language = fallback_language
+
+    @classmethod
+    def from_directory(cls, path, fallback_language='en'):
+        """Load one ``<language>.json`` intent table per language from a directory"""
+        languages = {}
+        for filename in sorted(os.listdir(path)):
+            language, ext = os.path.splitext(filename)
+            if ext != '.json':
+                continue
+            with open(os.path.join(path, filename), encoding='utf-8') as f:
+                data = json.load(f)
+            languages[language] = LanguageIntents(data['intents'], data.get('default'))
+        return cls(languages, fallback_language)
+
+    def respond(self, message, language='en'):
+        intents = self.languages.get(language) or self.languages.get(self.fallback_language)
+        if intents is None:
+            return DEFAULT_RESPONSE
+        response = intents.match(message)
+        if response is not None:
+            return response
+        return intents.default or DEFAULT_RESPONSE
@@ -0,0 +1,45 @@
+"""Retention and compaction for the content-addressed upload store.
+
+Usage:  python compact_uploads.py [--retention-days N] [--grace-hours 1] [--dry-run]
+
+Removes stored images no detection references any more, originals older than
+the retention period (their thumbnails are kept for history pages), leftover
+temp files and empty shard directories. Safe to run from cron while the app
+is serving: uploads younger than the grace period are never touched.
+"""
+import argparse
+import os
+
+from app import create_app, db, DetectionHistory
+
+
+def shard_keys(shard):
+    """Content keys of the stored images in one ``ab/cd`` shard that detections point at"""
+    # '0' sorts right after '/', so this range is every path under the shard - served by the image_path index
+    query = db.session.query(DetectionHistory.image_path).filter(
+        DetectionHistory.image_path >= shard + '/', DetectionHistory.image_path < shard + '0')
+    return {os.path.splitext(os.path.basename(image_path))[0] for (image_path,) in query}
+
+
+def main():
+    app = create_app()
+    parser = argparse.ArgumentParser(description='Compact the upload store')
+    parser.add_argument('--retention-days', type=float, default=app.config['UPLOAD_RETENTION_DAYS'],
+                        help='Delete originals not uploaded again for this many days')
+    parser.add_argument('--grace-hours', type=float, default=1.0,
+                        help='Never touch files younger than this')
+    parser.add_argument('--dry-run', action='store_true', help='Only report what would be removed')
+    args = parser.parse_args()
+
+    upload_store = app.extensions['smartagri'].upload_store
+    with app.app_context():
+        summary = upload_store.compact(shard_keys, retention_days=args.retention_days,
+                                       grace_seconds=args.grace_hours * 3600, dry_run=args.dry_run)
+    verb = 'Would remove' if args.dry_run else 'Removed'
+    print(f"✅ Scanned {summary['scanned']} originals. {verb} {summary['orphans']} unreferenced, "
+          f"{summary['expired']} past retention, {summary['thumbnails']} thumbnails and "
+          f"{summary['temp_files']} temp files ({summary['bytes_freed'] / 1024 / 1024:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,17 +5,102 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'smartagridoctor-secret-key-2024'
     
     # Use SQLite instead of MySQL
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///smartagridoctor.db'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///smartagridoctor.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # 'production' turns on WAL, busy_timeout and a sized connection pool
+    DATABASE_MODE = os.environ.get('DATABASE_MODE', 'development')
+    SQLITE_SYNCHRONOUS = 'NORMAL'
+    SQLITE_BUSY_TIMEOUT_MS = 5000
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = 30  # seconds
+    
+    # Write-behind for audit/history rows
+    WRITE_BEHIND_ENABLED = os.environ.get('WRITE_BEHIND_ENABLED', '1') == '1'
+    WRITE_BEHIND_MAX_ROWS = 200
+    WRITE_BEHIND_MAX_DELAY = 0.5  # seconds
+    # Allowance for a batch to commit after MAX_DELAY - a user's reads on other workers wait this long for their writes
+    WRITE_BEHIND_COMMIT_SECONDS = 0.25
+    WRITE_BEHIND_MAX_RETRIES = 5  # lock-contention retries before a batch is split and bad rows dropped
+    WRITE_BEHIND_MAX_QUEUE = 10000  # queued rows before writes are committed inline
+    
+    # Instrumentation exported on /metrics
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    METRICS_PROFILE_RATE = float(os.environ.get('METRICS_PROFILE_RATE', 0))  # fraction of requests dumped as cProfile stats
+    METRICS_PROFILE_DIR = 'profiles/'
+    
+    # Weeks of detection trend shown on the dashboard
+    DASHBOARD_WEEKS = 8
+    
+    # History APIs
+    API_MAX_PAGE_SIZE = 200
+    EXPORT_BATCH_SIZE = 500  # rows fetched per server-side cursor batch
+    
+    # Authentication
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')  # older hashes are upgraded at login
+    USER_CACHE_TTL = 60  # seconds, 0 disables the load_user cache
+    USER_CACHE_SIZE = 10000
+    
     # Session configuration
     PERMANENT_SESSION_LIFETIME = timedelta(days=1)
     
     # File upload configuration
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size (bulk detection has its own limit)
     UPLOAD_FOLDER = 'static/uploads/'
+    UPLOAD_THUMBNAIL_SIZES = {'small': 96, 'medium': 320}  # px, longest side
+    UPLOAD_RETENTION_DAYS = None  # days to keep originals, None keeps them forever
+    UPLOAD_MAX_PENDING = 64  # queued background writes before uploads are written inline
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
     
+    # Bulk detection - uploads over these limits are rejected, zip archives before decompression
+    BULK_MAX_UPLOAD_BYTES = int(os.environ.get('BULK_MAX_UPLOAD_BYTES', 512 * 1024 * 1024))  # request body
+    BULK_MAX_IMAGES = int(os.environ.get('BULK_MAX_IMAGES', 2000))
+    BULK_MAX_IMAGE_BYTES = 16 * 1024 * 1024  # uncompressed, per image
+    BULK_MAX_ARCHIVE_BYTES = 1024 * 1024 * 1024  # uncompressed, all images together
+    
+    # Batched inference configuration
+    INFERENCE_MAX_BATCH_SIZE = int(os.environ.get('INFERENCE_MAX_BATCH_SIZE', 16))
+    INFERENCE_MAX_WAIT_MS = float(os.environ.get('INFERENCE_MAX_WAIT_MS', 5))
+    INFERENCE_TIMEOUT = float(os.environ.get('INFERENCE_TIMEOUT', 30))  # seconds a request waits for its batch
+    MODEL_INPUT_SIZE = (224, 224)
+    
+    # Model registry - artifacts in MODELS_FOLDER are loaded in the background
+    MODELS_FOLDER = 'models/'
+    MODEL_WARMUP_RUNS = 3
+    MODEL_POLL_SECONDS = int(os.environ.get('MODEL_POLL_SECONDS', 30))  # 0 disables hot-swap polling
+    # How long a request waits for the first artifact to load before answering 503
+    MODEL_READY_TIMEOUT = float(os.environ.get('MODEL_READY_TIMEOUT', 10))
+    # float32, float16 or int8 - memory only: the reduced modes shrink the weights but run
+    # slower than float32 in numpy. int8 needs a calibrated artifact (quantize_model.py)
+    INFERENCE_PRECISION = os.environ.get('INFERENCE_PRECISION', 'float32')
+    # Load the newest artifact in create_app(), before a pre-forking server forks its workers
+    MODEL_PRELOAD = os.environ.get('MODEL_PRELOAD', '0') == '1'
+    # Memory-map float32 weights so every worker shares one copy through the page cache
+    MODEL_MMAP = os.environ.get('MODEL_MMAP', '0') == '1'
+    
+    # Prediction cache configuration
+    PREDICTION_CACHE_SIZE = 4096
+    PREDICTION_CACHE_TTL = 3600  # seconds
+    # Near-duplicate matching reuses a user's own result for a burst of near-identical camera
+    # frames: set a difference-hash distance (e.g. 4) to turn it on. Frames must also match
+    # in colour (per-channel means, 0-1 scale) and come within the window
+    PREDICTION_CACHE_PHASH_DISTANCE = None
+    PREDICTION_CACHE_COLOUR_DISTANCE = 0.04
+    PREDICTION_CACHE_NEAR_DUPLICATE_SECONDS = 60
+    PREDICTION_TOP_K = 3
+    
+    # Asynchronous detection jobs
+    DETECTION_JOB_WORKERS = int(os.environ.get('DETECTION_JOB_WORKERS', 4))
+    DETECTION_JOB_MAX_PENDING = int(os.environ.get('DETECTION_JOB_MAX_PENDING', 32))  # queued or running, per process
+    DETECTION_JOB_TIMEOUT = 300  # seconds - unfinished jobs are reported failed after this
+    DETECTION_JOB_TTL = 3600  # seconds - job rows older than this are deleted
+    DETECTION_JOB_POLL_SECONDS = 0.5  # how often the events stream re-reads a job
+    DETECTION_JOB_STREAM_SECONDS = 30  # the events stream closes after this and the client polls instead
+    
+    # Chat intent tables, one <language>.json per language
+    CHAT_INTENTS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chat_intents')
+    
     # Kaggle configuration
     KAGGLE_USERNAME = 'mbthimma'
     KAGGLE_KEY = 'a602783497ca800ac5941e349fbe3e5e'
\ No newline at end of file
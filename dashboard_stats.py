@@ -0,0 +1,117 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert
+
+DETECTION_FIELDS = ('user_id', 'predicted_disease', 'confidence', 'detection_time')
+
+
+def week_start(moment):
+    """Monday of the week a detection falls in"""
+    day = moment.date() if isinstance(moment, datetime) else moment
+    return day - timedelta(days=day.weekday())
+
+
+def detection_values(row):
+    """Summary-relevant fields of a DetectionHistory row"""
+    return {field: getattr(row, field) for field in DETECTION_FIELDS}
+
+
+def aggregate(detections):
+    """Fold detection dicts into per-(user, disease) and per-(user, week) deltas"""
+    by_disease = {}
+    by_week = {}
+    for d in detections:
+        confidence = float(d.get('confidence') or 0.0)
+        detected = d.get('detection_time') or datetime.utcnow()
+
+        entry = by_disease.setdefault((d['user_id'], d['predicted_disease']),
+                                      {'detections': 0, 'confidence_total': 0.0, 'last_detected': detected})
+        entry['detections'] += 1
+        entry['confidence_total'] += confidence
+        entry['last_detected'] = max(entry['last_detected'], detected)
+
+        entry = by_week.setdefault((d['user_id'], week_start(detected)), {'detections': 0, 'confidence_total': 0.0})
+        entry['detections'] += 1
+        entry['confidence_total'] += confidence
+    return by_disease, by_week
+
+
+def apply_detections(session, summary_model, weekly_model, detections):
+    """Add a batch of new detections to the summary tables (inside the caller's transaction)"""
+    by_disease, by_week = aggregate(detections)
+    if by_disease:
+        table = summary_model.__table__
+        stmt = insert(table)
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.predicted_disease],
+            set_={
+                'detections': table.c.detections + stmt.excluded.detections,
+                'confidence_total': table.c.confidence_total + stmt.excluded.confidence_total,
+                'last_detected': func.max(table.c.last_detected, stmt.excluded.last_detected),
+            }
+        ), [dict(values, user_id=user_id, predicted_disease=disease)
+            for (user_id, disease), values in by_disease.items()])
+    if by_week:
+        table = weekly_model.__table__
+        stmt = insert(table)
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.week_start],
+            set_={
+                'detections': table.c.detections + stmt.excluded.detections,
+                'confidence_total': table.c.confidence_total + stmt.excluded.confidence_total,
+            }
+        ), [dict(values, user_id=user_id, week_start=week)
+            for (user_id, week), values in by_week.items()])
+
+
+def rebuild(session, history_model, summary_model, weekly_model, batch_size=5000):
+    """Recompute all summaries from the full detection history"""
+    session.execute(summary_model.__table__.delete())
+    session.execute(weekly_model.__table__.delete())
+    columns = [getattr(history_model, field) for field in DETECTION_FIELDS]
+    result = session.execute(select(*columns).execution_options(yield_per=batch_size))
+    total = 0
+    for partition in result.mappings().partitions(batch_size):
+        apply_detections(session, summary_model, weekly_model, partition)
+        total += len(partition)
+    return total
+
+
+def build_dashboard(summary_rows, weekly_rows, pending=(), weeks=8, today=None):
+    """Dashboard figures from a user's summary rows plus their not-yet-written detections"""
+    by_disease, by_week = aggregate(pending)
+    diseases = {}
+    for row in summary_rows:
+        diseases[row.predicted_disease] = [row.detections, row.confidence_total]
+    for (user_id, disease), values in by_disease.items():
+        entry = diseases.setdefault(disease, [0, 0.0])
+        entry[0] += values['detections']
+        entry[1] += values['confidence_total']
+
+    total = sum(count for count, _ in diseases.values())
+    crops = {}
+    for disease, (count, _) in diseases.items():
+        crop = disease.split('___', 1)[0]
+        crops[crop] = crops.get(crop, 0) + count
+
+    first_week = week_start(today or date.today()) - timedelta(weeks=weeks - 1)
+    per_week = {first_week + timedelta(weeks=i): [0, 0.0] for i in range(weeks)}
+    for row in weekly_rows:
+        if row.week_start in per_week:
+            per_week[row.week_start] = [row.detections, row.confidence_total]
+    for (user_id, week), values in by_week.items():
+        if week in per_week:
+            per_week[week][0] += values['detections']
+            per_week[week][1] += values['confidence_total']
+
+    return {
+        'total': total,
+        'average_confidence': sum(conf for _, conf in diseases.values()) / total if total else 0.0,
+        'crops': sorted(crops.items(), key=lambda item: item[1], reverse=True),
+        'diseases': sorted(((d, c) for d, (c, _) in diseases.items()), key=lambda item: item[1], reverse=True)[:5],
+        'weeks': [
+            {'week': week, 'detections': count, 'average_confidence': conf / count if count else None}
+            for week, (count, conf) in sorted(per_week.items())
+        ],
+    }
@@ -0,0 +1,40 @@
+from sqlalchemy import event
+
+
+def engine_options(config):
+    """SQLAlchemy engine options for the configured DATABASE_MODE"""
+    if config.get('DATABASE_MODE') != 'production':
+        return {}
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+    }
+
+
+def sqlite_pragmas(config):
+    """Per-connection pragmas for the configured DATABASE_MODE"""
+    if config.get('DATABASE_MODE') != 'production':
+        return []
+    return [
+        # Readers no longer block the writer and vice versa
+        ('journal_mode', 'WAL'),
+        # Safe with WAL: only a power loss can lose the last transactions
+        ('synchronous', config['SQLITE_SYNCHRONOUS']),
+        # Wait for the write lock instead of failing with "database is locked"
+        ('busy_timeout', int(config['SQLITE_BUSY_TIMEOUT_MS'])),
+    ]
+
+
+def install_sqlite_pragmas(engine, config):
+    """Apply the production pragmas to every new SQLite connection"""
+    pragmas = sqlite_pragmas(config)
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
@@ -0,0 +1,305 @@
+"""Ingest a local plant-disease dataset into a memory-mapped training cache.
+
+Usage:  python dataset_ingest.py SOURCE [--output dataset/cache] [--size 128]
+        python dataset_ingest.py --verify dataset/cache
+
+SOURCE is a folder or zip archive laid out as ``[split/]Crop___Disease/*.jpg``
+(the Kaggle "New Plant Diseases" layout). Images are decoded and resized in a
+process pool and written as fixed-size shards of uint8 tensors with labels
+aligned to DISEASE_CLASSES. Completed shards are recorded with their SHA-256 in
+manifest.json, so an interrupted run resumes where it stopped.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from model import DISEASE_CLASSES
+from preprocessing import decode_resized
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+SPLITS = ['train', 'valid', 'test']
+MANIFEST = 'manifest.json'
+MANIFEST_VERSION = 1
+
+
+def _normalize(name):
+    name = re.sub(r'\(.*?\)', '', name.lower())
+    return re.sub(r'[^a-z0-9]+', '_', name).strip('_')
+
+
+_CLASS_KEYS = []
+for _index, _name in enumerate(DISEASE_CLASSES):
+    _crop, _disease = _name.split('___', 1)
+    _CLASS_KEYS.append((_normalize(_crop), _normalize(_disease), _index))
+
+
+def label_for(class_dir):
+    """Map a dataset class folder (e.g. 'Corn_(maize)___Common_rust_') to a DISEASE_CLASSES index"""
+    if '___' not in class_dir:
+        return None
+    crop, disease = (_normalize(part) for part in class_dir.split('___', 1))
+    for class_crop, class_disease, index in _CLASS_KEYS:
+        if crop == class_crop and (disease == class_disease or disease.startswith(class_disease + '_')):
+            return index
+    return None
+
+
+def list_entries(source):
+    """Sorted (member path, label, split) for every labelled image in a folder or zip"""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            paths = [info.filename for info in archive.infolist() if not info.is_dir()]
+    else:
+        paths = [
+            os.path.relpath(os.path.join(root, name), source).replace(os.sep, '/')
+            for root, dirs, files in os.walk(source) for name in files
+        ]
+
+    entries = []
+    skipped = 0
+    for path in sorted(paths):
+        parts = path.split('/')
+        if len(parts) < 2 or parts[-1].rsplit('.', 1)[-1].lower() not in IMAGE_EXTENSIONS:
+            continue
+        label = label_for(parts[-2])
+        if label is None:
+            skipped += 1
+            continue
+        split = next((SPLITS.index(p.lower()) for p in parts[:-2] if p.lower() in SPLITS), -1)
+        entries.append((path, label, split))
+    return entries, skipped
+
+
+def _fingerprint(entries):
+    digest = hashlib.sha256()
+    for path, label, split in entries:
+        digest.update(f'{path}\0{label}\0{split}\n'.encode())
+    return digest.hexdigest()
+
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _decode_shard(source, paths, size):
+    """Worker: decode one shard's images into a single uint8 array"""
+    width, height = size
+    images = np.empty((len(paths), height, width, 3), dtype=np.uint8)
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for i, path in enumerate(paths):
+                images[i] = decode_resized(archive.read(path), size)
+    else:
+        for i, path in enumerate(paths):
+            with open(os.path.join(source, path), 'rb') as f:
+                images[i] = decode_resized(f.read(), size)
+    return images
+
+
+def _save_atomic(path, array):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.npy')
+    with os.fdopen(fd, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def _write_manifest(output, manifest):
+    fd, tmp_path = tempfile.mkstemp(dir=output, suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(output, MANIFEST))
+
+
+def _shard_files(output, index):
+    prefix = os.path.join(output, f'shard_{index:05d}')
+    return {kind: f'{prefix}.{kind}.npy' for kind in ('images', 'labels', 'splits')}
+
+
+def _shard_ok(output, shard):
+    files = _shard_files(output, shard['index'])
+    return all(os.path.exists(path) and _sha256_file(path) == shard['sha256'][kind] for kind, path in files.items())
+
+
+def _submit_shard(executor, source, entries, index, shard_size, size):
+    chunk = entries[index * shard_size:(index + 1) * shard_size]
+    return index, chunk, executor.submit(_decode_shard, source, [path for path, _, _ in chunk], size)
+
+
+def ingest(source, output, size=(128, 128), shard_size=1024, workers=None, force=False):
+    """Decode a dataset into the shard store, skipping shards that are already done"""
+    started = time.perf_counter()
+    entries, skipped = list_entries(source)
+    if not entries:
+        raise ValueError(f'No labelled images found in {source}')
+    os.makedirs(output, exist_ok=True)
+
+    fingerprint = _fingerprint(entries)
+    manifest_path = os.path.join(output, MANIFEST)
+    manifest = None
+    if os.path.exists(manifest_path) and not force:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest['fingerprint'] != fingerprint or manifest['image_size'] != list(size) \
+                or manifest['shard_size'] != shard_size:
+            raise ValueError('Output holds a different dataset or settings - use --force to rebuild it')
+    if manifest is None:
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'source': os.path.abspath(source),
+            'fingerprint': fingerprint,
+            'image_size': list(size),
+            'shard_size': shard_size,
+            'classes': DISEASE_CLASSES,
+            'splits': SPLITS,
+            'total': len(entries),
+            'shards': [],
+        }
+
+    # Resume: keep shards whose files still match their checksums
+    done = {shard['index']: shard for shard in manifest['shards'] if _shard_ok(output, shard)}
+    manifest['shards'] = sorted(done.values(), key=lambda shard: shard['index'])
+    shard_count = (len(entries) + shard_size - 1) // shard_size
+    todo = [index for index in range(shard_count) if index not in done]
+    print(f"🔄 {len(entries)} images ({skipped} unlabelled skipped), "
+          f"{shard_count - len(todo)}/{shard_count} shards already done")
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Keep a bounded window of shards in flight so finished arrays do not pile up
+        window = deque()
+        pending = iter(todo)
+        for index in pending:
+            window.append(_submit_shard(executor, source, entries, index, shard_size, size))
+            if len(window) >= workers * 2:
+                break
+        while window:
+            index, chunk, future = window.popleft()
+            files = _shard_files(output, index)
+            _save_atomic(files['images'], future.result())
+            _save_atomic(files['labels'], np.array([label for _, label, _ in chunk], dtype=np.int16))
+            _save_atomic(files['splits'], np.array([split for _, _, split in chunk], dtype=np.int8))
+            manifest['shards'].append({
+                'index': index,
+                'count': len(chunk),
+                'sha256': {kind: _sha256_file(path) for kind, path in files.items()},
+            })
+            manifest['shards'].sort(key=lambda shard: shard['index'])
+            _write_manifest(output, manifest)
+            print(f"   shard {index + 1}/{shard_count} written")
+            for index in pending:
+                window.append(_submit_shard(executor, source, entries, index, shard_size, size))
+                break
+
+    seconds = time.perf_counter() - started
+    print(f"✅ Dataset cache ready in {output} ({seconds:.1f}s)")
+    return manifest
+
+
+class DatasetStore:
+    """Read-only view of an ingested dataset; images are memory-mapped, never decoded"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        if self.manifest['classes'] != DISEASE_CLASSES:
+            raise ValueError('Dataset labels do not match DISEASE_CLASSES - re-run the ingestion')
+        shards = self.manifest['shards']
+        if sum(shard['count'] for shard in shards) < self.manifest['total']:
+            raise ValueError('Dataset ingestion is incomplete - re-run it to resume')
+        self.images = []
+        labels = []
+        splits = []
+        for shard in shards:
+            files = _shard_files(path, shard['index'])
+            self.images.append(np.load(files['images'], mmap_mode='r'))
+            labels.append(np.load(files['labels']))
+            splits.append(np.load(files['splits']))
+        self.labels = np.concatenate(labels)
+        self.splits = np.concatenate(splits)
+        self._offsets = np.cumsum([0] + [len(images) for images in self.images])
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def image_size(self):
+        return tuple(self.manifest['image_size'])
+
+    def verify(self):
+        """Re-check every shard against its recorded SHA-256 - returns the bad shard indexes"""
+        return [shard['index'] for shard in self.manifest['shards'] if not _shard_ok(self.path, shard)]
+
+    def indices(self, split=None):
+        if split is None:
+            return np.arange(len(self))
+        return np.flatnonzero(self.splits == SPLITS.index(split))
+
+    def take(self, indices):
+        """Gather images for global indices into one uint8 batch"""
+        indices = np.asarray(indices)
+        shard_ids = np.searchsorted(self._offsets, indices, side='right') - 1
+        width, height = self.image_size
+        batch = np.empty((len(indices), height, width, 3), dtype=np.uint8)
+        for shard_id in np.unique(shard_ids):
+            mask = shard_ids == shard_id
+            batch[mask] = self.images[shard_id][indices[mask] - self._offsets[shard_id]]
+        return batch
+
+    def iter_batches(self, batch_size=64, split=None, shuffle=False, seed=0, limit=None):
+        """Yield (uint8 images, int labels) batches straight from the mmap"""
+        indices = self.indices(split)
+        if shuffle:
+            indices = np.random.default_rng(seed).permutation(indices)
+        else:
+            # Sorted order keeps reads sequential within each shard
+            indices = np.sort(indices)
+        if limit is not None:
+            indices = indices[:limit]
+        for start in range(0, len(indices), batch_size):
+            chunk = indices[start:start + batch_size]
+            yield self.take(chunk), self.labels[chunk]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the memory-mapped training cache from a local dataset')
+    parser.add_argument('source', nargs='?', help='Dataset folder or zip archive')
+    parser.add_argument('--output', default=os.path.join('dataset', 'cache'))
+    parser.add_argument('--size', type=int, default=128, help='Square image size stored in the cache')
+    parser.add_argument('--shard-size', type=int, default=1024)
+    parser.add_argument('--workers', type=int, help='Decode processes (default: CPU count)')
+    parser.add_argument('--force', action='store_true', help='Discard an existing cache built from other data')
+    parser.add_argument('--verify', metavar='CACHE', help='Only verify the checksums of an existing cache')
+    args = parser.parse_args()
+
+    if args.verify:
+        bad = DatasetStore(args.verify).verify()
+        if bad:
+            print(f"❌ Corrupt shards: {bad}")
+            return 1
+        print("✅ All shards match their checksums")
+        return 0
+
+    if not args.source:
+        parser.error('source is required')
+    ingest(args.source, args.output, size=(args.size, args.size), shard_size=args.shard_size,
+           workers=args.workers, force=args.force)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
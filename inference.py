@@ -0,0 +1,189 @@
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+from model import top_k
+
+
+class _PendingPrediction:
+    __slots__ = ('image', 'future', 'enqueued_at')
+
+    def __init__(self, image):
+        self.image = image
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class BatchedInferenceEngine:
+    """Gather concurrent predictions into one batched forward pass.
+
+    Exposes the same ``predict_disease`` interface as the wrapped model, plus
+    ``predict_top_k`` for the k most likely classes. Requests
+    arriving within ``max_wait_ms`` of the first queued one are stacked into a
+    single ``model.predict_batch`` call of at most ``max_batch_size`` images.
+    """
+
+    def __init__(self, model, max_batch_size=16, max_wait_ms=5.0, stats_window=10000):
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size must be at least 1')
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._closed = False
+
+        # Latency of the first batch after each model swap
+        self.first_batch_ms = None
+        self._awaiting_first_batch = True
+
+        # Stats
+        self._batch_sizes = Counter()
+        self._queue_waits = deque(maxlen=stats_window)
+        self._inference_seconds = 0.0
+        self._requests = 0
+        self._batches = 0
+        self._errors = 0
+
+    @property
+    def model_version(self):
+        return getattr(self.model, 'version', None)
+
+    def swap_model(self, model):
+        """Atomically replace the model - batches already running finish on the old one"""
+        with self._lock:
+            previous = self.model
+            self.model = model
+            self.first_batch_ms = None
+            self._awaiting_first_batch = True
+        return previous
+
+    def start(self):
+        """Start the batching thread (called lazily on the first request)"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Inference engine is closed')
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='inference-batcher', daemon=True)
+                self._worker.start()
+
+    def close(self, timeout=None):
+        """Stop the batching thread after the queued requests are served"""
+        with self._lock:
+            self._closed = True
+            worker = self._worker
+        if worker is not None:
+            self._queue.put(None)
+            worker.join(timeout)
+
+    def submit(self, image):
+        """Queue one image and return a Future of its probability row"""
+        worker = self._worker
+        if worker is None or not worker.is_alive():
+            self.start()
+        pending = _PendingPrediction(image)
+        self._queue.put(pending)
+        return pending.future
+
+    def predict_disease(self, image, timeout=None):
+        """Predict a single image - blocks until its batch has run"""
+        probs = self.submit(image).result(timeout)
+        predicted_class = int(probs.argmax())
+        return predicted_class, round(float(probs[predicted_class]), 2)
+
+    def predict_top_k(self, image, k=3, timeout=None):
+        """[(class_index, probability), ...] of the k most likely classes, best first"""
+        return top_k(self.submit(image).result(timeout), k)
+
+    def _collect_batch(self, first):
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    pending = self._queue.get(timeout=remaining)
+                else:
+                    # Deadline passed - still take whatever is already queued
+                    pending = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if pending is None:
+                self._queue.put(None)
+                break
+            batch.append(pending)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            self._run_batch(self._collect_batch(first))
+
+    def _run_batch(self, batch):
+        # Each batch runs entirely on whichever model was active when it started
+        model = self.model
+        started = time.perf_counter()
+        try:
+            probs = model.predict_batch([pending.image for pending in batch])
+            if len(probs) != len(batch):
+                raise ValueError(f'Model returned {len(probs)} rows for a batch of {len(batch)}')
+            finished = time.perf_counter()
+            for row, pending in enumerate(batch):
+                pending.future.set_result(probs[row])
+        except Exception as e:
+            # Fail the batch, never the batching thread
+            with self._lock:
+                self._errors += len(batch)
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return
+
+        with self._lock:
+            self._batches += 1
+            self._requests += len(batch)
+            self._batch_sizes[len(batch)] += 1
+            self._inference_seconds += finished - started
+            self._queue_waits.extend(started - pending.enqueued_at for pending in batch)
+            if self._awaiting_first_batch and model is self.model:
+                self._awaiting_first_batch = False
+                self.first_batch_ms = (finished - batch[0].enqueued_at) * 1000.0
+
+    def stats(self):
+        """Batch-size and queue-wait statistics for throughput/latency tuning"""
+        with self._lock:
+            waits = sorted(self._queue_waits)
+            batches = self._batches
+            requests = self._requests
+            return {
+                'model_version': self.model_version,
+                'first_batch_ms': self.first_batch_ms,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'requests': requests,
+                'batches': batches,
+                'errors': self._errors,
+                'queue_depth': self._queue.qsize(),
+                'mean_batch_size': requests / batches if batches else 0.0,
+                'batch_size_histogram': dict(sorted(self._batch_sizes.items())),
+                'mean_inference_ms': self._inference_seconds * 1000.0 / batches if batches else 0.0,
+                'queue_wait_ms': {
+                    'p50': _percentile(waits, 50) * 1000.0,
+                    'p95': _percentile(waits, 95) * 1000.0,
+                    'p99': _percentile(waits, 99) * 1000.0,
+                    'max': (waits[-1] if waits else 0.0) * 1000.0,
+                },
+            }
@@ -0,0 +1,72 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+FINISHED = (DONE, FAILED)
+
+
+def new_job_id():
+    return uuid.uuid4().hex
+
+
+class JobQueueFull(RuntimeError):
+    """Every slot of the job queue is taken"""
+
+
+class JobQueue:
+    """Run job functions on a background worker pool.
+
+    The queue only runs jobs. Their state is kept where every process can
+    read it (the app stores it in the ``detection_job`` table), because with
+    a pre-forking server the status request may reach a different worker
+    than the one running the job. ``stats`` covers this process.
+
+    At most ``max_pending`` jobs are queued or running at once - their
+    arguments (image bytes) are held in memory until they run - and
+    ``submit`` raises JobQueueFull past that.
+    """
+
+    def __init__(self, max_workers=4, max_pending=32):
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job-worker')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        self._rejected = 0
+
+    def submit(self, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` in the background - it reports failure by raising"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise JobQueueFull(f'{self.max_pending} detection jobs are already waiting')
+        with self._lock:
+            self._counts[QUEUED] += 1
+        return self._executor.submit(self._run, fn, args, kwargs)
+
+    def _run(self, fn, args, kwargs):
+        with self._lock:
+            self._counts[QUEUED] -= 1
+            self._counts[RUNNING] += 1
+        status = FAILED
+        try:
+            result = fn(*args, **kwargs)
+            status = DONE
+            return result
+        finally:
+            with self._lock:
+                self._counts[RUNNING] -= 1
+                self._counts[status] += 1
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counts, rejected=self._rejected, max_pending=self.max_pending)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,292 @@
+import bisect
+import cProfile
+import itertools
+import os
+import random
+import threading
+import time
+from contextlib import nullcontext
+
+from flask import before_render_template, current_app, has_app_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Seconds - from sub-millisecond cache hits up to slow uploads
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+_DISABLED = nullcontext()
+
+
+class Histogram:
+    """Fixed-bucket histogram - one bisect and a short locked update per observation"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        """(cumulative bucket counts including +Inf, sum, count)"""
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        cumulative = []
+        running = 0
+        for value in counts:
+            running += value
+            cumulative.append(running)
+        return cumulative, total, count
+
+
+class _Span:
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started)
+
+
+class Metrics:
+    """Counters and histograms rendered in the Prometheus text format.
+
+    ``span(stage)`` times a block into ``<namespace>_stage_seconds{stage=...}``.
+    When disabled, every call returns immediately.
+    """
+
+    def __init__(self, enabled=True, namespace='smartagri'):
+        self.enabled = enabled
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._help = {}
+        self._histograms = {}
+        self._counters = {}
+        self._stages = {}
+
+        self.describe('stage_seconds', 'histogram', 'Time spent in each hot-path stage')
+
+    def describe(self, name, kind, help_text, buckets=DEFAULT_BUCKETS):
+        self._help[name] = (kind, help_text, buckets)
+
+    def span(self, stage):
+        if not self.enabled:
+            return _DISABLED
+        histogram = self._stages.get(stage)
+        if histogram is None:
+            histogram = self._stages[stage] = self.histogram('stage_seconds', stage=stage)
+        return _Span(histogram)
+
+    def histogram(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            buckets = self._help.get(name, (None, None, DEFAULT_BUCKETS))[2]
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(buckets))
+        return histogram
+
+    def observe(self, name, value, **labels):
+        if self.enabled:
+            self.histogram(name, **labels).observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def render(self):
+        """Everything recorded so far, as Prometheus text exposition"""
+        lines = []
+        described = set()
+
+        def header(name, kind):
+            if name not in described:
+                described.add(name)
+                help_text = self._help.get(name, (kind, name, None))[1]
+                lines.append(f'# HELP {self.namespace}_{name} {help_text}')
+                lines.append(f'# TYPE {self.namespace}_{name} {kind}')
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+        for (name, labels), value in counters:
+            header(name, 'counter')
+            lines.append(f'{self.namespace}_{name}{_labels(labels)} {value}')
+        for (name, labels), histogram in histograms:
+            header(name, 'histogram')
+            cumulative, total, count = histogram.snapshot()
+            for bound, value in zip(histogram.buckets + ('+Inf',), cumulative):
+                lines.append(f'{self.namespace}_{name}_bucket{_labels(labels + (("le", bound),))} {value}')
+            lines.append(f'{self.namespace}_{name}_sum{_labels(labels)} {total}')
+            lines.append(f'{self.namespace}_{name}_count{_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+class RequestInstrumentation:
+    """Per-request timings, SQL query counts, commit and template spans and sampled profiles.
+
+    Queries and commits outside a request (write-behind flushes, jobs) are
+    recorded with ``context="background"``. With ``profile_rate`` above zero,
+    that fraction of requests is run under cProfile, one at a time, and
+    dumped to ``profile_dir``.
+
+    Queries are counted on ``app``'s own engine. Session classes are shared
+    by every application, so commits reach the instrumentation of the
+    application in context through one set of process-wide listeners.
+    """
+
+    def __init__(self, app, db, metrics, profile_rate=0.0, profile_dir='profiles/'):
+        self.metrics = metrics
+        self.profile_rate = profile_rate
+        self.profile_dir = profile_dir
+        self._state = threading.local()
+        self._profiler_lock = threading.Lock()
+        self._profile_sequence = itertools.count(1)
+
+        metrics.describe('request_seconds', 'histogram', 'Request latency by endpoint')
+        metrics.describe('requests_total', 'counter', 'Requests by endpoint and status')
+        metrics.describe('sql_queries_per_request', 'histogram', 'SQL statements executed per request',
+                         buckets=QUERY_BUCKETS)
+        metrics.describe('sql_queries_total', 'counter', 'SQL statements executed')
+        metrics.describe('profiles_total', 'counter', 'Requests sampled into cProfile dumps')
+        if not metrics.enabled:
+            return
+
+        app.extensions['request_instrumentation'] = self
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', self._count_query)
+        for name, listener in _SESSION_LISTENERS:
+            if not event.contains(Session, name, listener):
+                event.listen(Session, name, listener)
+        before_render_template.connect(self._before_render, app, weak=False)
+        template_rendered.connect(self._after_render, app, weak=False)
+
+    def _before_request(self):
+        state = self._state
+        state.queries = 0
+        state.in_request = True
+        state.profiler = None
+        if self.profile_rate and random.random() < self.profile_rate and self._profiler_lock.acquire(False):
+            state.profiler = cProfile.Profile()
+            state.profiler.enable()
+        state.started = time.perf_counter()
+
+    def _after_request(self, response):
+        state = self._state
+        if not getattr(state, 'in_request', False):
+            return response
+        elapsed = time.perf_counter() - state.started
+        state.in_request = False
+        endpoint = request.endpoint or 'unknown'
+        self.metrics.observe('request_seconds', elapsed, endpoint=endpoint)
+        self.metrics.inc('requests_total', endpoint=endpoint, status=response.status_code)
+        self.metrics.observe('sql_queries_per_request', state.queries, endpoint=endpoint)
+        if state.profiler is not None:
+            self._dump_profile(state.profiler, endpoint)
+            state.profiler = None
+        return response
+
+    def _teardown_request(self, exc):
+        # after_request is skipped when a before_request hook fails
+        state = self._state
+        state.in_request = False
+        if getattr(state, 'profiler', None) is not None:
+            state.profiler.disable()
+            state.profiler = None
+            self._profiler_lock.release()
+
+    def _dump_profile(self, profiler, endpoint):
+        try:
+            profiler.disable()
+            os.makedirs(self.profile_dir, exist_ok=True)
+            filename = f"{endpoint}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._profile_sequence)}.prof"
+            profiler.dump_stats(os.path.join(self.profile_dir, filename))
+            self.metrics.inc('profiles_total', endpoint=endpoint)
+        finally:
+            self._profiler_lock.release()
+
+    def _count_query(self, conn, cursor, statement, parameters, context, executemany):
+        state = self._state
+        if getattr(state, 'in_request', False):
+            state.queries += 1
+            self.metrics.inc('sql_queries_total', context='request')
+        else:
+            self.metrics.inc('sql_queries_total', context='background')
+
+    def _before_commit(self, session):
+        session.info['commit_started'] = time.perf_counter()
+
+    def _after_commit(self, session):
+        started = session.info.pop('commit_started', None)
+        if started is not None:
+            self.metrics.observe('stage_seconds', time.perf_counter() - started, stage='sql_commit')
+
+    def _before_render(self, sender, template, context, **extra):
+        self._state.render_started = time.perf_counter()
+
+    def _after_render(self, sender, template, context, **extra):
+        started = getattr(self._state, 'render_started', None)
+        if started is not None:
+            self._state.render_started = None
+            self.metrics.observe('stage_seconds', time.perf_counter() - started, stage='template_render')
+
+
+def _instrumentation():
+    if has_app_context():
+        return current_app.extensions.get('request_instrumentation')
+    return None
+
+
+def _before_commit(session):
+    instrumentation = _instrumentation()
+    if instrumentation is not None:
+        instrumentation._before_commit(session)
+
+
+def _after_commit(session):
+    instrumentation = _instrumentation()
+    if instrumentation is not None:
+        instrumentation._after_commit(session)
+
+
+def _forget_commit(session):
+    session.info.pop('commit_started', None)
+
+
+_SESSION_LISTENERS = [
+    ('before_commit', _before_commit),
+    ('after_commit', _after_commit),
+    ('after_rollback', _forget_commit),
+]
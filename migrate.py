@@ -0,0 +1,123 @@
+"""Create the SmartAgriDoctor database or bring an existing one up to the current schema.
+
+Usage:  python migrate.py [--rebuild-dashboard-stats]
+
+Each migration runs once; the applied version is kept in SQLite's
+``PRAGMA user_version``. Safe to run on every deploy - and the only step
+that creates tables or seed data, so app start-up never does.
+"""
+import argparse
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app import create_app, db, DetectionHistory, DetectionSummary, PestRecommendation, WeeklyDetectionSummary
+from dashboard_stats import rebuild
+from treatments import create_search_index
+
+
+def _create_missing_indexes(connection):
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=connection, checkfirst=True)
+
+
+def _enable_wal(connection):
+    # journal_mode is persistent in the database file
+    connection.exec_driver_sql('PRAGMA journal_mode = WAL')
+
+
+def _add_top_predictions(connection):
+    columns = [row[1] for row in connection.exec_driver_sql('PRAGMA table_info(detection_history)')]
+    if 'top_predictions' not in columns:
+        connection.exec_driver_sql('ALTER TABLE detection_history ADD COLUMN top_predictions TEXT')
+
+
+SAMPLE_RECOMMENDATIONS = [
+    {
+        'disease_name': 'Early Blight',
+        'organic_treatment': 'Use neem oil spray. Apply compost tea. Remove infected leaves.',
+        'chemical_treatment': 'Apply chlorothalonil or copper-based fungicides every 7-10 days.',
+        'preventive_measures': 'Practice crop rotation. Ensure proper spacing. Water at soil level.',
+        'suitable_crops': 'Tomato, Potato, Eggplant'
+    },
+    {
+        'disease_name': 'Late Blight',
+        'organic_treatment': 'Apply baking soda solution. Use compost tea. Remove infected plants.',
+        'chemical_treatment': 'Use fungicides containing mancozeb or metalaxyl. Apply preventatively.',
+        'preventive_measures': 'Avoid overhead watering. Provide good air circulation. Use resistant varieties.',
+        'suitable_crops': 'Tomato, Potato'
+    },
+    {
+        'disease_name': 'Powdery Mildew',
+        'organic_treatment': 'Spray with milk solution (1:9 ratio). Use baking soda spray. Apply neem oil.',
+        'chemical_treatment': 'Apply sulfur-based fungicides or potassium bicarbonate.',
+        'preventive_measures': 'Maintain proper spacing. Ensure good air circulation. Avoid overhead watering.',
+        'suitable_crops': 'Cucumber, Squash, Grapes, Roses'
+    }
+]
+
+
+def _seed_recommendations(connection):
+    # One query for the names already there, one insert for the rest
+    table = PestRecommendation.__table__
+    existing = set(connection.execute(db.select(table.c.disease_name)).scalars())
+    missing = [row for row in SAMPLE_RECOMMENDATIONS if row['disease_name'] not in existing]
+    if missing:
+        connection.execute(table.insert(), missing)
+
+
+def rebuild_dashboard_stats(connection):
+    session = Session(bind=connection)
+    count = rebuild(session, DetectionHistory, DetectionSummary, WeeklyDetectionSummary)
+    session.flush()
+    print(f"   summarised {count} detections")
+
+
+# (version, description, upgrade function) - append new migrations at the end
+MIGRATIONS = [
+    (1, 'composite (user_id, time) indexes for history, chat and sessions', _create_missing_indexes),
+    (2, 'write-ahead logging', _enable_wal),
+    (3, 'recommendation full-text search index', create_search_index),
+    (4, 'backfill dashboard summaries', rebuild_dashboard_stats),
+    (5, 'top-k predictions on detection history', _add_top_predictions),
+    (6, 'sample pest recommendations', _seed_recommendations),
+    (7, 'image path index for upload compaction', _create_missing_indexes),
+]
+
+
+def current_version(connection):
+    version = connection.execute(text('PRAGMA user_version')).scalar()
+    connection.rollback()
+    return version
+
+
+def upgrade(rebuild_stats=False, app=None):
+    """Apply pending migrations to the database of ``app`` (default: ``create_app()``)"""
+    app = app or create_app()
+    with app.app_context():
+        # New tables first; existing ones are left alone
+        db.create_all()
+
+        with db.engine.connect() as connection:
+            version = current_version(connection)
+            for target, description, migration in MIGRATIONS:
+                if target <= version:
+                    continue
+                print(f"🔄 Migration {target}: {description}")
+                with connection.begin():
+                    migration(connection)
+                    connection.exec_driver_sql(f'PRAGMA user_version = {target}')
+                version = target
+            if rebuild_stats:
+                print("🔄 Rebuilding dashboard summaries")
+                with connection.begin():
+                    rebuild_dashboard_stats(connection)
+        print(f"✅ Database schema at version {version}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Upgrade the SmartAgriDoctor database')
+    parser.add_argument('--rebuild-dashboard-stats', action='store_true',
+                        help='Recompute the dashboard summary tables from the full detection history')
+    upgrade(rebuild_stats=parser.parse_args().rebuild_dashboard_stats)
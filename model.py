@@ -0,0 +1,298 @@
+import os
+import random
+import struct
+import tempfile
+import threading
+import zipfile
+
+import numpy as np
+
+# Disease classes for demo
+DISEASE_CLASSES = [
+    'Apple___Apple_scab', 'Apple___Black_rot', 'Apple___Cedar_apple_rust', 'Apple___healthy',
+    'Blueberry___healthy', 'Cherry___Powdery_mildew', 'Cherry___healthy',
+    'Corn___Cercospora_leaf_spot', 'Corn___Common_rust', 'Corn___Northern_Leaf_Blight', 'Corn___healthy',
+    'Grape___Black_rot', 'Grape___Esca', 'Grape___Leaf_blight', 'Grape___healthy',
+    'Orange___Haunglongbing', 'Peach___Bacterial_spot', 'Peach___healthy',
+    'Pepper_bell___Bacterial_spot', 'Pepper_bell___healthy', 'Potato___Early_blight', 'Potato___Late_blight', 'Potato___healthy',
+    'Raspberry___healthy', 'Soybean___healthy', 'Squash___Powdery_mildew',
+    'Strawberry___Leaf_scorch', 'Strawberry___healthy', 'Tomato___Bacterial_spot', 'Tomato___Early_blight',
+    'Tomato___Late_blight', 'Tomato___Leaf_Mold', 'Tomato___Septoria_leaf_spot', 'Tomato___Spider_mites',
+    'Tomato___Target_Spot', 'Tomato___Tomato_Yellow_Leaf_Curl_Virus', 'Tomato___Tomato_mosaic_virus', 'Tomato___healthy'
+]
+
+# Crop of each class ('Apple___Black_rot' -> 'Apple') and the class indices of each crop
+CROPS = list(dict.fromkeys(name.split('___')[0] for name in DISEASE_CLASSES))
+CROP_OF_CLASS = np.array([CROPS.index(name.split('___')[0]) for name in DISEASE_CLASSES])
+CROP_CLASSES = [np.flatnonzero(CROP_OF_CLASS == crop) for crop in range(len(CROPS))]
+CROP_MEMBERSHIP = np.eye(len(CROPS), dtype=np.float32)[CROP_OF_CLASS]
+
+# Simple disease prediction model (no TensorFlow needed)
+class SimpleDiseaseModel:
+    version = 'simple-1'
+
+    def predict_batch(self, images):
+        """Simulate one forward pass - returns a (batch, classes) probability array"""
+        batch_size = len(images)
+        num_classes = len(DISEASE_CLASSES)
+        predicted = np.random.randint(0, num_classes, size=batch_size)
+        confidence = np.round(np.random.uniform(0.7, 0.95, size=batch_size), 2)
+
+        # Spread the remaining probability mass evenly over the other classes
+        probs = np.repeat(((1.0 - confidence) / (num_classes - 1))[:, None], num_classes, axis=1)
+        probs[np.arange(batch_size), predicted] = confidence
+        return probs.astype(np.float32)
+
+    def predict_disease(self, image_path):
+        """Simulate disease prediction - returns random results for demo"""
+        predicted_class = random.randint(0, len(DISEASE_CLASSES) - 1)
+        confidence = round(random.uniform(0.7, 0.95), 2)
+        return predicted_class, confidence
+
+
+def pool_features(images, feature_size):
+    """Average-pool (batch, height, width, 3) images to (batch, feature_size * feature_size * 3)"""
+    batch, height, width, channels = images.shape
+    rows = np.linspace(0, height, feature_size, endpoint=False).astype(int)
+    cols = np.linspace(0, width, feature_size, endpoint=False).astype(int)
+    sums = np.add.reduceat(np.add.reduceat(images, rows, axis=1), cols, axis=2)
+    counts = np.outer(np.diff(np.append(rows, height)), np.diff(np.append(cols, width)))
+    return (sums / counts[None, :, :, None]).reshape(batch, -1).astype(np.float32)
+
+
+def softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    np.exp(logits, out=logits)
+    logits /= logits.sum(axis=1, keepdims=True)
+    return logits
+
+
+def top_k(probs, k):
+    """[(class_index, probability), ...] of the k most likely classes in one probability row"""
+    k = min(k, len(probs))
+    indices = np.argpartition(-probs, k - 1)[:k]
+    indices = indices[np.argsort(-probs[indices])]
+    return [(int(index), round(float(probs[index]), 4)) for index in indices]
+
+
+def stack_images(images, stride=1):
+    """Stack preprocessed images into one float32 batch scaled to [0, 1].
+
+    ``stride`` subsamples every n-th pixel first, for cheap low-resolution features.
+    """
+    batch = np.stack(images) if isinstance(images, (list, tuple)) else np.asarray(images)
+    if stride > 1:
+        batch = batch[:, ::stride, ::stride]
+    if batch.dtype == np.uint8:
+        return batch.astype(np.float32) * np.float32(1.0 / 255.0)
+    return batch.astype(np.float32, copy=False)
+
+
+# Members smaller than this are read into memory even when memory-mapping
+MMAP_MIN_BYTES = 64 * 1024
+
+
+def _map_member(raw, path, info):
+    """Read-only memmap of one uncompressed .npy member of a zip, or None if it is not worth mapping"""
+    # Local file header: 30 fixed bytes, then the file name and extra field
+    raw.seek(info.header_offset + 26)
+    name_length, extra_length = struct.unpack('<HH', raw.read(4))
+    raw.seek(info.header_offset + 30 + name_length + extra_length)
+    version = np.lib.format.read_magic(raw)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(raw)
+    elif version == (2, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(raw)
+    else:
+        return None
+    if dtype.hasobject or int(np.prod(shape)) * dtype.itemsize < MMAP_MIN_BYTES:
+        return None
+    return np.asarray(np.memmap(path, dtype=dtype, mode='r', offset=raw.tell(), shape=shape,
+                                order='F' if fortran_order else 'C'))
+
+
+def load_arrays(path, mmap=False):
+    """All arrays of an .npz artifact, by name.
+
+    With ``mmap``, large members of an uncompressed artifact (``np.savez``) are
+    memory-mapped read-only instead of copied into the heap, so every process
+    serving the same file shares one copy of the weights in the page cache.
+    Replace artifacts by writing a new file, never by overwriting a mapped one.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as raw:
+        for info in archive.infolist():
+            name = info.filename[:-len('.npy')] if info.filename.endswith('.npy') else info.filename
+            array = None
+            if mmap and info.compress_type == zipfile.ZIP_STORED:
+                array = _map_member(raw, path, info)
+            if array is None:
+                with archive.open(info) as member:
+                    array = np.lib.format.read_array(member, allow_pickle=False)
+            arrays[name] = array
+    return arrays
+
+
+def _save_artifact(path, **arrays):
+    # The registry loads the newest models/*.npz, so write under a name it
+    # never matches and rename into place once complete
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.npz.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, classes=np.array(DISEASE_CLASSES), **arrays)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _check_classes(path, artifact):
+    classes = [str(name) for name in artifact['classes']]
+    if classes != DISEASE_CLASSES:
+        raise ValueError(f'{path} was trained on different classes')
+
+
+# Linear classifier over pooled colour features, loaded from a models/*.npz artifact
+class LinearDiseaseModel:
+    def __init__(self, weights, bias, mean, std, feature_size, version, activation_scale=None,
+                 temperature=1.0, stride=1):
+        self.weights = weights
+        self.bias = bias
+        self.mean = mean
+        self.std = std
+        self.feature_size = int(feature_size)
+        self.version = version
+        # Set by quantize_model.py calibration, used by the int8 mode
+        self.activation_scale = activation_scale
+        # Softmax temperature fitted on held-out data so confidences are calibrated
+        self.temperature = float(temperature)
+        self.stride = int(stride)
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        artifact = load_arrays(path, mmap)
+        _check_classes(path, artifact)
+        return cls.from_arrays(artifact)
+
+    @classmethod
+    def from_arrays(cls, artifact, prefix=''):
+        def optional(name, default):
+            return artifact[prefix + name] if prefix + name in artifact else default
+
+        activation_scale = optional('activation_scale', None)
+        # copy=False keeps memory-mapped float32 weights mapped
+        return cls(
+            artifact[prefix + 'weights'].astype(np.float32, copy=False),
+            artifact[prefix + 'bias'].astype(np.float32, copy=False),
+            artifact[prefix + 'mean'].astype(np.float32, copy=False),
+            artifact[prefix + 'std'].astype(np.float32, copy=False),
+            int(artifact[prefix + 'feature_size']), str(artifact[prefix + 'version']),
+            None if activation_scale is None else float(activation_scale),
+            float(optional('temperature', 1.0)), int(optional('stride', 1))
+        )
+
+    def arrays(self, prefix=''):
+        arrays = {'weights': self.weights, 'bias': self.bias, 'mean': self.mean, 'std': self.std,
+                  'feature_size': self.feature_size, 'version': self.version,
+                  'temperature': self.temperature, 'stride': self.stride}
+        if self.activation_scale is not None:
+            arrays['activation_scale'] = self.activation_scale
+        return {prefix + name: value for name, value in arrays.items()}
+
+    def save(self, path):
+        _save_artifact(path, **self.arrays())
+
+    def features(self, images):
+        return (pool_features(stack_images(images, self.stride), self.feature_size) - self.mean) / self.std
+
+    def logits(self, images):
+        return self.features(images) @ self.weights + self.bias
+
+    def predict_batch(self, images):
+        """One forward pass - returns a (batch, classes) calibrated probability array"""
+        return softmax(self.logits(images) / self.temperature)
+
+    def predict_disease(self, image):
+        probs = self.predict_batch([image])[0]
+        predicted_class = int(probs.argmax())
+        return predicted_class, round(float(probs[predicted_class]), 2)
+
+
+# Two-stage model: a cheap low-resolution pass, then a per-crop disease head when needed
+class TieredDiseaseModel:
+    """Early-exit cascade over two LinearDiseaseModels.
+
+    ``crop_model`` runs on subsampled pixels for every image; summing its
+    probabilities per crop gives the crop-level prediction. Images whose top
+    class already reaches ``exit_threshold`` - typically healthy leaves - or
+    whose crop has a single class stop there. The rest run the full-resolution
+    ``disease_model`` restricted to the classes of their most likely crop,
+    and its within-crop distribution is scaled by that crop's probability.
+    """
+
+    def __init__(self, crop_model, disease_model, exit_threshold=0.9, version=None):
+        self.crop_model = crop_model
+        self.disease_model = disease_model
+        self.exit_threshold = float(exit_threshold)
+        self.version = version or f'{crop_model.version}+{disease_model.version}'
+
+        self._lock = threading.Lock()
+        self._images = 0
+        self._early_exits = 0
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        artifact = load_arrays(path, mmap)
+        _check_classes(path, artifact)
+        return cls(
+            LinearDiseaseModel.from_arrays(artifact, 'crop_'),
+            LinearDiseaseModel.from_arrays(artifact, 'disease_'),
+            float(artifact['exit_threshold']), str(artifact['version'])
+        )
+
+    @staticmethod
+    def is_tiered(path):
+        with np.load(path, allow_pickle=False) as artifact:
+            return 'crop_weights' in artifact
+
+    def save(self, path):
+        _save_artifact(path, version=self.version, exit_threshold=self.exit_threshold,
+                       **self.crop_model.arrays('crop_'), **self.disease_model.arrays('disease_'))
+
+    def predict_batch(self, images):
+        """Cascade forward pass - returns a (batch, classes) calibrated probability array"""
+        batch = np.stack(images) if isinstance(images, (list, tuple)) else np.asarray(images)
+        probs = self.crop_model.predict_batch(batch)
+        crop_probs = probs @ CROP_MEMBERSHIP
+        crops = crop_probs.argmax(axis=1)
+
+        single_class = np.array([len(CROP_CLASSES[crop]) == 1 for crop in crops], dtype=bool)
+        rows = np.flatnonzero((probs.max(axis=1) < self.exit_threshold) & ~single_class)
+        if rows.size:
+            head = self.disease_model
+            features = head.features(batch[rows])
+            for crop in np.unique(crops[rows]):
+                selected = crops[rows] == crop
+                columns = CROP_CLASSES[crop]
+                logits = features[selected] @ head.weights[:, columns] + head.bias[columns]
+                within = softmax(logits / head.temperature)
+                probs[np.ix_(rows[selected], columns)] = within * crop_probs[rows[selected], crop][:, None]
+
+        with self._lock:
+            self._images += len(probs)
+            self._early_exits += len(probs) - rows.size
+        return probs
+
+    def predict_disease(self, image):
+        probs = self.predict_batch([image])[0]
+        predicted_class = int(probs.argmax())
+        return predicted_class, round(float(probs[predicted_class]), 2)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'images': self._images,
+                'early_exits': self._early_exits,
+                'early_exit_rate': round(self._early_exits / self._images, 4) if self._images else None,
+                'exit_threshold': self.exit_threshold,
+            }
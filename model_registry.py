@@ -0,0 +1,155 @@
+import glob
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from model import LinearDiseaseModel
+
+logger = logging.getLogger(__name__)
+
+
+class ModelNotReady(RuntimeError):
+    """A model artifact exists but is not serving yet"""
+
+
+class ModelRegistry:
+    """Load model artifacts from a directory in the background and hot-swap them in.
+
+    The newest ``*.npz`` artifact is loaded off the request path, warmed up
+    with dummy batches and only then swapped into the inference engine.
+    Requests call ``wait_ready`` first, so the engine's placeholder model only
+    serves when the directory has no artifact at all. With ``poll_seconds``
+    set, newer artifacts dropped into the directory are picked up the same way.
+    """
+
+    def __init__(self, engine, models_dir, input_size, loader=LinearDiseaseModel.load,
+                 warmup_runs=3, poll_seconds=0):
+        self.engine = engine
+        self.models_dir = models_dir
+        self.input_size = tuple(input_size)
+        self.loader = loader
+        self.warmup_runs = warmup_runs
+        self.poll_seconds = poll_seconds
+
+        self.active_path = None
+        self.loading = None
+        self.last_error = None
+        self.cold_start_seconds = None
+        self.history = []
+
+        self._lock = threading.Lock()
+        self._started_at = None
+        self._thread = None
+        self._scanned = threading.Event()
+
+    def start(self):
+        """Begin background loading (idempotent - call before serving requests)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._started_at = time.perf_counter()
+            self._thread = threading.Thread(target=self._run, name='model-registry', daemon=True)
+            self._thread.start()
+
+    def available(self):
+        """Artifacts in the models directory, newest first"""
+        paths = glob.glob(os.path.join(self.models_dir, '*.npz'))
+        return sorted(paths, key=lambda path: (os.path.getmtime(path), path), reverse=True)
+
+    def load(self, path):
+        """Load, warm up and activate one artifact - returns its timing record"""
+        self.loading = path
+        try:
+            started = time.perf_counter()
+            model = self.loader(path)
+            loaded = time.perf_counter()
+            self._warm_up(model)
+            warmed = time.perf_counter()
+        finally:
+            self.loading = None
+
+        previous = self.engine.swap_model(model)
+        record = {
+            'path': path,
+            'version': getattr(model, 'version', None),
+            'previous_version': getattr(previous, 'version', None),
+            'load_seconds': loaded - started,
+            'warmup_seconds': warmed - loaded,
+            'activated_at': time.time(),
+        }
+        with self._lock:
+            self.active_path = path
+            self.history.append(record)
+            if self.cold_start_seconds is None and self._started_at is not None:
+                self.cold_start_seconds = warmed - self._started_at
+        logger.info('Model %s ready (load %.3fs, warm-up %.3fs)', record['version'],
+                    record['load_seconds'], record['warmup_seconds'])
+        return record
+
+    def _warm_up(self, model):
+        width, height = self.input_size
+        for batch_size in (1, self.engine.max_batch_size):
+            dummy = np.zeros((batch_size, height, width, 3), dtype=np.float32)
+            for _ in range(self.warmup_runs):
+                model.predict_batch(dummy)
+
+    def load_latest(self):
+        """Load the newest artifact now, in the calling thread, unless it is already active.
+
+        Used to load the model before a pre-forking server forks its workers,
+        which then share the weights copy-on-write. Errors are recorded in
+        ``last_error`` as in the background loop.
+        """
+        paths = self.available()
+        if paths and paths[0] != self.active_path:
+            try:
+                self.load(paths[0])
+                self.last_error = None
+            except Exception as e:
+                self.last_error = f'{paths[0]}: {e}'
+                logger.exception('Could not load model artifact %s', paths[0])
+        self._scanned.set()
+
+    def wait_ready(self, timeout):
+        """Wait up to ``timeout`` seconds for the first artifact - False if the engine should not serve yet.
+
+        True once an artifact is active, or when the first scan found none
+        and the placeholder model is all there is. False while an artifact is
+        still loading, or when it could not be loaded.
+        """
+        if self.ready:
+            return True
+        self.start()
+        if not self._scanned.wait(timeout):
+            return False
+        return self.ready or self.last_error is None
+
+    def _run(self):
+        while True:
+            self.load_latest()
+            if not self.poll_seconds:
+                return
+            time.sleep(self.poll_seconds)
+
+    @property
+    def ready(self):
+        return self.active_path is not None
+
+    def status(self):
+        with self._lock:
+            latest = self.history[-1] if self.history else None
+            return {
+                'ready': self.ready,
+                'active_version': self.engine.model_version,
+                'active_path': self.active_path,
+                'loading': self.loading,
+                'last_error': self.last_error,
+                'cold_start_seconds': self.cold_start_seconds,
+                'load_seconds': latest['load_seconds'] if latest else None,
+                'warmup_seconds': latest['warmup_seconds'] if latest else None,
+                'first_request_ms': self.engine.first_batch_ms,
+                'swaps': len(self.history),
+            }
@@ -0,0 +1,75 @@
+import base64
+import csv
+import io
+import json
+from datetime import date, datetime
+
+from sqlalchemy import tuple_
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(moment, row_id):
+    """Opaque cursor for the (time, id) position of the last row on a page"""
+    raw = f'{moment.isoformat()}|{row_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        moment, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(moment), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+
+
+def keyset_page(query, time_column, id_column, cursor=None, limit=50):
+    """Return (rows, next_cursor) for one newest-first page.
+
+    Seeks past the cursor with a (time, id) row-value comparison, which the
+    (user_id, time) indexes serve directly - no OFFSET scan however deep the
+    page is.
+    """
+    if cursor:
+        moment, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(time_column, id_column) < tuple_(moment, row_id))
+    rows = query.order_by(time_column.desc(), id_column.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, time_column.key), getattr(last, id_column.key))
+    return rows, next_cursor
+
+
+def row_to_dict(row, fields, json_fields=()):
+    """Column values of ``row``, with dates as ISO strings and ``json_fields`` (JSON text columns) decoded"""
+    values = {}
+    for field in fields:
+        value = getattr(row, field)
+        if field in json_fields:
+            value = json.loads(value) if value else None
+        values[field] = value.isoformat() if isinstance(value, (datetime, date)) else value
+    return values
+
+
+def stream_export(rows, fields, fmt, json_fields=()):
+    """Yield CSV or NDJSON text for rows one at a time - ``json_fields`` stay as text in CSV"""
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for row in rows:
+            values = row_to_dict(row, fields)
+            writer.writerow([values[field] for field in fields])
+            if buffer.tell() > 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        for row in rows:
+            yield json.dumps(row_to_dict(row, fields, json_fields)) + '\n'
@@ -0,0 +1,180 @@
+import hashlib
+import threading
+import time
+
+import numpy as np
+
+from ttl_cache import TTLCache
+
+
+def content_hash(data):
+    """SHA-256 of the raw image bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def perceptual_hash(image, hash_size=8):
+    """64-bit difference hash of a preprocessed (height, width, 3) image.
+
+    Near-identical frames (re-encoded, slightly shifted or re-exposed) land
+    within a few bits of each other.
+    """
+    gray = image.mean(axis=2)
+    height, width = gray.shape
+    rows = np.linspace(0, height, hash_size, endpoint=False).astype(int)
+    cols = np.linspace(0, width, hash_size + 1, endpoint=False).astype(int)
+    blocks = np.add.reduceat(np.add.reduceat(gray, rows, axis=0), cols, axis=1)
+    bits = (blocks[:, 1:] > blocks[:, :-1]).ravel()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def colour_signature(image, grid=4):
+    """Mean of each channel over a ``grid`` x ``grid`` layout of a preprocessed image.
+
+    The difference hash is computed on grayscale, so it cannot tell a green
+    leaf from a yellow or brown one - this can.
+    """
+    height, width, _ = image.shape
+    rows = np.linspace(0, height, grid, endpoint=False).astype(int)
+    cols = np.linspace(0, width, grid, endpoint=False).astype(int)
+    sums = np.add.reduceat(np.add.reduceat(image, rows, axis=0), cols, axis=1)
+    counts = np.outer(np.diff(np.append(rows, height)), np.diff(np.append(cols, width)))
+    return (sums / counts[:, :, None]).astype(np.float32).ravel()
+
+
+def _band_masks(max_distance, bits=64):
+    """(shift, mask) of ``max_distance + 1`` bands covering a ``bits``-bit hash.
+
+    Two hashes within ``max_distance`` bits of each other differ in at most
+    that many bands, so by pigeonhole at least one band is identical.
+    """
+    count = min(max_distance + 1, bits)
+    bounds = [bits * index // count for index in range(count + 1)]
+    return [(start, (1 << (end - start)) - 1) for start, end in zip(bounds, bounds[1:])]
+
+
+class PredictionCache:
+    """Bounded LRU/TTL cache of predictions keyed by image content hash.
+
+    Entries belong to one model version; the cache empties itself as soon as
+    it is asked about a different version. Exact content matches are shared
+    by everyone. Near-duplicate matches only reuse a result stored for the
+    same owner within ``near_duplicate_seconds`` (a burst of camera frames),
+    and only when the colour signatures are also within
+    ``max_colour_distance``. Perceptual hashes are indexed by owner and band,
+    so a near-duplicate lookup only compares that owner's entries sharing a
+    band with the query rather than scanning the whole cache.
+    """
+
+    def __init__(self, max_entries=4096, ttl_seconds=3600, max_phash_distance=None,
+                 max_colour_distance=0.04, near_duplicate_seconds=60):
+        self.max_phash_distance = max_phash_distance
+        self.max_colour_distance = max_colour_distance
+        self.near_duplicate_seconds = near_duplicate_seconds
+
+        # key -> (value, phash, owner, colour, stored_at)
+        self._entries = TTLCache(max_entries, ttl_seconds, on_remove=self._unindex)
+        self._lock = threading.Lock()
+        self._model_version = None
+        self._bands = _band_masks(max_phash_distance) if max_phash_distance is not None else []
+        self._band_index = [{} for _ in self._bands]  # (owner, band value) -> {key: phash}
+
+        self.near_hits = 0
+        self.invalidations = 0
+
+    def _check_version(self, model_version):
+        if model_version != self._model_version:
+            if len(self._entries):
+                self.invalidations += 1
+            self._clear()
+            self._model_version = model_version
+
+    def _clear(self):
+        self._entries.clear()
+        for index in self._band_index:
+            index.clear()
+
+    def _unindex(self, key, value):
+        phash, owner = value[1], value[2]
+        if phash is not None:
+            for (shift, mask), index in zip(self._bands, self._band_index):
+                band = (owner, (phash >> shift) & mask)
+                keys = index[band]
+                del keys[key]
+                if not keys:
+                    del index[band]
+
+    def get(self, key, model_version):
+        """Return the cached prediction for exact image content, or None"""
+        with self._lock:
+            self._check_version(model_version)
+            cached = self._entries.get(key)
+            return cached[0] if cached is not None else None
+
+    def _same_colour(self, stored, colour):
+        if self.max_colour_distance is None:
+            return True
+        if stored is None or colour is None:
+            return False
+        return float(np.abs(stored - colour).max()) <= self.max_colour_distance
+
+    def find_similar(self, phash, model_version, owner=None, colour=None):
+        """Return the prediction of the closest recent near-duplicate from ``owner``, or None"""
+        if self.max_phash_distance is None or phash is None:
+            return None
+        with self._lock:
+            self._check_version(model_version)
+            candidates = {}
+            for (shift, mask), index in zip(self._bands, self._band_index):
+                candidates.update(index.get((owner, (phash >> shift) & mask), ()))
+
+        # Distances are compared without holding the lock
+        ranked = sorted((distance, key) for key, distance in
+                        ((key, (candidate ^ phash).bit_count()) for key, candidate in candidates.items())
+                        if distance <= self.max_phash_distance)
+        if not ranked:
+            return None
+
+        oldest = time.monotonic() - self.near_duplicate_seconds
+        with self._lock:
+            if self._model_version != model_version:
+                return None
+            for _, key in ranked:
+                cached = self._entries.get(key, count=False)
+                # Gone, replaced or expired since the candidates were collected
+                if cached is None or cached[1] != candidates[key]:
+                    continue
+                if cached[4] < oldest or not self._same_colour(cached[3], colour):
+                    continue
+                self.near_hits += 1
+                return cached[0]
+        return None
+
+    def put(self, key, model_version, value, phash=None, owner=None, colour=None):
+        with self._lock:
+            self._check_version(model_version)
+            self._entries.put(key, (value, phash, owner, colour, time.monotonic()))
+            if phash is not None and key in self._entries:
+                for (shift, mask), index in zip(self._bands, self._band_index):
+                    index.setdefault((owner, (phash >> shift) & mask), {})[key] = phash
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def stats(self):
+        with self._lock:
+            stats = self._entries.stats()
+            lookups = stats['hits'] + stats['misses']
+            return {
+                'model_version': self._model_version,
+                'size': stats['size'],
+                'max_entries': stats['max_entries'],
+                'ttl_seconds': stats['ttl_seconds'],
+                'hits': stats['hits'],
+                'near_hits': self.near_hits,
+                'misses': stats['misses'],
+                'hit_rate': (stats['hits'] + self.near_hits) / lookups if lookups else 0.0,
+                'evictions': stats['evictions'],
+                'expirations': stats['expirations'],
+                'invalidations': self.invalidations,
+            }
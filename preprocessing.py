@@ -0,0 +1,50 @@
+import io
+import threading
+
+import numpy as np
+from PIL import Image
+
+# Per-thread preallocated float32 input buffers, keyed by input size
+_buffers = threading.local()
+
+
+def read_upload(file_storage):
+    """Read an uploaded file once - the same bytes feed the decoder and the disk write"""
+    stream = file_storage.stream
+    stream.seek(0)
+    return stream.read()
+
+
+def input_buffer(size):
+    """Return this thread's reusable (height, width, 3) float32 buffer"""
+    width, height = size
+    buffers = getattr(_buffers, 'by_size', None)
+    if buffers is None:
+        buffers = _buffers.by_size = {}
+    buf = buffers.get(size)
+    if buf is None:
+        buf = buffers[size] = np.empty((height, width, 3), dtype=np.float32)
+    return buf
+
+
+def decode_resized(data, size):
+    """Decode image bytes to a (height, width, 3) uint8 RGB array of the given size"""
+    with Image.open(io.BytesIO(data)) as img:
+        # Let the JPEG decoder downscale while decoding instead of after
+        img.draft('RGB', tuple(size))
+        img = img.convert('RGB')
+        if img.size != tuple(size):
+            img = img.resize(tuple(size), Image.BILINEAR)
+        return np.asarray(img)
+
+
+def preprocess_image(data, size, out=None):
+    """Decode image bytes, resize to the model input size and scale to [0, 1].
+
+    The result is written into ``out`` (default: this thread's preallocated
+    buffer), so it is only valid until the next call on the same thread.
+    """
+    if out is None:
+        out = input_buffer(tuple(size))
+    np.multiply(decode_resized(data, size), np.float32(1.0 / 255.0), out=out, casting='unsafe')
+    return out
@@ -0,0 +1,130 @@
+import numpy as np
+
+from model import DISEASE_CLASSES, LinearDiseaseModel, TieredDiseaseModel, softmax
+
+PRECISIONS = ('float32', 'float16', 'int8')
+
+
+class QuantizedDiseaseModel:
+    """Reduced-precision copy of a LinearDiseaseModel.
+
+    ``float16`` stores the weights in half precision. ``int8`` quantizes the
+    weights symmetrically per output class and the input features with the
+    calibrated per-tensor ``activation_scale``, accumulating in int32.
+
+    This only saves weight memory (2x or 4x). numpy has no BLAS path for
+    float16 or int8 matmul, so both modes are slower than float32 - see
+    benchmarks/bench_quantization.py before turning one on.
+    """
+
+    def __init__(self, model, precision, activation_scale=None):
+        if precision not in ('float16', 'int8'):
+            raise ValueError(f'Unsupported precision: {precision}')
+        self.model = model
+        self.precision = precision
+        self.version = f'{model.version}-{precision}'
+        self.bias = model.bias
+
+        if precision == 'float16':
+            self.weights = model.weights.astype(np.float16)
+        else:
+            if activation_scale is None:
+                raise ValueError(f'{model.version} has no int8 calibration - run quantize_model.py first')
+            self.activation_scale = np.float32(activation_scale)
+            self.weight_scale = (np.abs(model.weights).max(axis=0) / 127.0).astype(np.float32)
+            self.weight_scale[self.weight_scale == 0] = 1.0
+            self.weights = np.clip(np.rint(model.weights / self.weight_scale), -127, 127).astype(np.int8)
+            self.output_scale = self.activation_scale * self.weight_scale
+
+    @property
+    def weight_bytes(self):
+        return self.weights.nbytes
+
+    def predict_batch(self, images):
+        """One forward pass - returns a (batch, classes) probability array"""
+        features = self.model.features(images)
+        if self.precision == 'float16':
+            logits = (features.astype(np.float16) @ self.weights).astype(np.float32)
+        else:
+            quantized = np.clip(np.rint(features / self.activation_scale), -127, 127).astype(np.int8)
+            logits = np.matmul(quantized, self.weights, dtype=np.int32).astype(np.float32) * self.output_scale
+        return softmax((logits + self.bias) / self.model.temperature)
+
+    def predict_disease(self, image):
+        probs = self.predict_batch([image])[0]
+        predicted_class = int(probs.argmax())
+        return predicted_class, round(float(probs[predicted_class]), 2)
+
+
+def load_model(path, precision='float32', mmap=False):
+    """Load a model artifact in the configured INFERENCE_PRECISION (float16/int8 trade latency for memory).
+
+    ``mmap`` maps the float32 weights from the file (see model.load_arrays);
+    float16 and int8 weights are converted copies either way.
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f'INFERENCE_PRECISION must be one of {PRECISIONS}')
+    if TieredDiseaseModel.is_tiered(path):
+        if precision != 'float32':
+            raise ValueError(f'{path} is a tiered model, which only runs in float32')
+        return TieredDiseaseModel.load(path, mmap)
+    model = LinearDiseaseModel.load(path, mmap)
+    if precision == 'float32':
+        return model
+    return QuantizedDiseaseModel(model, precision, model.activation_scale)
+
+
+def calibrate_activation_scale(model, batches, percentile=99.99):
+    """Per-tensor int8 activation scale from the features of representative images"""
+    magnitudes = [np.abs(model.features(images)).ravel() for images, labels in batches]
+    if not magnitudes:
+        raise ValueError('No calibration images')
+    return float(np.percentile(np.concatenate(magnitudes), percentile) / 127.0) or 1.0
+
+
+def accuracy_report(reference, candidate, batches, tolerance=0.01):
+    """Compare a reduced-precision model with the full-precision one, per class.
+
+    The check fails if overall accuracy, or accuracy on any of the
+    DISEASE_CLASSES with samples, drops by more than ``tolerance``.
+    """
+    num_classes = len(DISEASE_CLASSES)
+    totals = np.zeros(num_classes, dtype=np.int64)
+    reference_correct = np.zeros(num_classes, dtype=np.int64)
+    candidate_correct = np.zeros(num_classes, dtype=np.int64)
+    agree = 0
+    for images, labels in batches:
+        reference_pred = reference.predict_batch(images).argmax(axis=1)
+        candidate_pred = candidate.predict_batch(images).argmax(axis=1)
+        totals += np.bincount(labels, minlength=num_classes)
+        reference_correct += np.bincount(labels[reference_pred == labels], minlength=num_classes)
+        candidate_correct += np.bincount(labels[candidate_pred == labels], minlength=num_classes)
+        agree += int((reference_pred == candidate_pred).sum())
+
+    count = int(totals.sum())
+    if not count:
+        raise ValueError('No evaluation images')
+    per_class = []
+    worst_drop = 0.0
+    for index, name in enumerate(DISEASE_CLASSES):
+        if not totals[index]:
+            per_class.append({'class': name, 'samples': 0, 'reference': None, 'candidate': None, 'drop': None})
+            continue
+        ref = reference_correct[index] / totals[index]
+        cand = candidate_correct[index] / totals[index]
+        worst_drop = max(worst_drop, ref - cand)
+        per_class.append({'class': name, 'samples': int(totals[index]),
+                          'reference': round(float(ref), 4), 'candidate': round(float(cand), 4),
+                          'drop': round(float(ref - cand), 4)})
+
+    overall_drop = (reference_correct.sum() - candidate_correct.sum()) / count
+    return {
+        'samples': count,
+        'reference_accuracy': round(float(reference_correct.sum() / count), 4),
+        'candidate_accuracy': round(float(candidate_correct.sum() / count), 4),
+        'agreement': round(agree / count, 4),
+        'overall_drop': round(float(overall_drop), 4),
+        'worst_class_drop': round(float(worst_drop), 4),
+        'passed': bool(overall_drop <= tolerance and worst_drop <= tolerance),
+        'per_class': per_class,
+    }
@@ -0,0 +1,62 @@
+"""Calibrate a model artifact for reduced-precision inference and check its accuracy.
+
+Usage:  python quantize_model.py models/linear-XXXX.npz [--cache dataset/cache] [--tolerance 0.01]
+
+Computes the int8 activation scale from training images of the local dataset
+cache and stores it in the artifact. Then it compares the int8 and float16
+modes with full precision on the validation split for all DISEASE_CLASSES.
+Exits non-zero if either mode regresses by more than the tolerance. Select a
+mode with INFERENCE_PRECISION - it saves weight memory at some latency cost.
+"""
+import argparse
+import json
+import os
+import sys
+
+from dataset_ingest import DatasetStore
+from model import LinearDiseaseModel
+from quantization import QuantizedDiseaseModel, accuracy_report, calibrate_activation_scale
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Calibrate and check reduced-precision inference')
+    parser.add_argument('model', help='Model artifact (.npz)')
+    parser.add_argument('--cache', default=os.path.join('dataset', 'cache'))
+    parser.add_argument('--calibration-images', type=int, default=2048)
+    parser.add_argument('--tolerance', type=float, default=0.01, help='Max allowed accuracy drop')
+    parser.add_argument('--report', help='Write the full per-class report as JSON')
+    args = parser.parse_args()
+
+    store = DatasetStore(args.cache)
+    model = LinearDiseaseModel.load(args.model)
+    calibration_split = 'train' if len(store.indices('train')) else None
+    eval_split = 'valid' if len(store.indices('valid')) else None
+
+    model.activation_scale = calibrate_activation_scale(
+        model, store.iter_batches(256, split=calibration_split, shuffle=True, limit=args.calibration_images)
+    )
+    print(f"🔄 int8 activation scale: {model.activation_scale:.6f}")
+
+    # Write the calibration back into the artifact (save() renames into place)
+    model.save(args.model)
+
+    reports = {}
+    failed = False
+    for precision in ('float16', 'int8'):
+        candidate = QuantizedDiseaseModel(model, precision, model.activation_scale)
+        report = accuracy_report(model, candidate, store.iter_batches(256, split=eval_split), args.tolerance)
+        reports[precision] = report
+        failed = failed or not report['passed']
+        status = '✅' if report['passed'] else '❌'
+        print(f"{status} {precision}: accuracy {report['candidate_accuracy']:.4f} "
+              f"vs {report['reference_accuracy']:.4f} full precision, agreement {report['agreement']:.4f}, "
+              f"worst class drop {report['worst_class_drop']:.4f}")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(reports, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pytest
+
+# The modules live flat in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as smartagri  # noqa: E402
+from config import Config  # noqa: E402
+from migrate import upgrade  # noqa: E402
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """Two applications over one database, as two pre-forked worker processes would be"""
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "workers.db"}'
+        UPLOAD_FOLDER = str(tmp_path / 'uploads')
+        MODELS_FOLDER = str(tmp_path / 'models')
+        MODEL_POLL_SECONDS = 0
+        DETECTION_JOB_POLL_SECONDS = 0.01
+
+    apps = [smartagri.create_app(TestConfig) for _ in range(2)]
+    for app in apps:
+        # The page templates sit at the repository root
+        app.template_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    upgrade(app=apps[0])
+    clients = []
+    for index, app in enumerate(apps):
+        client = app.test_client()
+        if index == 0:
+            client.post('/register', data={'username': 'grower', 'email': 'grower@example.com',
+                                           'phone': '1', 'password': 'secret'})
+        client.post('/login', data={'username': 'grower', 'password': 'secret'})
+        clients.append(client)
+    yield clients
+    for app in apps:
+        services = app.extensions['smartagri']
+        services.detection_jobs.shutdown()
+        services.audit_log.close()
+        services.disease_model.close()
@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import app as smartagri
+from config import Config
+
+
+def make_config(tmp_path, name):
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / name}.db'
+        UPLOAD_FOLDER = str(tmp_path / name / 'uploads')
+        MODELS_FOLDER = str(tmp_path / name / 'models')
+        MODEL_POLL_SECONDS = 0
+    return TestConfig
+
+
+@pytest.fixture
+def apps(tmp_path):
+    apps = [smartagri.create_app(make_config(tmp_path, name)) for name in ('first', 'second')]
+    yield apps
+    for app in apps:
+        services = app.extensions['smartagri']
+        services.audit_log.close()
+        services.disease_model.close()
+
+
+def session_listeners(name):
+    return len(getattr(Session().dispatch, name))
+
+
+def test_each_app_has_its_own_services(apps):
+    first, second = (app.extensions['smartagri'] for app in apps)
+    assert first.app is apps[0] and second.app is apps[1]
+    assert first.disease_model is not second.disease_model
+    assert first.audit_log.app is apps[0]
+    with apps[1].app_context():
+        assert smartagri.get_services() is second
+
+
+def test_listeners_are_not_stacked_per_app(tmp_path, apps):
+    counts = [session_listeners(name) for name in ('before_commit', 'after_commit', 'after_rollback')]
+    extra = smartagri.create_app(make_config(tmp_path, 'third'))
+    try:
+        assert [session_listeners(name) for name in ('before_commit', 'after_commit', 'after_rollback')] == counts
+    finally:
+        extra.extensions['smartagri'].audit_log.close()
+        extra.extensions['smartagri'].disease_model.close()
+
+
+def test_queries_are_counted_on_their_own_app(apps):
+    first, second = (app.extensions['smartagri'].metrics for app in apps)
+    with apps[0].app_context():
+        smartagri.db.session.execute(text('SELECT 1'))
+    assert 'smartagri_sql_queries_total{context="background"} 1' in first.render()
+    assert 'sql_queries_total' not in second.render()
@@ -0,0 +1,125 @@
+import io
+import os
+import zipfile
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+import app as smartagri
+from bulk import ArchiveTooLarge, iter_upload_images, iter_zip_images
+from config import Config
+from migrate import upgrade
+
+EXTENSIONS = {'jpg', 'png'}
+
+
+def make_zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def test_yields_only_allowed_images():
+    archive = make_zip([('a.jpg', b'one'), ('notes.txt', b'skip'), ('dir/b.png', b'two')])
+    assert list(iter_zip_images(archive, EXTENSIONS)) == [('a.jpg', b'one'), ('dir/b.png', b'two')]
+
+
+def test_rejects_too_many_images():
+    archive = make_zip([(f'{i}.jpg', b'x') for i in range(3)])
+    with pytest.raises(ArchiveTooLarge):
+        next(iter_zip_images(archive, EXTENSIONS, max_images=2))
+
+
+def test_rejects_oversized_member_before_reading_any():
+    archive = make_zip([('small.jpg', b'x'), ('bomb.jpg', b'\0' * 1024 * 1024)])
+    images = iter_zip_images(archive, EXTENSIONS, max_image_bytes=64 * 1024)
+    with pytest.raises(ArchiveTooLarge, match='bomb.jpg'):
+        next(images)
+
+
+def test_rejects_total_uncompressed_size():
+    archive = make_zip([(f'{i}.jpg', b'\0' * 1000) for i in range(5)])
+    with pytest.raises(ArchiveTooLarge):
+        next(iter_zip_images(archive, EXTENSIONS, max_image_bytes=1000, max_total_bytes=4000))
+
+
+def test_understated_size_cannot_inflate_past_header():
+    archive = make_zip([('a.jpg', b'\0' * 1024 * 1024)])
+    raw = bytearray(archive.getvalue())
+    # Claim 100 bytes in both the local header and the central directory
+    local = raw.find(b'PK\x03\x04')
+    raw[local + 22:local + 26] = (100).to_bytes(4, 'little')
+    central = raw.find(b'PK\x01\x02')
+    raw[central + 24:central + 28] = (100).to_bytes(4, 'little')
+    with pytest.raises(zipfile.BadZipFile):
+        list(iter_zip_images(io.BytesIO(bytes(raw)), EXTENSIONS, max_image_bytes=1000))
+
+
+def upload(name, data):
+    return FileStorage(io.BytesIO(data), filename=name)
+
+
+def test_limits_cover_plain_files_and_archives_together():
+    files = [upload('a.jpg', b'x'), upload('survey.zip', make_zip([('b.jpg', b'y'), ('c.jpg', b'z')]).getvalue())]
+    assert [name for name, _ in iter_upload_images(files, EXTENSIONS, max_images=3)] == ['a.jpg', 'b.jpg', 'c.jpg']
+
+    files = [upload('a.jpg', b'x'), upload('survey.zip', make_zip([('b.jpg', b'y'), ('c.jpg', b'z')]).getvalue())]
+    with pytest.raises(ArchiveTooLarge):
+        list(iter_upload_images(files, EXTENSIONS, max_images=2))
+
+    files = [upload(f'{i}.jpg', b'x') for i in range(3)]
+    with pytest.raises(ArchiveTooLarge):
+        list(iter_upload_images(files, EXTENSIONS, max_images=2))
+
+
+def test_plain_file_sizes_are_limited():
+    with pytest.raises(ArchiveTooLarge, match='big.jpg'):
+        list(iter_upload_images([upload('big.jpg', b'\0' * 2000)], EXTENSIONS, max_image_bytes=1000))
+    files = [upload(f'{i}.jpg', b'\0' * 600) for i in range(2)]
+    with pytest.raises(ArchiveTooLarge):
+        list(iter_upload_images(files, EXTENSIONS, max_image_bytes=1000, max_total_bytes=1000))
+
+
+@pytest.fixture
+def client(tmp_path):
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "bulk.db"}'
+        UPLOAD_FOLDER = str(tmp_path / 'uploads')
+        MODELS_FOLDER = str(tmp_path / 'models')
+        MODEL_POLL_SECONDS = 0
+        BULK_MAX_UPLOAD_BYTES = 32 * 1024 * 1024
+
+    app = smartagri.create_app(TestConfig)
+    upgrade(app=app)
+    client = app.test_client()
+    client.post('/register', data={'username': 'surveyor', 'email': 'surveyor@example.com',
+                                   'phone': '1', 'password': 'secret'})
+    client.post('/login', data={'username': 'surveyor', 'password': 'secret'})
+    yield client
+    services = app.extensions['smartagri']
+    services.upload_store.flush(5)
+    services.audit_log.close()
+    services.disease_model.close()
+
+
+def test_bulk_upload_has_its_own_body_limit(client):
+    # 18 MB stored, over the 16 MB single-image limit but within the bulk one
+    members = [(f'{i}.jpg', os.urandom(6 * 1024 * 1024)) for i in range(3)]
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    survey = buffer.getvalue()
+
+    response = client.post('/bulk-detection', data={'archive': (io.BytesIO(survey), 'survey.zip')})
+    assert response.status_code == 200
+    assert response.get_json()['summary']['images'] == 3
+
+    response = client.post('/take-photo', data={'photo': (io.BytesIO(survey), 'big.jpg')})
+    assert response.status_code == 413
+
+    response = client.post('/bulk-detection', data={'archive': (io.BytesIO(survey * 2), 'survey.zip')})
+    assert response.status_code == 413
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from chat_engine import DEFAULT_RESPONSE, ChatEngine, LanguageIntents, compile_keywords
+
+INTENTS_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'chat_intents')
+
+
+def matches(pattern, text):
+    return [m.group() for m in pattern.finditer(text)]
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('hi there', ['hi']),
+    ('this is a thing', []),
+    ('say hi!', ['hi']),
+    ('(hi)', ['hi']),
+    ('hint', []),
+    ('oh hey, hi', ['hey', 'hi']),
+])
+def test_keywords_match_whole_words_only(text, expected):
+    assert matches(compile_keywords(['hi', 'hey']), text) == expected
+
+
+def test_longest_keyword_wins_over_shared_prefix():
+    pattern = compile_keywords(['leaf', 'leaf spot', 'treat', 'treatment'])
+    assert matches(pattern, 'leaf spot treatment') == ['leaf spot', 'treatment']
+    assert matches(pattern, 'leaf spots') == ['leaf']
+    assert matches(pattern, 'treats') == []
+
+
+def test_special_characters_are_literal():
+    pattern = compile_keywords(['ph', 'n.p.k'])
+    assert matches(pattern, 'soil ph and n.p.k levels') == ['ph', 'n.p.k']
+    assert matches(pattern, 'nxpxk') == []
+
+
+def test_earlier_intent_wins():
+    intents = LanguageIntents([
+        {'keywords': ['blight'], 'response': 'blight'},
+        {'keywords': ['treat', 'blight'], 'response': 'treat'},
+    ])
+    assert intents.match('how do I treat blight') == 'blight'
+    assert intents.match('how do I treat it') == 'treat'
+    assert intents.match('this is nothing') is None
+
+
+def test_engine_falls_back_to_default():
+    engine = ChatEngine.from_directory(INTENTS_FOLDER)
+    assert engine.respond('hello') != DEFAULT_RESPONSE
+    assert engine.respond('this') == engine.languages['en'].default
+    assert engine.respond('hello', language='xx') == engine.respond('hello')
@@ -0,0 +1,93 @@
+import io
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from PIL import Image
+
+import app as smartagri
+from jobs import QUEUED, JobQueue, JobQueueFull
+
+
+def make_jpeg():
+    out = io.BytesIO()
+    Image.new('RGB', (320, 240), (40, 140, 50)).save(out, 'JPEG')
+    return out.getvalue()
+
+
+def test_job_status_is_visible_from_another_worker(workers):
+    first, second = workers
+    response = first.post('/api/detections', data={'photo': (io.BytesIO(make_jpeg()), 'leaf.jpg')})
+    assert response.status_code == 202
+    job = response.get_json()
+
+    deadline = time.monotonic() + 10
+    while True:
+        status = second.get(job['status_url'])
+        assert status.status_code == 200
+        body = status.get_json()
+        if body['status'] == 'done' or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+    assert body['status'] == 'done'
+    assert body['result']['prediction']
+
+    events = second.get(job['events_url'])
+    assert events.get_data(as_text=True).startswith('event: result')
+
+
+def test_unknown_job_is_404(workers):
+    assert workers[1].get('/api/detections/not-a-job').status_code == 404
+
+
+def test_full_queue_rejects_jobs():
+    queue = JobQueue(max_workers=1, max_pending=1)
+    release = threading.Event()
+    queue.submit(release.wait, 5)
+    with pytest.raises(JobQueueFull):
+        queue.submit(release.wait, 5)
+    release.set()
+    queue.shutdown()
+    assert queue.stats()['rejected'] == 1
+    # The slot is free again once the job has run
+    queue = JobQueue(max_workers=1, max_pending=1)
+    queue.submit(lambda: None).result(5)
+    queue.submit(lambda: None).result(5)
+    queue.shutdown()
+
+
+def test_busy_server_answers_503(workers):
+    first = workers[0]
+    first.application.extensions['smartagri'].detection_jobs = JobQueue(max_workers=1, max_pending=0)
+    response = first.post('/api/detections', data={'photo': (io.BytesIO(make_jpeg()), 'leaf.jpg')})
+    assert response.status_code == 503
+    with first.application.app_context():
+        assert smartagri.DetectionJob.query.count() == 0
+
+
+def test_events_stream_closes_while_the_job_is_pending(workers):
+    first = workers[0]
+    app = first.application
+    app.config['DETECTION_JOB_STREAM_SECONDS'] = 0
+    with app.app_context():
+        user = smartagri.User.query.filter_by(username='grower').one()
+        smartagri.db.session.add(smartagri.DetectionJob(id='stuck', user_id=user.id, status=QUEUED,
+                                                        created_at=datetime.utcnow()))
+        smartagri.db.session.commit()
+    events = first.get('/api/detections/stuck/events')
+    assert events.get_data(as_text=True).startswith('event: pending')
+
+
+def test_take_photo_links_to_its_own_detection(workers):
+    first, second = workers
+    response = first.post('/take-photo', data={'photo': (io.BytesIO(make_jpeg()), 'leaf.jpg')})
+    body = response.get_json()
+    assert body['success'] and body['detection_id']
+
+    # Saved before answering, so any worker can render it
+    page = second.get(body['result_url']).get_data(as_text=True)
+    assert body['prediction'] in page
+
+    page = second.get('/disease-detection?camera_result=latest').get_data(as_text=True)
+    assert 'Detection result not found' in page
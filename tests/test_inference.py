@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from inference import BatchedInferenceEngine
+
+
+class FixedModel:
+    version = 'fixed'
+
+    def __init__(self, rows=None):
+        self.rows = rows
+
+    def predict_batch(self, images):
+        count = len(images) if self.rows is None else self.rows
+        return np.tile(np.array([0.1, 0.9], dtype=np.float32), (count, 1))
+
+
+@pytest.fixture
+def engine():
+    engine = BatchedInferenceEngine(FixedModel(), max_batch_size=4, max_wait_ms=1)
+    yield engine
+    engine.close(5)
+
+
+def test_predicts_through_the_batcher(engine):
+    assert engine.predict_disease(np.zeros(3), timeout=5) == (1, 0.9)
+
+
+def test_bad_batch_fails_its_requests_but_not_the_worker(engine):
+    engine.swap_model(FixedModel(rows=0))
+    with pytest.raises(ValueError):
+        engine.predict_top_k(np.zeros(3), timeout=5)
+    assert engine.stats()['errors'] == 1
+
+    engine.swap_model(FixedModel())
+    assert engine.predict_top_k(np.zeros(3), k=1, timeout=5) == [(1, pytest.approx(0.9))]
+
+
+def test_dead_worker_is_restarted(engine):
+    engine.predict_disease(np.zeros(3), timeout=5)
+    engine._queue.put(None)  # stop the batching thread as a crash would
+    engine._worker.join(5)
+    assert engine.predict_disease(np.zeros(3), timeout=5) == (1, 0.9)
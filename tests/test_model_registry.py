@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+import app as smartagri
+from config import Config
+from model_registry import ModelNotReady, ModelRegistry
+
+
+class FakeEngine:
+    max_batch_size = 1
+    model_version = 'placeholder'
+    first_batch_ms = None
+
+    def swap_model(self, model):
+        previous, self.model_version = self.model_version, model
+        return previous
+
+
+def make_registry(tmp_path, loader, artifact=True):
+    if artifact:
+        (tmp_path / 'leaf.npz').write_bytes(b'')
+    return ModelRegistry(FakeEngine(), str(tmp_path), (8, 8), loader=loader, warmup_runs=0)
+
+
+def test_placeholder_serves_without_artifacts(tmp_path):
+    registry = make_registry(tmp_path, loader=lambda path: 'leaf', artifact=False)
+    assert registry.wait_ready(5)
+    assert not registry.ready
+
+
+def test_waits_for_the_artifact_to_load(tmp_path):
+    release = threading.Event()
+
+    def slow_loader(path):
+        release.wait(5)
+        return 'leaf'
+
+    registry = make_registry(tmp_path, slow_loader)
+    assert not registry.wait_ready(0.05)
+
+    release.set()
+    assert registry.wait_ready(5)
+    assert registry.engine.model_version == 'leaf'
+
+
+def test_broken_artifact_is_not_served_by_the_placeholder(tmp_path):
+    def broken_loader(path):
+        raise ValueError('truncated')
+
+    registry = make_registry(tmp_path, broken_loader)
+    assert not registry.wait_ready(5)
+    assert 'truncated' in registry.last_error
+
+
+def test_predictions_wait_for_the_model(tmp_path):
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path}/app.db'
+        UPLOAD_FOLDER = str(tmp_path / 'uploads')
+        MODELS_FOLDER = str(tmp_path / 'models')
+        MODEL_POLL_SECONDS = 0
+        MODEL_READY_TIMEOUT = 5
+
+    (tmp_path / 'models').mkdir()
+    (tmp_path / 'models' / 'leaf.npz').write_bytes(b'not a model')
+    app = smartagri.create_app(TestConfig)
+    services = app.extensions['smartagri']
+    try:
+        with app.app_context():
+            with pytest.raises(ModelNotReady):
+                smartagri.predict_upload(b'', 'key', 1)
+    finally:
+        services.audit_log.close()
+        services.disease_model.close()
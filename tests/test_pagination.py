@@ -0,0 +1,101 @@
+import base64
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page, row_to_dict, stream_export
+
+Base = declarative_base()
+
+
+class Row(Base):
+    __tablename__ = 'row'
+    id = Column(Integer, primary_key=True)
+    created = Column(DateTime, nullable=False)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def add_rows(session, times):
+    session.add_all(Row(id=index + 1, created=moment) for index, moment in enumerate(times))
+    session.commit()
+
+
+def all_pages(session, limit):
+    pages, cursor = [], None
+    while True:
+        rows, cursor = keyset_page(session.query(Row), Row.created, Row.id, cursor, limit)
+        pages.append([row.id for row in rows])
+        if cursor is None:
+            return pages
+
+
+def b64(text):
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip('=')
+
+
+def test_cursor_round_trips():
+    moment = datetime(2024, 5, 17, 9, 30, 12, 345678)
+    assert decode_cursor(encode_cursor(moment, 42)) == (moment, 42)
+
+
+def test_pages_cover_every_row_once_newest_first(session):
+    start = datetime(2024, 1, 1)
+    add_rows(session, [start + timedelta(minutes=index) for index in range(7)])
+    assert all_pages(session, 3) == [[7, 6, 5], [4, 3, 2], [1]]
+
+
+def test_equal_timestamps_across_a_page_boundary(session):
+    same = datetime(2024, 1, 1, 12)
+    add_rows(session, [same - timedelta(hours=1)] + [same] * 5)
+    pages = all_pages(session, 2)
+    # Ties are broken by id, so nothing is skipped or repeated at the boundaries
+    assert pages == [[6, 5], [4, 3], [2, 1]]
+
+
+def test_last_full_page_has_no_cursor(session):
+    add_rows(session, [datetime(2024, 1, 1) + timedelta(seconds=index) for index in range(4)])
+    rows, cursor = keyset_page(session.query(Row), Row.created, Row.id, limit=4)
+    assert len(rows) == 4 and cursor is None
+
+
+@pytest.mark.parametrize('cursor', [
+    'garbage!',
+    '%%%%',
+    b64('no separator'),
+    b64('2024-01-01T00:00:00|not-an-id'),
+    b64('yesterday|5'),
+    b64('2024-01-01T00:00:00|1|2'),
+    base64.urlsafe_b64encode(b'\xff\xfe|1').decode(),
+])
+def test_tampered_cursors_are_rejected(session, cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+    with pytest.raises(InvalidCursor):
+        keyset_page(session.query(Row), Row.created, Row.id, cursor)
+
+
+class Detection:
+    id = 1
+    created = datetime(2024, 5, 1, 12, 0)
+    top_predictions = '[{"disease": "Early Blight", "confidence": 0.8}]'
+
+
+def test_json_columns_are_decoded_except_in_csv():
+    fields = ['id', 'created', 'top_predictions']
+    values = row_to_dict(Detection(), fields, json_fields=['top_predictions'])
+    assert values['top_predictions'] == [{'disease': 'Early Blight', 'confidence': 0.8}]
+    assert values['created'] == '2024-05-01T12:00:00'
+
+    ndjson = ''.join(stream_export([Detection()], fields, 'ndjson', ['top_predictions']))
+    assert '"top_predictions": [{' in ndjson
+    csv_text = ''.join(stream_export([Detection()], fields, 'csv', ['top_predictions']))
+    assert '""disease""' in csv_text
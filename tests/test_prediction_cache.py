@@ -0,0 +1,112 @@
+import random
+
+import numpy as np
+
+from prediction_cache import PredictionCache, colour_signature, perceptual_hash
+
+
+def flip(phash, bits):
+    for bit in bits:
+        phash ^= 1 << bit
+    return phash
+
+
+def test_exact_hit_and_version_invalidation():
+    cache = PredictionCache()
+    cache.put('a', 'v1', 'blight')
+    assert cache.get('a', 'v1') == 'blight'
+    assert cache.get('a', 'v2') is None
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_finds_near_duplicates_within_distance():
+    cache = PredictionCache(max_phash_distance=4, max_colour_distance=None)
+    rng = random.Random(1)
+    base = rng.getrandbits(64)
+    cache.put('a', 'v1', 'blight', phash=base)
+    # Spread the flips over every band, the worst case for the index
+    assert cache.find_similar(flip(base, [0, 17, 33, 60]), 'v1') == 'blight'
+    assert cache.find_similar(flip(base, [0, 13, 26, 39, 52]), 'v1') is None
+
+
+def test_prefers_the_closest_match():
+    cache = PredictionCache(max_phash_distance=4, max_colour_distance=None)
+    base = 0x0123456789ABCDEF
+    cache.put('far', 'v1', 'far', phash=flip(base, [1, 2, 3]))
+    cache.put('near', 'v1', 'near', phash=flip(base, [40]))
+    assert cache.find_similar(base, 'v1') == 'near'
+
+
+def test_index_agrees_with_a_linear_scan():
+    cache = PredictionCache(max_entries=500, max_phash_distance=4, max_colour_distance=None)
+    rng = random.Random(7)
+    hashes = {}
+    for index in range(2000):
+        # Near-duplicate clusters, so evictions and replacements hit indexed keys
+        base = rng.getrandbits(64) if index % 4 == 0 else flip(rng.choice(list(hashes.values())), [rng.randrange(64)])
+        key = f'k{rng.randrange(800)}'
+        cache.put(key, 'v1', key, phash=base)
+        hashes[key] = base
+        hashes = {k: h for k, h in hashes.items() if k in cache._entries}
+
+    for _ in range(500):
+        query = flip(rng.choice(list(hashes.values())), rng.sample(range(64), rng.randrange(7)))
+        distances = {key: (phash ^ query).bit_count() for key, phash in hashes.items()}
+        closest = min(distances.values())
+        found = cache.find_similar(query, 'v1')
+        if closest <= 4:
+            assert distances[found] == closest
+        else:
+            assert found is None
+
+
+def test_evicted_entries_leave_the_index():
+    cache = PredictionCache(max_entries=1, max_phash_distance=4, max_colour_distance=None)
+    cache.put('a', 'v1', 'a', phash=1)
+    cache.put('b', 'v1', 'b', phash=(1 << 64) - 1)
+    assert cache.find_similar(1, 'v1') is None
+    assert all(not index or len(index) == 1 for index in cache._band_index)
+
+
+def leaf(seed=0):
+    rng = np.random.default_rng(seed)
+    image = np.zeros((64, 64, 3), dtype=np.float32)
+    image[..., 1] = np.linspace(0.3, 0.8, 64)[None, :]
+    image[..., 0] = 0.2 + 0.1 * rng.random((64, 64))
+    return image
+
+
+def remember(cache, key, image, owner):
+    cache.put(key, 'v1', key, phash=perceptual_hash(image), owner=owner, colour=colour_signature(image))
+
+
+def lookup(cache, image, owner):
+    return cache.find_similar(perceptual_hash(image), 'v1', owner=owner, colour=colour_signature(image))
+
+
+def test_colour_separates_images_with_the_same_hash():
+    cache = PredictionCache(max_phash_distance=4)
+    green, brown = np.zeros((64, 64, 3), np.float32), np.zeros((64, 64, 3), np.float32)
+    green[..., 1] = 0.6
+    brown[..., 0], brown[..., 1] = 0.4, 0.2
+    swapped = leaf()[..., [1, 0, 2]]
+    assert perceptual_hash(green) == perceptual_hash(brown)
+    assert perceptual_hash(swapped) == perceptual_hash(leaf())
+
+    remember(cache, 'green', green, owner=1)
+    remember(cache, 'leaf', leaf(), owner=1)
+    assert lookup(cache, green * 1.01, owner=1) == 'green'
+    assert lookup(cache, brown, owner=1) is None
+    assert lookup(cache, swapped, owner=1) is None
+
+
+def test_near_duplicates_stay_with_their_owner_and_window():
+    cache = PredictionCache(max_phash_distance=4, near_duplicate_seconds=60)
+    remember(cache, 'leaf', leaf(), owner=1)
+    assert lookup(cache, leaf(), owner=2) is None
+    assert lookup(cache, leaf(), owner=1) == 'leaf'
+    # Exact content matches are still shared
+    assert cache.get('leaf', 'v1') == 'leaf'
+
+    cache.near_duplicate_seconds = 0
+    assert lookup(cache, leaf(), owner=1) is None
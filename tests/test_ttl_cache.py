@@ -0,0 +1,63 @@
+from auth import CachedUser, UserCache
+from ttl_cache import TTLCache
+
+
+def test_evicts_least_recently_used():
+    removed = []
+    cache = TTLCache(2, on_remove=lambda key, value: removed.append(key))
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert removed == ['b']
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('ttl_cache.time.monotonic', lambda: now[0])
+    removed = []
+    cache = TTLCache(10, ttl_seconds=5, on_remove=lambda key, value: removed.append((key, value)))
+    cache.put('a', 1)
+    now[0] += 4
+    assert cache.get('a') == 1
+    now[0] += 2
+    assert cache.get('a') is None
+    assert removed == [('a', 1)]
+    assert cache.stats()['expirations'] == 1
+
+
+def test_replacing_reports_the_old_value():
+    removed = []
+    cache = TTLCache(10, on_remove=lambda key, value: removed.append(value))
+    cache.put('a', 1)
+    cache.put('a', 2)
+    assert removed == [1]
+    assert cache.get('a') == 2
+
+
+def test_user_cache_loads_once_and_invalidates():
+    loads = []
+
+    def loader(user_id):
+        loads.append(user_id)
+        return CachedUser(user_id, f'user{user_id}', f'user{user_id}@example.com') if user_id < 10 else None
+
+    cache = UserCache(loader)
+    assert cache.get(1).username == 'user1'
+    assert cache.get(1).username == 'user1'
+    assert cache.get(99) is None and cache.get(99) is None
+    cache.invalidate(1)
+    cache.get(1)
+    assert loads == [1, 99, 99, 1]
+    stats = cache.stats()
+    assert (stats['hits'], stats['invalidations']) == (1, 1)
+
+
+def test_user_cache_with_zero_ttl_always_loads():
+    loads = []
+    cache = UserCache(lambda user_id: loads.append(user_id) or CachedUser(user_id, 'u', 'u@x'), ttl_seconds=0)
+    cache.get(1)
+    cache.get(1)
+    assert loads == [1, 1]
@@ -0,0 +1,89 @@
+import io
+import logging
+import os
+import threading
+import time
+
+from PIL import Image
+
+from metrics import Metrics
+from upload_store import UploadStore
+
+
+def make_png(colour=(40, 160, 60)):
+    out = io.BytesIO()
+    Image.new('RGB', (64, 48), colour).save(out, 'PNG')
+    return out.getvalue()
+
+
+def test_save_writes_original_and_thumbnails(tmp_path):
+    store = UploadStore(str(tmp_path))
+    relative_path = store.save(make_png(), 'leaf.png')
+    assert store.flush(5)
+    assert (tmp_path / relative_path).exists()
+    for tier in store.thumbnail_sizes:
+        assert store.thumbnail(relative_path, tier) != relative_path
+    assert store.stats()['stored'] == 1
+
+
+def test_file_save_span_covers_the_write(tmp_path):
+    metrics = Metrics()
+    store = UploadStore(str(tmp_path), metrics=metrics)
+    store.save(make_png(), 'leaf.png')
+    assert store.flush(5)
+    assert 'smartagri_stage_seconds_count{stage="file_save"} 1' in metrics.render()
+
+
+def test_writes_inline_once_the_queue_is_full(tmp_path):
+    store = UploadStore(str(tmp_path), workers=1, max_pending=1)
+    release = threading.Event()
+    store._pool.submit(release.wait)  # hold the only worker
+
+    queued = store.save(make_png((1, 2, 3)), 'a.png')
+    inline = store.save(make_png((4, 5, 6)), 'b.png')
+    assert (tmp_path / inline).exists()
+    assert not (tmp_path / queued).exists()
+    assert store.stats()['synchronous'] == 1
+
+    release.set()
+    assert store.flush(5)
+    assert (tmp_path / queued).exists()
+
+
+def test_failed_write_is_logged_and_counted(tmp_path, caplog):
+    store = UploadStore(str(tmp_path))
+    with caplog.at_level(logging.ERROR, logger='upload_store'):
+        store.save(b'\x89PNG\r\n\x1a\n not really a png', 'broken.png')
+        assert store.flush(5)
+    assert store.stats()['errors'] == 1
+    assert 'Could not store upload' in caplog.text
+
+
+def age(root, days):
+    moment = time.time() - days * 86400
+    for directory, _, names in os.walk(root):
+        for name in names:
+            os.utime(os.path.join(directory, name), (moment, moment))
+
+
+def test_compact_works_one_shard_at_a_time(tmp_path):
+    store = UploadStore(str(tmp_path))
+    kept = store.save(make_png((40, 160, 60)), 'kept.png')
+    orphan = store.save(make_png((160, 40, 60)), 'orphan.png')
+    assert store.flush(5)
+    age(tmp_path, 10)
+
+    asked = []
+
+    def referenced_keys(shard):
+        asked.append(shard)
+        return {os.path.splitext(os.path.basename(kept))[0]} if kept.startswith(shard + '/') else set()
+
+    summary = store.compact(referenced_keys, retention_days=7)
+    assert sorted(asked) == sorted({os.path.dirname(kept), os.path.dirname(orphan)})
+    assert summary['orphans'] == 1 and summary['expired'] == 1 and summary['thumbnails'] == 2
+    assert not (tmp_path / orphan).exists()
+
+    # The expired original's link falls back to its largest thumbnail
+    assert not (tmp_path / kept).exists()
+    assert store.original(kept) == store.thumbnail_relative_path(kept, 'medium')
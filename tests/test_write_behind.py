@@ -0,0 +1,154 @@
+import logging
+
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.exc import OperationalError
+
+from write_behind import WriteBehindBuffer, is_transient
+
+db = SQLAlchemy()
+
+
+class Event(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(20), unique=True, nullable=False)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path / "events.db"}'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+@pytest.fixture
+def make_buffer(app):
+    buffers = []
+
+    def make(**options):
+        # The background thread never flushes on its own during a test
+        options.setdefault('max_rows', 1000)
+        options.setdefault('max_delay', 60)
+        buffer = WriteBehindBuffer(app, db, **options)
+        buffers.append(buffer)
+        return buffer
+
+    yield make
+    for buffer in buffers:
+        buffer.max_delay = 0
+        buffer.close()
+
+
+def names(app):
+    with app.app_context():
+        return sorted(event.name for event in Event.query.all())
+
+
+def locked():
+    return OperationalError('INSERT INTO event', {}, Exception('database is locked'))
+
+
+def test_flush_writes_queued_rows_in_one_transaction(app, make_buffer):
+    buffer = make_buffer()
+    for name in ('a', 'b', 'c'):
+        buffer.add(Event, name=name)
+    assert [row.name for row in buffer.pending(Event)] == ['a', 'b', 'c']
+
+    assert buffer.flush() == 3
+    assert names(app) == ['a', 'b', 'c']
+    assert buffer.pending(Event) == []
+    stats = buffer.stats()
+    assert (stats['rows_written'], stats['transactions'], stats['failures']) == (3, 1, 0)
+
+
+def test_transient_failure_requeues_the_batch(app, make_buffer, monkeypatch):
+    buffer = make_buffer()
+    buffer.add(Event, name='a')
+    write = buffer._write
+    calls = []
+
+    def flaky(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise locked()
+        write(batch)
+
+    monkeypatch.setattr(buffer, '_write', flaky)
+    assert buffer.flush() == 0
+    assert [row.name for row in buffer.pending(Event)] == ['a']
+    assert buffer.flush() == 1
+    assert names(app) == ['a']
+    stats = buffer.stats()
+    assert (stats['failures'], stats['retries'], stats['dead_lettered']) == (1, 1, 0)
+
+
+def test_bad_row_is_dropped_without_blocking_the_rest(app, make_buffer, caplog):
+    buffer = make_buffer()
+    for name in ('a', 'b', 'a', 'c'):  # the second 'a' violates the unique constraint
+        buffer.add(Event, name=name)
+    with caplog.at_level(logging.ERROR, logger='write_behind'):
+        assert buffer.flush() == 3
+    assert names(app) == ['a', 'b', 'c']
+    assert buffer.pending(Event) == []
+    assert buffer.stats()['dead_lettered'] == 1
+    assert "dropped a Event row it could not write: {'name': 'a'}" in caplog.text
+
+
+def test_retries_are_bounded(app, make_buffer, monkeypatch):
+    buffer = make_buffer(max_retries=2)
+    buffer.add(Event, name='a')
+
+    def always_locked(batch):
+        raise locked()
+
+    monkeypatch.setattr(buffer, '_write', always_locked)
+    for _ in range(3):
+        buffer.flush()
+    assert buffer.pending(Event) == []
+    stats = buffer.stats()
+    assert (stats['retries'], stats['dead_lettered']) == (2, 1)
+
+
+def test_full_queue_commits_inline(app, make_buffer):
+    buffer = make_buffer(max_queue=2)
+    with app.app_context():
+        for name in ('a', 'b', 'c'):
+            buffer.add(Event, name=name)
+    assert names(app) == ['c']
+    assert buffer.stats()['overflow_writes'] == 1
+    assert buffer.flush() == 2
+
+
+def test_only_lock_contention_is_transient():
+    assert is_transient(locked())
+    assert not is_transient(OperationalError('INSERT', {}, Exception('no such column: top_predictions')))
+    assert not is_transient(ValueError('bad row'))
+
+
+def share_session(source, target):
+    """Send the browser session of one worker's client to the other worker"""
+    target.set_cookie('session', source.get_cookie('session').value)
+
+
+def test_own_writes_are_visible_on_another_worker(workers):
+    first, second = workers
+    first.post('/chat', data={'message': 'how do I treat blight?'})
+    share_session(first, second)
+    items = second.get('/api/chat-history').get_json()['items']
+    assert [item['message'] for item in items] == ['how do I treat blight?']
+
+
+def test_logout_on_another_worker_closes_the_login_session(workers):
+    first, second = workers
+    first.post('/login', data={'username': 'grower', 'password': 'secret'}, headers={'User-Agent': 'field-phone'})
+    share_session(first, second)
+    second.get('/logout')
+    with second.application.app_context():
+        from app import UserSession
+        closed = UserSession.query.filter(UserSession.logout_time.isnot(None)).all()
+    # The login made through the first worker, not the latest open session
+    assert [row.user_agent for row in closed] == ['field-phone']
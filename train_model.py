@@ -0,0 +1,152 @@
+"""Train a LinearDiseaseModel on the memory-mapped dataset cache.
+
+Usage:  python train_model.py [--cache dataset/cache] [--output models/] [--tiered]
+
+Reads batches straight from the cache built by dataset_ingest.py, fits a
+softmax classifier over pooled colour features, calibrates its confidence
+with temperature scaling on the validation split and writes a versioned
+``models/linear-<timestamp>.npz`` artifact for the model registry.
+
+``--tiered`` also trains a cheap low-resolution first stage and writes a
+``models/tiered-<timestamp>.npz`` early-exit cascade instead.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from dataset_ingest import DatasetStore
+from model import DISEASE_CLASSES, LinearDiseaseModel, TieredDiseaseModel, pool_features, softmax, stack_images
+
+
+def train(store, feature_size=8, epochs=10, batch_size=256, learning_rate=0.5, l2=1e-4, seed=0, stride=1):
+    num_classes = len(DISEASE_CLASSES)
+    split = 'train' if len(store.indices('train')) else None
+
+    # Feature standardisation from one pass over the training data
+    total = None
+    total_sq = None
+    count = 0
+    for images, labels in store.iter_batches(batch_size, split=split):
+        features = pool_features(stack_images(images, stride), feature_size).astype(np.float64)
+        total = features.sum(axis=0) if total is None else total + features.sum(axis=0)
+        total_sq = (features ** 2).sum(axis=0) if total_sq is None else total_sq + (features ** 2).sum(axis=0)
+        count += len(features)
+    mean = (total / count).astype(np.float32)
+    std = np.sqrt(np.maximum(total_sq / count - mean.astype(np.float64) ** 2, 1e-12)).astype(np.float32)
+
+    rng = np.random.default_rng(seed)
+    weights = (rng.standard_normal((len(mean), num_classes)) * 0.01).astype(np.float32)
+    bias = np.zeros(num_classes, dtype=np.float32)
+    for epoch in range(epochs):
+        loss = 0.0
+        for images, labels in store.iter_batches(batch_size, split=split, shuffle=True, seed=seed + epoch):
+            features = (pool_features(stack_images(images, stride), feature_size) - mean) / std
+            probs = softmax(features @ weights + bias)
+            loss += -np.log(probs[np.arange(len(labels)), labels] + 1e-9).sum()
+            probs[np.arange(len(labels)), labels] -= 1.0
+            probs /= len(labels)
+            weights -= learning_rate * (features.T @ probs + l2 * weights)
+            bias -= learning_rate * probs.sum(axis=0)
+        print(f"   epoch {epoch + 1}/{epochs}: loss {loss / count:.4f}")
+
+    version = time.strftime('linear-%Y%m%d%H%M%S')
+    return LinearDiseaseModel(weights, bias, mean, std, feature_size, version, stride=stride)
+
+
+def fit_temperature(model, store, split=None, batch_size=256):
+    """Softmax temperature minimising held-out negative log-likelihood"""
+    logits = []
+    labels = []
+    for images, batch_labels in store.iter_batches(batch_size, split=split):
+        logits.append(model.logits(images))
+        labels.append(batch_labels)
+    logits = np.concatenate(logits).astype(np.float64)
+    labels = np.concatenate(labels)
+
+    def nll(temperature):
+        scaled = logits / temperature
+        scaled -= scaled.max(axis=1, keepdims=True)
+        log_norm = np.log(np.exp(scaled).sum(axis=1))
+        return float((log_norm - scaled[np.arange(len(labels)), labels]).mean())
+
+    # Coarse log-spaced grid, then refine around the best value
+    grid = np.exp(np.linspace(np.log(0.05), np.log(20.0), 61))
+    best = min(grid, key=nll)
+    return float(min(best * np.exp(np.linspace(-0.1, 0.1, 21)), key=nll))
+
+
+def calibration_error(model, store, split=None, batch_size=256, bins=10):
+    """Expected calibration error of the top-1 confidence"""
+    confidences = []
+    correct = []
+    for images, labels in store.iter_batches(batch_size, split=split):
+        probs = model.predict_batch(images)
+        confidences.append(probs.max(axis=1))
+        correct.append(probs.argmax(axis=1) == labels)
+    confidences = np.concatenate(confidences)
+    correct = np.concatenate(correct)
+    bin_index = np.minimum((confidences * bins).astype(int), bins - 1)
+    error = 0.0
+    for index in range(bins):
+        in_bin = bin_index == index
+        if in_bin.any():
+            error += in_bin.mean() * abs(confidences[in_bin].mean() - correct[in_bin].mean())
+    return error
+
+
+def evaluate(model, store, split=None, batch_size=256):
+    correct = 0
+    total = 0
+    for images, labels in store.iter_batches(batch_size, split=split):
+        correct += int((model.predict_batch(images).argmax(axis=1) == labels).sum())
+        total += len(labels)
+    return correct / total if total else 0.0
+
+
+def calibrate(model, store, split=None):
+    """Fit the model's temperature, keeping it only if it lowers the held-out calibration error"""
+    before = calibration_error(model, store, split=split)
+    model.temperature = fit_temperature(model, store, split=split)
+    after = calibration_error(model, store, split=split)
+    if after > before:
+        model.temperature = 1.0
+    print(f"   temperature {model.temperature:.3f}, calibration error {before:.3f} -> {min(before, after):.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the disease classifier from the dataset cache')
+    parser.add_argument('--cache', default=os.path.join('dataset', 'cache'))
+    parser.add_argument('--output', default='models')
+    parser.add_argument('--feature-size', type=int, default=8)
+    parser.add_argument('--epochs', type=int, default=10)
+    parser.add_argument('--tiered', action='store_true', help='Also train a low-resolution early-exit stage')
+    parser.add_argument('--exit-threshold', type=float, default=0.9)
+    args = parser.parse_args()
+
+    store = DatasetStore(args.cache)
+    split = 'valid' if len(store.indices('valid')) else None
+    model = train(store, feature_size=args.feature_size, epochs=args.epochs)
+    calibrate(model, store, split)
+    print(f"✅ {split or 'all'} accuracy: {evaluate(model, store, split=split):.3f}")
+
+    if args.tiered:
+        print("🔄 Training the low-resolution first stage")
+        crop_model = train(store, feature_size=4, epochs=args.epochs, stride=4)
+        calibrate(crop_model, store, split)
+        model = TieredDiseaseModel(crop_model, model, args.exit_threshold,
+                                   version=model.version.replace('linear-', 'tiered-'))
+        print(f"✅ tiered {split or 'all'} accuracy: {evaluate(model, store, split=split):.3f}, "
+              f"early exits {model.stats()['early_exit_rate']:.1%}")
+
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, model.version + '.npz')
+    model.save(path)
+    print(f"✅ Saved {path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
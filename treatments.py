@@ -0,0 +1,133 @@
+import re
+import threading
+import time
+
+from sqlalchemy import text
+
+DEFAULT_TREATMENTS = {
+    'Early_blight': 'Use copper-based fungicides. Remove infected leaves. Practice crop rotation. Ensure proper plant spacing.',
+    'Late_blight': 'Apply fungicides containing chlorothalonil. Remove and destroy infected plants. Avoid overhead watering.',
+    'Powdery_mildew': 'Use sulfur-based fungicides. Improve air circulation. Apply neem oil every 7-10 days.',
+    'Leaf_spot': 'Remove infected leaves. Apply copper fungicide. Avoid overhead watering.',
+    'healthy': 'Plant is healthy! Continue good agricultural practices including proper watering and fertilization.'
+}
+
+DEFAULT_TREATMENT = 'Consult local agricultural expert for specific treatment recommendations. Practice crop rotation and maintain plant health.'
+
+# Trigram FTS5 index over the recommendation catalogue, kept in sync by triggers
+FTS_TABLE = 'pest_recommendation_fts'
+FTS_MIN_QUERY_LENGTH = 3  # trigram tokens cannot match shorter terms
+
+_FTS_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        disease_name, content='pest_recommendation', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON pest_recommendation BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, disease_name) VALUES (new.id, new.disease_name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON pest_recommendation BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, disease_name) VALUES ('delete', old.id, old.disease_name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON pest_recommendation BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, disease_name) VALUES ('delete', old.id, old.disease_name);
+        INSERT INTO {FTS_TABLE}(rowid, disease_name) VALUES (new.id, new.disease_name);
+    END""",
+]
+
+FTS_SEARCH_SQL = f"""SELECT pest_recommendation.* FROM pest_recommendation
+    JOIN {FTS_TABLE} ON {FTS_TABLE}.rowid = pest_recommendation.id
+    WHERE {FTS_TABLE} MATCH :query ORDER BY {FTS_TABLE}.rank"""
+
+
+def create_search_index(connection):
+    """Create the FTS5 index and its sync triggers - returns False if FTS5 is unavailable"""
+    if connection.dialect.name != 'sqlite':
+        return False
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+    ).first()
+    try:
+        for statement in _FTS_SCHEMA:
+            connection.execute(text(statement))
+    except Exception:
+        return False
+    if not exists:
+        # Index rows that were there before the FTS table
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    return True
+
+
+def has_search_index(connection):
+    if connection.dialect.name != 'sqlite':
+        return False
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+    ).first() is not None
+
+
+def fts_query(term):
+    """Quote a user search term as an FTS5 substring (phrase) query on disease_name"""
+    return 'disease_name : "' + term.replace('"', '""') + '"'
+
+
+def _normalize(name):
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
+def _catalogue_treatment(rec):
+    parts = [rec.get('chemical_treatment'), rec.get('organic_treatment'), rec.get('preventive_measures')]
+    return ' '.join(part for part in parts if part)
+
+
+class TreatmentIndex:
+    """Precomputed disease-class -> treatment map.
+
+    Built from the PestRecommendation catalogue (falling back to the built-in
+    advice), rebuilt lazily after ``invalidate()`` or once ``max_age`` seconds
+    old so catalogue edits made by other processes are picked up too.
+    """
+
+    def __init__(self, disease_classes, loader, max_age=300):
+        self.disease_classes = list(disease_classes)
+        self.loader = loader
+        self.max_age = max_age
+        self._by_name = {}
+        self._catalogue = []
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._built_at = None
+
+    def build(self):
+        catalogue = sorted(
+            ((_normalize(rec['disease_name']), _catalogue_treatment(rec)) for rec in self.loader() if rec.get('disease_name')),
+            key=lambda item: len(item[0]), reverse=True
+        )
+        by_name = {name: self._resolve(name, catalogue) for name in self.disease_classes}
+        with self._lock:
+            self._catalogue = catalogue
+            self._by_name = by_name
+            self._built_at = time.monotonic()
+
+    def _resolve(self, disease_name, catalogue):
+        disease = _normalize(disease_name.split('___', 1)[-1])
+        for name, treatment in catalogue:
+            if name and name in disease and treatment:
+                return treatment
+        for key, treatment in DEFAULT_TREATMENTS.items():
+            if key.lower() in disease_name.lower():
+                return treatment
+        return DEFAULT_TREATMENT
+
+    def lookup(self, disease_name):
+        built_at = self._built_at
+        if built_at is None or (self.max_age and time.monotonic() - built_at > self.max_age):
+            self.build()
+        treatment = self._by_name.get(disease_name)
+        if treatment is None:
+            # Names outside DISEASE_CLASSES are resolved once and remembered
+            treatment = self._resolve(disease_name, self._catalogue)
+            with self._lock:
+                self._by_name[disease_name] = treatment
+        return treatment
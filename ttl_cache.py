@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire ``ttl_seconds`` after they are stored.
+
+    A falsy ``ttl_seconds`` keeps entries until they are evicted. None is not
+    a cacheable value - ``get`` returns it for a miss. ``on_remove(key, value)``
+    is called, under the cache lock, for every entry that is evicted, expires,
+    is replaced or is popped; ``clear`` drops entries without calling it.
+    """
+
+    def __init__(self, max_entries, ttl_seconds=None, on_remove=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.on_remove = on_remove
+
+        self._entries = OrderedDict()  # key -> (value, expires_at or None)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def _removed(self, key, value):
+        if self.on_remove is not None:
+            self.on_remove(key, value)
+
+    def get(self, key, count=True):
+        """The live value for ``key``, marked most recently used, or None.
+
+        With ``count=False`` the lookup is left out of the hit and miss counts.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self._removed(key, entry[0])
+                entry = None
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._removed(key, previous[0])
+            self._entries[key] = (value, expires_at)
+            while len(self._entries) > self.max_entries:
+                evicted, entry = self._entries.popitem(last=False)
+                self.evictions += 1
+                self._removed(evicted, entry[0])
+
+    def pop(self, key):
+        """Drop ``key`` - returns its value, or None if it was not cached"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            self.invalidations += 1
+            self._removed(key, entry[0])
+            return entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
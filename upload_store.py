@@ -0,0 +1,280 @@
+import io
+import logging
+import os
+import stat
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from PIL import Image
+
+from prediction_cache import content_hash
+
+# Leading bytes of the formats we accept -> stored extension
+_SIGNATURES = [
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+]
+
+THUMBNAILS_DIR = 'thumbs'
+_TMP_PREFIX = '.upload-'
+
+logger = logging.getLogger(__name__)
+
+
+def write_atomic(data, filepath):
+    """Write bytes through a temp file in the target directory and rename into place"""
+    directory = os.path.dirname(filepath) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=_TMP_PREFIX)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return filepath
+
+
+def _subdirectories(path):
+    try:
+        return sorted(entry.name for entry in os.scandir(path) if entry.is_dir())
+    except FileNotFoundError:
+        return []
+
+
+def extension_for(data, filename=''):
+    for signature, extension in _SIGNATURES:
+        if data.startswith(signature):
+            return extension
+    return filename.rsplit('.', 1)[-1].lower() if '.' in filename else 'bin'
+
+
+class UploadStore:
+    """Content-addressed upload storage under ``root``.
+
+    Each upload is stored once as ``ab/cd/<sha256>.<ext>`` - identical images
+    share one file whoever uploads them, and names never collide. Writes and
+    thumbnail generation (one JPEG per entry of ``thumbnail_sizes``, under
+    ``thumbs/<tier>/``) run on a small background pool. At most
+    ``max_pending`` uploads wait on the pool; past that, ``save`` writes on
+    the caller's thread, so a slow disk holds requests back instead of
+    piling image bytes up in memory.
+
+    With ``metrics``, each write - original and thumbnails - is timed as the
+    ``file_save`` stage, on whichever thread runs it.
+    """
+
+    def __init__(self, root, thumbnail_sizes=None, thumbnail_quality=80, workers=2, max_pending=64,
+                 metrics=None):
+        self.root = os.path.normpath(root)
+        self.metrics = metrics
+        self.thumbnail_sizes = thumbnail_sizes or {'small': 96, 'medium': 320}
+        self.thumbnail_quality = thumbnail_quality
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='upload-store')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._in_flight = set()
+
+        # Stats
+        self._stored = 0
+        self._deduplicated = 0
+        self._thumbnails = 0
+        self._synchronous = 0
+        self._errors = 0
+
+    @staticmethod
+    def relative_path(key, extension):
+        return f'{key[:2]}/{key[2:4]}/{key}.{extension}'
+
+    @staticmethod
+    def thumbnail_relative_path(image_path, tier):
+        return f'{THUMBNAILS_DIR}/{tier}/{os.path.splitext(image_path)[0]}.jpg'
+
+    def path(self, relative_path):
+        return os.path.join(self.root, relative_path)
+
+    def save(self, data, filename='', key=None):
+        """Store upload bytes in the background - returns the path relative to ``root``"""
+        relative_path = self.relative_path(key or content_hash(data), extension_for(data, filename))
+        with self._lock:
+            if relative_path in self._in_flight:
+                self._deduplicated += 1
+                return relative_path
+            self._in_flight.add(relative_path)
+        if self._slots.acquire(blocking=False):
+            self._pool.submit(self._store_queued, data, relative_path)
+        else:
+            with self._lock:
+                self._synchronous += 1
+            self._store(data, relative_path)
+        return relative_path
+
+    def _store_queued(self, data, relative_path):
+        try:
+            self._store(data, relative_path)
+        finally:
+            self._slots.release()
+
+    def _store(self, data, relative_path):
+        span = self.metrics.span('file_save') if self.metrics is not None else nullcontext()
+        try:
+            with span:
+                self._write(data, relative_path)
+        except Exception:
+            logger.exception('Could not store upload %s', relative_path)
+            with self._lock:
+                self._errors += 1
+        finally:
+            with self._lock:
+                self._in_flight.discard(relative_path)
+
+    def _write(self, data, relative_path):
+        filepath = self.path(relative_path)
+        if os.path.exists(filepath):
+            # Already stored - refresh its mtime so retention counts this upload
+            os.utime(filepath)
+            with self._lock:
+                self._deduplicated += 1
+        else:
+            write_atomic(data, filepath)
+            with self._lock:
+                self._stored += 1
+        self._write_thumbnails(data, relative_path)
+
+    def _write_thumbnails(self, data, relative_path):
+        missing = [(tier, size) for tier, size in self.thumbnail_sizes.items()
+                   if not os.path.exists(self.path(self.thumbnail_relative_path(relative_path, tier)))]
+        if not missing:
+            return
+        with Image.open(io.BytesIO(data)) as img:
+            largest = max(size for tier, size in missing)
+            img.draft('RGB', (largest, largest))
+            img = img.convert('RGB')
+            for tier, size in sorted(missing, key=lambda item: -item[1]):
+                img.thumbnail((size, size), Image.BILINEAR)
+                out = io.BytesIO()
+                img.save(out, 'JPEG', quality=self.thumbnail_quality, optimize=True)
+                write_atomic(out.getvalue(), self.path(self.thumbnail_relative_path(relative_path, tier)))
+                with self._lock:
+                    self._thumbnails += 1
+
+    def thumbnail(self, relative_path, tier):
+        """Thumbnail path relative to ``root`` once it exists, else the original's"""
+        thumb = self.thumbnail_relative_path(relative_path, tier)
+        return thumb if os.path.exists(self.path(thumb)) else relative_path
+
+    def original(self, relative_path):
+        """The original's path relative to ``root`` while it is kept, else its largest thumbnail's"""
+        if os.path.exists(self.path(relative_path)):
+            return relative_path
+        return self.thumbnail(relative_path, max(self.thumbnail_sizes, key=self.thumbnail_sizes.get))
+
+    def flush(self, timeout=None):
+        """Wait for queued writes - used by tests, scripts and shutdown"""
+        self._pool.submit(lambda: None).result(timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if not self._in_flight:
+                    return True
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'stored': self._stored,
+                'deduplicated': self._deduplicated,
+                'thumbnails': self._thumbnails,
+                'synchronous': self._synchronous,
+                'errors': self._errors,
+                'in_flight': len(self._in_flight),
+            }
+
+    def compact(self, referenced_keys, retention_days=None, grace_seconds=3600, dry_run=False):
+        """Reclaim disk space - returns counts of what was (or would be) removed.
+
+        * originals and thumbnails no detection references, once older than
+          ``grace_seconds`` (failed or abandoned uploads)
+        * originals last uploaded more than ``retention_days`` ago - their
+          thumbnails stay, so history pages keep a preview
+        * temp files left behind by interrupted writes, and empty shard dirs
+
+        The store is compacted one ``ab/cd`` shard at a time:
+        ``referenced_keys(shard)`` returns the content keys (sha256) that
+        detections reference within that shard, so only one shard's keys are
+        held in memory however large the store grows.
+        """
+        now = time.time()
+        retention_cutoff = None if retention_days is None else now - retention_days * 86400
+        summary = {'scanned': 0, 'orphans': 0, 'expired': 0, 'thumbnails': 0, 'temp_files': 0, 'bytes_freed': 0}
+
+        def remove(filepath, size, counter):
+            summary[counter] += 1
+            summary['bytes_freed'] += size
+            if not dry_run:
+                try:
+                    os.unlink(filepath)
+                except FileNotFoundError:
+                    pass
+
+        def files(directory):
+            """(path, key, stat) of the stored files in one directory - temp files are handled here"""
+            try:
+                names = os.listdir(directory)
+            except FileNotFoundError:
+                return
+            for name in names:
+                filepath = os.path.join(directory, name)
+                try:
+                    info = os.stat(filepath)
+                except FileNotFoundError:
+                    continue
+                if not stat.S_ISREG(info.st_mode):
+                    continue
+                if name.startswith(_TMP_PREFIX):
+                    if info.st_mtime < now - grace_seconds:
+                        remove(filepath, info.st_size, 'temp_files')
+                    continue
+                yield filepath, os.path.splitext(name)[0], info
+
+        thumbnails_root = self.path(THUMBNAILS_DIR)
+        tier_roots = [os.path.join(thumbnails_root, tier) for tier in _subdirectories(thumbnails_root)]
+
+        # Only temp files at the top level - files from before the sharded layout are left alone
+        for _ in files(self.root):
+            pass
+
+        shards = set()
+        for base in [self.root] + tier_roots:
+            for top in _subdirectories(base):
+                if base != self.root or top != THUMBNAILS_DIR:
+                    shards.update(f'{top}/{sub}' for sub in _subdirectories(os.path.join(base, top)))
+
+        for shard in sorted(shards):
+            keys = referenced_keys(shard)
+            for filepath, key, info in files(os.path.join(self.root, shard)):
+                summary['scanned'] += 1
+                if key not in keys:
+                    if info.st_mtime < now - grace_seconds:
+                        remove(filepath, info.st_size, 'orphans')
+                elif retention_cutoff is not None and info.st_mtime < retention_cutoff:
+                    remove(filepath, info.st_size, 'expired')
+            # Thumbnails of images no detection references any more
+            for tier_root in tier_roots:
+                for filepath, key, info in files(os.path.join(tier_root, shard)):
+                    if info.st_mtime < now - grace_seconds and key not in keys:
+                        remove(filepath, info.st_size, 'thumbnails')
+
+        if not dry_run:
+            for directory, dirnames, filenames in os.walk(self.root, topdown=False):
+                if directory != self.root and directory != thumbnails_root and not os.listdir(directory):
+                    os.rmdir(directory)
+        return summary
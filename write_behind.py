@@ -0,0 +1,229 @@
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy.exc import DBAPIError, OperationalError
+
+logger = logging.getLogger(__name__)
+
+# SQLite lock contention - the same batch is likely to succeed a moment later
+_TRANSIENT_MESSAGES = ('database is locked', 'database table is locked', 'database is busy')
+
+
+def is_transient(exc):
+    """True for write errors worth retrying unchanged: lock contention and dropped connections"""
+    if isinstance(exc, DBAPIError) and exc.connection_invalidated:
+        return True
+    return isinstance(exc, OperationalError) and any(message in str(exc.orig) for message in _TRANSIENT_MESSAGES)
+
+
+class WriteBehindBuffer:
+    """Queue append-only rows and insert them in batched transactions.
+
+    Rows are flushed by a background thread once ``max_rows`` are pending or the
+    oldest has waited ``max_delay`` seconds, and on clean shutdown. Until then
+    ``pending()`` returns them so a user's own pages still show their writes -
+    in this process only; other processes only see them once committed.
+    With ``enabled=False`` every row is committed immediately instead.
+
+    A batch that fails on lock contention is retried up to ``max_retries``
+    times, backing off from ``max_delay``. Any other failure - or one that
+    outlasts the retries - splits the batch in halves until the rows that
+    cannot be written are isolated; those are logged and dropped so they do
+    not hold back everything queued after them. Once ``max_queue`` rows are
+    waiting, ``add`` commits on the caller's thread instead of queueing.
+    """
+
+    def __init__(self, app, db, max_rows=200, max_delay=0.5, enabled=True, max_retries=5, max_queue=10000):
+        self.app = app
+        self.db = db
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.enabled = enabled
+        self.max_retries = max_retries
+        self.max_queue = max_queue
+
+        self._pending = []
+        self._in_flight = []
+        self._oldest = None
+        self._retries = 0
+        self._retry_at = None
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._worker = None
+        self._closed = False
+        self._flush_listeners = []
+
+        self.rows_written = 0
+        self.transactions = 0
+        self.failures = 0
+        self.retries = 0
+        self.dead_lettered = 0
+        self.overflow_writes = 0
+
+    def on_flush(self, listener):
+        """Call ``listener(session, rows)`` inside each flush transaction"""
+        self._flush_listeners.append(listener)
+        return listener
+
+    def add(self, model, **values):
+        """Queue one row and return it as a transient model instance"""
+        row = model(**values)
+        if self.enabled:
+            with self._cond:
+                if len(self._pending) < self.max_queue:
+                    if self._worker is None:
+                        self._start()
+                    if self._oldest is None:
+                        self._oldest = time.monotonic()
+                    self._pending.append((model, values, row))
+                    if len(self._pending) >= self.max_rows:
+                        self._cond.notify()
+                    return row
+                self.overflow_writes += 1
+
+        self.db.session.add(row)
+        for listener in self._flush_listeners:
+            listener(self.db.session, [(model, values, row)])
+        self.db.session.commit()
+        self.rows_written += 1
+        self.transactions += 1
+        return row
+
+    def pending(self, model, **filters):
+        """Queued and in-flight rows of ``model`` matching the given column values"""
+        with self._cond:
+            rows = self._in_flight + self._pending
+        return [
+            row for row_model, values, row in rows
+            if row_model is model and all(values.get(k) == v for k, v in filters.items())
+        ]
+
+    def flush(self):
+        """Write everything queued so far in one transaction"""
+        with self._flush_lock:
+            with self._cond:
+                batch = self._pending
+                self._pending = []
+                self._oldest = None
+                self._in_flight = batch
+            if not batch:
+                return 0
+            requeue = []
+            try:
+                written = self._write_isolating(batch, requeue)
+            finally:
+                with self._cond:
+                    if requeue:
+                        self._pending = requeue + self._pending
+                        self._oldest = self._oldest or time.monotonic()
+                    self._in_flight = []
+            return written
+
+    def _write_isolating(self, batch, requeue):
+        """Write ``batch``, splitting it around rows that fail - returns the rows written"""
+        try:
+            self._write(batch)
+        except Exception as exc:
+            self.failures += 1
+            if is_transient(exc) and self._retries < self.max_retries:
+                self._retries += 1
+                self.retries += 1
+                self._retry_at = time.monotonic() + self.max_delay * 2 ** (self._retries - 1)
+                logger.warning('Write-behind flush of %d rows failed (%s), retry %d of %d',
+                               len(batch), exc, self._retries, self.max_retries)
+                requeue.extend(batch)
+                return 0
+            if len(batch) == 1:
+                model, values, row = batch[0]
+                self.dead_lettered += 1
+                logger.exception('Write-behind dropped a %s row it could not write: %r', model.__name__, values)
+                return 0
+            middle = len(batch) // 2
+            return self._write_isolating(batch[:middle], requeue) + self._write_isolating(batch[middle:], requeue)
+        self._retries = 0
+        self._retry_at = None
+        return len(batch)
+
+    def _write(self, batch):
+        by_model = defaultdict(list)
+        for model, values, row in batch:
+            by_model[model].append(values)
+        with self.app.app_context():
+            session = self.db.session
+            try:
+                for model, rows in by_model.items():
+                    session.execute(self.db.insert(model), rows)
+                for listener in self._flush_listeners:
+                    listener(session, batch)
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+        self.rows_written += len(batch)
+        self.transactions += 1
+
+    def _start(self):
+        self._worker = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if self._retry_at is not None:
+                        backoff = self._retry_at - time.monotonic()
+                        if backoff > 0:
+                            self._cond.wait(backoff)
+                            continue
+                    if len(self._pending) >= self.max_rows:
+                        break
+                    if self._oldest is not None:
+                        remaining = self._oldest + self.max_delay - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def close(self):
+        """Flush outstanding rows and stop the background thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            worker = self._worker
+        if worker is not None and worker is not threading.current_thread():
+            worker.join()
+        # Retries are bounded, so this ends once the rows are written or dropped
+        self.flush()
+        while True:
+            with self._cond:
+                if not self._pending:
+                    return
+                retry_at = self._retry_at
+            if retry_at is not None:
+                time.sleep(max(0.0, retry_at - time.monotonic()))
+            self.flush()
+
+    def stats(self):
+        with self._cond:
+            queued = len(self._pending)
+        return {
+            'enabled': self.enabled,
+            'queued': queued,
+            'rows_written': self.rows_written,
+            'transactions': self.transactions,
+            'rows_per_transaction': self.rows_written / self.transactions if self.transactions else 0.0,
+            'failures': self.failures,
+            'retries': self.retries,
+            'dead_lettered': self.dead_lettered,
+            'overflow_writes': self.overflow_writes,
+            'max_queue': self.max_queue,
+        }